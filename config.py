@@ -1,5 +1,6 @@
 import logging
 import os
+import tempfile
 
 from dotenv import load_dotenv
 
@@ -31,6 +32,19 @@ class BaseConfig:
     SQLALCHEMY_ECHO = True
     SQLALCHEMY_TRACK_MODIFICATIONS = True
 
+    # Raise (instead of log) when a view blows its query_budget, and raise on
+    # unexpected lazy loads of bottle relationships on list pages.
+    STRICT_SQL_CHECKS = False
+
+    # ----------------------------------------------------------------------
+    # FRAGMENT CACHE
+    # ----------------------------------------------------------------------
+    # Rendered HTMX bottle rows, per worker; 0 turns the cache off.
+    FRAGMENT_CACHE_MAX_BYTES = 32 * 1024 * 1024
+    # Optional directory shared by all workers on the host, e.g. /dev/shm/mywhiskies-fragments.
+    FRAGMENT_CACHE_DIR = os.environ.get("FRAGMENT_CACHE_DIR")
+    FRAGMENT_CACHE_TTL = 86400
+
     # Hardened SQLAlchemy engine options
     # These prevent stale connections, increase resilience under load,
     # and give Gunicorn workers enough room to operate safely.
@@ -81,6 +95,18 @@ class BaseConfig:
     BOTTLE_IMAGE_S3_KEY = "dev"
     BOTTLE_IMAGE_S3_URL = "https://my-whiskies-pics.s3-us-west-1.amazonaws.com"
     BOTTLE_IMAGE_FULL_S3_KEY = "dev-pro-full"
+    # "s3", or "local" to keep images in IMAGE_STORAGE_DIR (default: instance/images), served at /media
+    IMAGE_STORAGE = os.environ.get("IMAGE_STORAGE", "s3")
+    IMAGE_STORAGE_DIR = os.environ.get("IMAGE_STORAGE_DIR")
+    # Connections the process-wide S3 client keeps open; covers upload workers and export threads.
+    S3_MAX_POOL_CONNECTIONS = 50
+    # Threads running bulk S3 puts and deletes concurrently (shared by the whole process).
+    S3_MAX_CONCURRENCY = 16
+
+    # Threads per web process that render and store queued uploads; 0 leaves the queue to
+    # `flask process-image-uploads --watch`.
+    IMAGE_UPLOAD_WORKERS = int(os.environ.get("IMAGE_UPLOAD_WORKERS", 2))
+    IMAGE_UPLOAD_POLL_SECONDS = 5
 
     # ----------------------------------------------------------------------
     # STRIPE
@@ -95,6 +121,18 @@ class BaseConfig:
     # AI / ANTHROPIC
     # ----------------------------------------------------------------------
     ANTHROPIC_API_KEY = os.environ.get("ANTHROPIC_API_KEY", "")
+    # "anthropic", or "stub" to return a canned result without calling the API (dev and tests)
+    LABEL_SCAN_CLIENT = os.environ.get("LABEL_SCAN_CLIENT", "anthropic")
+    # Threads per web process that run label scans; scans never hold a request worker.
+    LABEL_SCAN_WORKERS = int(os.environ.get("LABEL_SCAN_WORKERS", 4))
+    # Scans a process accepts (running plus waiting) before it answers "busy".
+    LABEL_SCAN_MAX_PENDING = 16
+    # Seconds one model request may take before it's abandoned.
+    LABEL_SCAN_TIMEOUT = 60
+    # Scan results are cached by image content, so a repeat scan skips the model and the quota.
+    # Seconds an entry is served for (0 disables the cache), and how many entries are kept.
+    LABEL_SCAN_CACHE_TTL = 30 * 86400
+    LABEL_SCAN_CACHE_MAX_ENTRIES = 50000
 
     @staticmethod
     def init_app(app):
@@ -140,4 +178,13 @@ class TestConfig(BaseConfig):
 
     WTF_CSRF_ENABLED = False
     TESTING_RECAPTCHA_BYPASS = True
+    STRICT_SQL_CHECKS = True
     LOG_LEVEL = logging.CRITICAL
+    # tests drain the queue themselves (process_upload_jobs)
+    IMAGE_UPLOAD_WORKERS = 0
+    # tests never touch AWS
+    IMAGE_STORAGE = "local"
+    IMAGE_STORAGE_DIR = os.path.join(tempfile.gettempdir(), "mywhiskies-test-images")
+    # scans run inline, against the stub client
+    LABEL_SCAN_WORKERS = 0
+    LABEL_SCAN_CLIENT = "stub"
@@ -0,0 +1,38 @@
+"""add label scan jobs
+
+Revision ID: 2d9b6e4f7a13
+Revises: 8e4a6c1f0d27
+Create Date: 2026-10-18 21:02:47.118305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2d9b6e4f7a13'
+down_revision = '8e4a6c1f0d27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'label_scan_job',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('user_id', sa.String(length=36), nullable=False),
+        sa.Column('status', sa.String(length=10), nullable=False),
+        sa.Column('result', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    with op.batch_alter_table('label_scan_job', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_label_scan_job_user_id'), ['user_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('label_scan_job', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_label_scan_job_user_id'))
+    op.drop_table('label_scan_job')
@@ -0,0 +1,46 @@
+"""add lower(name) indexes for name matching to distillery, bottler and barrel_picker
+
+Revision ID: 4f2a7d1c9e63
+Revises: 6a0c3f8e2b95
+Create Date: 2026-10-18 23:05:31.402117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4f2a7d1c9e63'
+down_revision = '6a0c3f8e2b95'
+branch_labels = None
+depends_on = None
+
+# table: whether its names are matched per user
+TABLES = {'distillery': True, 'bottler': True, 'barrel_picker': True, 'catalog_distillery': False}
+
+
+def upgrade():
+    postgresql = op.get_bind().dialect.name == 'postgresql'
+    # MySQL needs the expression in its own parentheses; text_pattern_ops lets Postgres use the
+    # index for LIKE 'term%' whatever the collation
+    lower_name = sa.text('(lower(name)) text_pattern_ops' if postgresql else '(lower(name))')
+    for table, scoped in TABLES.items():
+        op.create_index(f'ix_{table}_lower_name', table, ['user_id', lower_name] if scoped else [lower_name])
+
+    if not postgresql:
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for table in TABLES:
+        op.create_index(
+            f'ix_{table}_lower_name_trgm', table, [sa.text('lower(name) gin_trgm_ops')], postgresql_using='gin'
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        for table in TABLES:
+            op.drop_index(f'ix_{table}_lower_name_trgm', table_name=table)
+
+    for table in TABLES:
+        op.drop_index(f'ix_{table}_lower_name', table_name=table)
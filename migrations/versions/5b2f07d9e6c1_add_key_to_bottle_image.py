@@ -0,0 +1,46 @@
+"""store an immutable object key on bottle images
+
+Revision ID: 5b2f07d9e6c1
+Revises: c3e81b5d94a7
+Create Date: 2026-10-18 19:06:52.280147
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b2f07d9e6c1'
+down_revision = 'c3e81b5d94a7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('bottle_image', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('key', sa.String(length=100), nullable=True))
+
+    # existing files already live at {bottle_id}_{sequence}.jpg; that name becomes their key
+    # (built as an expression: `key` is reserved in MySQL and `||` isn't concatenation there)
+    bottle_image = sa.table(
+        'bottle_image',
+        sa.column('bottle_id', sa.String),
+        sa.column('sequence', sa.Integer),
+        sa.column('key', sa.String),
+    )
+    op.execute(
+        bottle_image.update().values(
+            key=bottle_image.c.bottle_id + '_' + sa.cast(bottle_image.c.sequence, sa.String) + '.jpg'
+        )
+    )
+
+    with op.batch_alter_table('bottle_image', schema=None) as batch_op:
+        batch_op.alter_column('key', existing_type=sa.String(length=100), nullable=False)
+        batch_op.create_unique_constraint('uq_bottle_image_key', ['key'])
+
+
+def downgrade():
+    # Images renamed to new-style keys since the upgrade aren't moved back to {bottle_id}_{sequence}.jpg.
+    with op.batch_alter_table('bottle_image', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_bottle_image_key', type_='unique')
+        batch_op.drop_column('key')
@@ -0,0 +1,88 @@
+"""add search_text to bottle with a trigram index
+
+Revision ID: 5e3c1a9b7d20
+Revises: 39513633ce1c
+Create Date: 2026-10-18 10:12:44.118302
+
+"""
+from collections import defaultdict
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e3c1a9b7d20'
+down_revision = '39513633ce1c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('bottle', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('search_text', sa.Text(), nullable=True))
+
+    _backfill_search_text(op.get_bind())
+
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        'ix_bottle_search_text_trgm',
+        'bottle',
+        ['search_text'],
+        postgresql_using='gin',
+        postgresql_ops={'search_text': 'gin_trgm_ops'},
+    )
+
+
+def _backfill_search_text(bind):
+    """
+    Build each bottle's search_text in Python, as build_search_text does (parts stripped, empty
+    ones dropped, newline-joined, then fold_search_text), so it's the same on every dialect.
+    """
+    from mywhiskies.models.bottle import fold_search_text
+
+    bottle = sa.table(
+        'bottle', sa.column('id'), sa.column('name'), sa.column('description'), sa.column('bottler_id'),
+        sa.column('search_text'),
+    )
+    bottler = sa.table('bottler', sa.column('id'), sa.column('name'))
+    bottlers = dict(bind.execute(sa.select(bottler.c.id, bottler.c.name)).all())
+
+    # distillery names, then barrel picker names, each sorted, per bottle
+    linked = defaultdict(list)
+    for link_table, fk, table in (
+        ('bottle_distillery', 'distillery_id', 'distillery'),
+        ('bottle_barrel_picker', 'barrel_picker_id', 'barrel_picker'),
+    ):
+        link = sa.table(link_table, sa.column('bottle_id'), sa.column(fk))
+        named = sa.table(table, sa.column('id'), sa.column('name'))
+        names = defaultdict(list)
+        for bottle_id, name in bind.execute(
+            sa.select(link.c.bottle_id, named.c.name).join(named, named.c.id == link.c[fk])
+        ):
+            names[bottle_id].append(name)
+        for bottle_id, bottle_names in names.items():
+            linked[bottle_id] += sorted(bottle_names)
+
+    values = []
+    for id_, name, description, bottler_id in bind.execute(
+        sa.select(bottle.c.id, bottle.c.name, bottle.c.description, bottle.c.bottler_id)
+    ).all():
+        parts = [name, description, bottlers.get(bottler_id), *linked[id_]]
+        values.append({'b_id': id_, 'b_search_text': fold_search_text('\n'.join(p.strip() for p in parts if p))})
+    if values:
+        bind.execute(
+            bottle.update().where(bottle.c.id == sa.bindparam('b_id')).values(search_text=sa.bindparam('b_search_text')),
+            values,
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_bottle_search_text_trgm', table_name='bottle')
+
+    with op.batch_alter_table('bottle', schema=None) as batch_op:
+        batch_op.drop_column('search_text')
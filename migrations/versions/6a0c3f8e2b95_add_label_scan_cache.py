@@ -0,0 +1,35 @@
+"""add label scan result cache
+
+Revision ID: 6a0c3f8e2b95
+Revises: 2d9b6e4f7a13
+Create Date: 2026-10-18 21:47:05.730512
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6a0c3f8e2b95'
+down_revision = '2d9b6e4f7a13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'label_scan_cache',
+        sa.Column('key', sa.String(length=64), nullable=False),
+        sa.Column('result', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('used_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('key'),
+    )
+    with op.batch_alter_table('label_scan_cache', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_label_scan_cache_used_at'), ['used_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('label_scan_cache', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_label_scan_cache_used_at'))
+    op.drop_table('label_scan_cache')
@@ -0,0 +1,50 @@
+"""add group_key to bottle for SQL-side grouping of duplicate bottles
+
+Revision ID: 8b41d6e2c9f3
+Revises: 5e3c1a9b7d20
+Create Date: 2026-10-18 11:03:27.514620
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b41d6e2c9f3'
+down_revision = '5e3c1a9b7d20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('bottle', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('group_key', sa.String(length=100), nullable=True))
+
+    _backfill_group_key(op.get_bind())
+
+    with op.batch_alter_table('bottle', schema=None) as batch_op:
+        batch_op.alter_column('group_key', existing_type=sa.String(length=100), nullable=False)
+        batch_op.create_index('ix_bottle_user_group_key_type', ['user_id', 'group_key', 'type'], unique=False)
+
+
+def _backfill_group_key(bind, batch_size=1000):
+    """
+    Fill in group_key with bottle_group_key itself: SQL trim/lower don't strip tabs, newlines
+    or NBSP, or fold non-ASCII, the way Python does, and new rows get Python's key.
+    """
+    from mywhiskies.models.bottle import bottle_group_key
+
+    bottle = sa.table('bottle', sa.column('id'), sa.column('name'), sa.column('group_key'))
+    update = bottle.update().where(bottle.c.id == sa.bindparam('b_id')).values(group_key=sa.bindparam('b_group_key'))
+    rows = bind.execute(sa.select(bottle.c.id, bottle.c.name)).all()
+    for start in range(0, len(rows), batch_size):
+        bind.execute(
+            update,
+            [{'b_id': id_, 'b_group_key': bottle_group_key(name)} for id_, name in rows[start : start + batch_size]],
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('bottle', schema=None) as batch_op:
+        batch_op.drop_index('ix_bottle_user_group_key_type')
+        batch_op.drop_column('group_key')
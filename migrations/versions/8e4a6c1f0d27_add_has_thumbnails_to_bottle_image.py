@@ -0,0 +1,29 @@
+"""record whether a bottle image has its WebP thumbnails
+
+Revision ID: 8e4a6c1f0d27
+Revises: 5b2f07d9e6c1
+Create Date: 2026-10-18 20:14:33.604918
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e4a6c1f0d27'
+down_revision = '5b2f07d9e6c1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # existing images get theirs from `flask backfill-image-thumbnails`
+    with op.batch_alter_table('bottle_image', schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column('has_thumbnails', sa.Boolean(), server_default=sa.text('false'), nullable=False)
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('bottle_image', schema=None) as batch_op:
+        batch_op.drop_column('has_thumbnails')
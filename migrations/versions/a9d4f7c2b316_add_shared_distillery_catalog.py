@@ -0,0 +1,110 @@
+"""add shared distillery catalog and link per-user base distillery copies to it
+
+Revision ID: a9d4f7c2b316
+Revises: e5a8c3f17d42
+Create Date: 2026-10-18 15:02:37.118204
+
+"""
+import json
+import os
+import uuid
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9d4f7c2b316'
+down_revision = 'e5a8c3f17d42'
+branch_labels = None
+depends_on = None
+
+BASE_DISTILLERIES = os.path.join(
+    os.path.dirname(__file__), '..', '..', 'mywhiskies', 'static', 'data', 'base_distilleries.json'
+)
+FIELDS = ('name', 'region_1', 'region_2', 'url')
+
+
+def upgrade():
+    catalog = op.create_table(
+        'catalog_distillery',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('name', sa.String(length=65), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('region_1', sa.String(length=36), nullable=False),
+        sa.Column('region_2', sa.String(length=36), nullable=False),
+        sa.Column('url', sa.String(length=64), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name'),
+    )
+    with op.batch_alter_table('distillery', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('catalog_id', sa.String(length=36), nullable=True))
+        batch_op.create_foreign_key(
+            'fk_distillery_catalog_id', 'catalog_distillery', ['catalog_id'], ['id'], ondelete='SET NULL'
+        )
+        batch_op.create_unique_constraint('uq_distillery_user_catalog', ['user_id', 'catalog_id'])
+
+    with open(BASE_DISTILLERIES, encoding='utf-8') as f:
+        rows = [
+            {
+                'id': str(uuid.uuid4()),
+                'name': d['name'].strip(),
+                'description': None,
+                'region_1': (d.get('region_1') or '').strip(),
+                'region_2': (d.get('region_2') or '').strip(),
+                'url': (d.get('url') or '').strip() or None,
+            }
+            for d in json.load(f)['distilleries']
+        ]
+    op.bulk_insert(catalog, rows)
+
+    # Link every untouched copy that bulk add made to its catalog entry (one per user), then
+    # drop the ones no bottle uses: users pick those from the catalog from now on.
+    conn = op.get_bind()
+    by_values = {tuple(r[k] or '' for k in FIELDS): r['id'] for r in rows}
+    # a user with duplicate copies gets the one their bottles use linked
+    copies = conn.execute(
+        sa.text(
+            'SELECT id, user_id, name, region_1, region_2, url, description FROM distillery ORDER BY user_id, '
+            'CASE WHEN EXISTS (SELECT 1 FROM bottle_distillery bd WHERE bd.distillery_id = distillery.id) '
+            'THEN 0 ELSE 1 END, user_num'
+        )
+    ).all()
+    linked = set()
+    for copy in copies:
+        if copy.description:
+            continue
+        catalog_id = by_values.get(tuple(getattr(copy, k) or '' for k in FIELDS))
+        if catalog_id is None or (copy.user_id, catalog_id) in linked:
+            continue
+        linked.add((copy.user_id, catalog_id))
+        conn.execute(
+            sa.text('UPDATE distillery SET catalog_id = :catalog_id WHERE id = :id'),
+            {'catalog_id': catalog_id, 'id': copy.id},
+        )
+
+    # Core tables rather than raw SQL, so each dialect quotes "user" its own way
+    user = sa.table('user', sa.column('id'), sa.column('collection_version'))
+    distillery = sa.table('distillery', sa.column('id'), sa.column('user_id'), sa.column('catalog_id'))
+    bottle_distillery = sa.table('bottle_distillery', sa.column('distillery_id'))
+    unused = sa.and_(
+        distillery.c.catalog_id.is_not(None),
+        ~sa.exists().where(bottle_distillery.c.distillery_id == distillery.c.id),
+    )
+    user_ids = conn.execute(sa.select(distillery.c.user_id).where(unused).distinct()).scalars().all()
+    if user_ids:
+        conn.execute(
+            sa.update(user)
+            .where(user.c.id.in_(user_ids))
+            .values(collection_version=user.c.collection_version + 1)
+        )
+    conn.execute(sa.delete(distillery).where(unused))
+
+
+def downgrade():
+    # Unused base distilleries deleted by the upgrade aren't recreated; users can add them back by hand.
+    with op.batch_alter_table('distillery', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_distillery_user_catalog', type_='unique')
+        batch_op.drop_constraint('fk_distillery_catalog_id', type_='foreignkey')
+        batch_op.drop_column('catalog_id')
+    op.drop_table('catalog_distillery')
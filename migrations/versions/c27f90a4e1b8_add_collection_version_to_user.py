@@ -0,0 +1,26 @@
+"""add collection_version to user for ETag support
+
+Revision ID: c27f90a4e1b8
+Revises: 8b41d6e2c9f3
+Create Date: 2026-10-18 12:20:51.630418
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c27f90a4e1b8'
+down_revision = '8b41d6e2c9f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('collection_version', sa.Integer(), server_default=sa.text('0'), nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('collection_version')
@@ -0,0 +1,48 @@
+"""add image upload queue and pending flag on bottle images
+
+Revision ID: c3e81b5d94a7
+Revises: a9d4f7c2b316
+Create Date: 2026-10-18 17:41:09.552630
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e81b5d94a7'
+down_revision = 'a9d4f7c2b316'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('bottle_image', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('is_ready', sa.Boolean(), server_default=sa.text('true'), nullable=False))
+
+    op.create_table(
+        'image_upload_job',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('image_id', sa.String(length=36), nullable=False),
+        # sized so MySQL makes it a LONGBLOB; a plain BLOB tops out at 64 KB
+        sa.Column('data', sa.LargeBinary(length=2**32 - 1), nullable=False),
+        sa.Column('is_pro', sa.Boolean(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('run_at', sa.DateTime(), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['image_id'], ['bottle_image.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('image_id'),
+    )
+    with op.batch_alter_table('image_upload_job', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_image_upload_job_run_at'), ['run_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('image_upload_job', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_image_upload_job_run_at'))
+    op.drop_table('image_upload_job')
+
+    with op.batch_alter_table('bottle_image', schema=None) as batch_op:
+        batch_op.drop_column('is_ready')
@@ -0,0 +1,36 @@
+"""add user_num_counter table for atomic per-user number allocation
+
+Revision ID: e5a8c3f17d42
+Revises: c27f90a4e1b8
+Create Date: 2026-10-18 13:41:09.274815
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a8c3f17d42'
+down_revision = 'c27f90a4e1b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'user_num_counter',
+        sa.Column('user_id', sa.String(length=36), nullable=False),
+        sa.Column('entity', sa.String(length=32), nullable=False),
+        sa.Column('last_num', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'entity'),
+    )
+    for table in ('bottle', 'distillery', 'bottler', 'barrel_picker'):
+        op.execute(
+            f"INSERT INTO user_num_counter (user_id, entity, last_num) "
+            f"SELECT user_id, '{table}', MAX(user_num) FROM {table} GROUP BY user_id"
+        )
+
+
+def downgrade():
+    op.drop_table('user_num_counter')
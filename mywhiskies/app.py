@@ -11,6 +11,9 @@ from werkzeug.routing import BaseConverter
 
 from config import DevConfig, ProdConfig
 from mywhiskies.common.filters import register_filters
+from mywhiskies.common.fragment_cache import register_fragment_cache
+from mywhiskies.common.query_budget import register_query_budget
+from mywhiskies.common.storage import register_storage
 from mywhiskies.extensions import register_extensions
 from mywhiskies.logging import register_logging
 from mywhiskies.signals import register_signals
@@ -118,15 +121,35 @@ def create_app(settings_override: dict = None, config_class: type = None) -> Fla
     app.register_blueprint(user_bp)
 
     register_filters(app)
+    register_query_budget(app)
+    register_fragment_cache(app)
+    register_storage(app)
+
+    from mywhiskies.services.bottle.scan_jobs import register_label_scans
+    from mywhiskies.services.bottle.upload_queue import register_upload_workers
+
+    register_upload_workers(app)
+    register_label_scans(app)
 
     register_logging(app)
     register_extensions(app)
     register_signals(app)
 
-    from mywhiskies.cli import audit_orphaned_images_command, cleanup_inactive_users_command
+    from mywhiskies.cli import (
+        audit_orphaned_images_command,
+        backfill_image_thumbnails_command,
+        cleanup_inactive_users_command,
+        import_label_scans_command,
+        process_image_uploads_command,
+        sync_distillery_catalog_command,
+    )
 
     app.cli.add_command(cleanup_inactive_users_command)
     app.cli.add_command(audit_orphaned_images_command)
+    app.cli.add_command(sync_distillery_catalog_command)
+    app.cli.add_command(process_image_uploads_command)
+    app.cli.add_command(backfill_image_thumbnails_command)
+    app.cli.add_command(import_label_scans_command)
 
     return app
 
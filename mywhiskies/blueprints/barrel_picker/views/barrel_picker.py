@@ -5,6 +5,8 @@ from flask_login import current_user, login_required
 from markupsafe import Markup
 
 from mywhiskies.blueprints.barrel_picker import barrel_picker_bp
+from mywhiskies.common.conditional import conditional_on_collection
+from mywhiskies.common.query_budget import LIST_PAGE_QUERY_BUDGET, query_budget
 from mywhiskies.extensions import db
 from mywhiskies.forms.barrel_picker import BarrelPickerAddForm, BarrelPickerEditForm, BarrelPickerQuickAddForm
 from mywhiskies.models import BarrelPicker, BottleTypes
@@ -14,6 +16,7 @@ from mywhiskies.services.barrel_picker.barrel_picker import (
     delete_barrel_picker,
     edit_barrel_picker,
     list_barrel_pickers,
+    search_barrel_pickers,
 )
 from mywhiskies.services.bottle.bottle import list_bottles_for_entity
 
@@ -27,6 +30,8 @@ def _sorted_pickers():
 
 
 @barrel_picker_bp.route("/<username>/barrel-pickers", methods=["GET"], endpoint="list")
+@query_budget(LIST_PAGE_QUERY_BUDGET)
+@conditional_on_collection
 def barrel_picker_list(username: str):
     user = utils.get_user_or_404(username)
     utils.check_privacy(user)
@@ -85,6 +90,8 @@ def barrel_picker_list(username: str):
     methods=["GET"],
     endpoint="detail",
 )
+@query_budget(LIST_PAGE_QUERY_BUDGET)
+@conditional_on_collection
 def barrel_picker_detail(username: str, user_num: int):
     user = utils.get_user_or_404(username)
     utils.check_privacy(user)
@@ -254,7 +261,9 @@ def barrel_picker_quick_add():
             db.session.add(picker)
             db.session.commit()
             response = make_response(render_template("barrel_picker/_quick_add_success.html", name=picker.name))
-            trigger = {"closeModal": {"id": "quickAddBarrelPickerModal", "newId": str(picker.id)}}
+            trigger = {
+                "closeModal": {"id": "quickAddBarrelPickerModal", "newId": str(picker.id), "newName": picker.name}
+            }
             response.headers["HX-Trigger"] = json.dumps(trigger)
             return response
     return render_template("barrel_picker/_quick_add_form.html", form=form)
@@ -279,6 +288,14 @@ def barrel_picker_options():
     return jsonify([{"id": p.id, "name": p.name} for p in _sorted_pickers()])
 
 
+@barrel_picker_bp.route("/barrel_pickers/search", endpoint="search")
+@login_required
+def barrel_picker_search():
+    q = request.args.get("q", "")
+    page = request.args.get("page", 1, type=int)
+    return jsonify(search_barrel_pickers(current_user, q, page))
+
+
 @barrel_picker_bp.route("/barrel_picker/add", methods=["POST"], endpoint="modal_add")
 @login_required
 def barrel_picker_add():
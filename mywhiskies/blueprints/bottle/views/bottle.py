@@ -1,3 +1,4 @@
+import json
 import time
 from urllib.parse import urlparse
 from uuid import UUID
@@ -5,11 +6,16 @@ from uuid import UUID
 from flask import abort, current_app, flash, g, jsonify, redirect, render_template, request, url_for
 from flask_login import current_user, login_required
 from markupsafe import Markup
+from sqlalchemy import func
 
 from mywhiskies.blueprints.bottle import bottle_bp
+from mywhiskies.common.conditional import conditional_on_collection
+from mywhiskies.common.fragment_cache import get_fragment_cache
+from mywhiskies.common.query_budget import LIST_PAGE_QUERY_BUDGET, STREAM_BATCH_QUERY_BUDGET, query_budget
+from mywhiskies.common.streaming import stream_template_response
 from mywhiskies.extensions import db
 from mywhiskies.forms.bottle import BottleAddForm, BottleEditForm
-from mywhiskies.models import Bottle, BottleTypes
+from mywhiskies.models import Bottle, BottleImage, BottleTypes
 from mywhiskies.services import utils
 from mywhiskies.services.bottle.bottle import (
     add_bottle,
@@ -17,12 +23,17 @@ from mywhiskies.services.bottle.bottle import (
     edit_bottle,
     get_random_bottle,
     list_bottles_by_user,
+    page_bottles_by_user,
 )
 from mywhiskies.services.bottle.form import prep_bottle_form
 from mywhiskies.services.bottle.image import get_s3_config
-from mywhiskies.services.bottle.scan import scan_bottle_label
+from mywhiskies.services.bottle.listing import KEYSET_SORTS, InvalidCursor
+from mywhiskies.services.bottle.scan import prepare_scan_images, scan_cache_key
+from mywhiskies.services.bottle.scan_cache import get_cached_scan
+from mywhiskies.services.bottle.scan_jobs import get_label_scan, scan_limit_reached, start_label_scan
+from mywhiskies.services.bottle.serialize import bottle_to_dict, parse_fields
 
-_VALID_SORTS = {"name", "type", "abv", "rating", "sb", "private"}
+_VALID_SORTS = {"name", "type", "abv", "rating", "sb", "private", "relevance"}
 
 
 def _is_safe_url(url: str) -> bool:
@@ -33,9 +44,14 @@ def _is_safe_url(url: str) -> bool:
 
 _VALID_DIRS = {"asc", "desc"}
 _VALID_PER_PAGE = {25, 50, 100, 10000}
+_SHOW_ALL = 10000  # "All" is streamed rather than rendered in one go
+_API_DEFAULT_LIMIT = 50
+_API_MAX_LIMIT = 200
 
 
 @bottle_bp.route("/<username:username>/bottles", methods=["GET"], endpoint="list")
+@query_budget(LIST_PAGE_QUERY_BUDGET, per_stream_batch=STREAM_BATCH_QUERY_BUDGET)
+@conditional_on_collection
 def bottles(username: str):
     user = utils.get_user_or_404(username)
     utils.check_privacy(user)
@@ -58,6 +74,28 @@ def bottles(username: str):
     if per_page not in _VALID_PER_PAGE:
         per_page = 25
 
+    stream = per_page == _SHOW_ALL
+
+    # HTMX filter/sort/page changes swap in just the rows, which are cached per collection version
+    rows_cache = get_fragment_cache() if request.headers.get("HX-Request") and not stream else None
+    if rows_cache:
+        rows_key = rows_cache.make_key(
+            "bottle_rows",
+            user.id,
+            user.collection_version,
+            _is_my_list,
+            q,
+            sorted(types),
+            show_killed,
+            sort,
+            direction,
+            page,
+            per_page,
+            request.url if _is_my_list else None,  # edit/delete links carry next=request.url
+        )
+        if (html := rows_cache.get(rows_key)) is not None:
+            return html
+
     data = list_bottles_by_user(
         user=user,
         is_my_list=_is_my_list,
@@ -68,6 +106,7 @@ def bottles(username: str):
         direction=direction,
         page=page,
         per_page=per_page,
+        stream=stream,
     )
 
     _, _, img_s3_url = get_s3_config()
@@ -110,10 +149,69 @@ def bottles(username: str):
         **data,
     )
 
-    if request.headers.get("HX-Request"):
-        return render_template("bottle/_bottle_rows.html", **ctx)
+    template = "bottle/_bottle_rows.html" if request.headers.get("HX-Request") else "bottle/list.html"
+    if stream:
+        return stream_template_response(template, **ctx)
 
-    return render_template("bottle/list.html", **ctx)
+    html = render_template(template, **ctx)
+    if rows_cache:
+        rows_cache.set(rows_key, html)
+    return html
+
+
+@bottle_bp.route("/<username:username>/bottles.json", methods=["GET"], endpoint="list_json")
+@query_budget(LIST_PAGE_QUERY_BUDGET)
+@conditional_on_collection
+def bottles_json(username: str):
+    user = utils.get_user_or_404(username)
+    utils.check_privacy(user)
+    _is_my_list = utils.is_my_list(username, current_user)
+
+    q = request.args.get("q", "").strip()
+    types = request.args.getlist("types") or None
+    show_killed = request.args.get("killed") == "1"
+    sort = request.args.get("sort", "name")
+    if sort not in KEYSET_SORTS:
+        sort = "name"
+    direction = request.args.get("dir", "asc")
+    if direction not in _VALID_DIRS:
+        direction = "asc"
+    limit = request.args.get("limit", _API_DEFAULT_LIMIT, type=int)
+    limit = min(max(1, limit), _API_MAX_LIMIT)
+
+    try:
+        fields = parse_fields(request.args.get("fields"), _is_my_list)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        data = page_bottles_by_user(
+            user=user,
+            is_my_list=_is_my_list,
+            q=q,
+            types=types,
+            show_killed=show_killed,
+            sort=sort,
+            direction=direction,
+            cursor=request.args.get("cursor") or None,
+            limit=limit,
+        )
+    except InvalidCursor as e:
+        return jsonify({"error": str(e)}), 400
+
+    next_url = None
+    if data["next_cursor"]:
+        next_args = request.args.to_dict(flat=False)
+        next_args["cursor"] = data["next_cursor"]
+        next_url = url_for("bottle.list_json", username=user.username, **next_args)
+
+    return jsonify(
+        {
+            "bottles": [bottle_to_dict(b, fields) for b in data["bottles"]],
+            "next_cursor": data["next_cursor"],
+            "next": next_url,
+        }
+    )
 
 
 @bottle_bp.route("/<username:username>/bottle/random", endpoint="random")
@@ -138,6 +236,7 @@ def bottle_legacy(username: str, bottle_uuid: UUID):
 
 
 @bottle_bp.route("/<username:username>/bottle/<paddedint:user_num>", endpoint="detail")
+@conditional_on_collection
 def bottle(username: str, user_num: int):
     user = utils.get_user_or_404(username)
     utils.check_privacy(user)
@@ -151,7 +250,9 @@ def bottle(username: str, user_num: int):
             abort(404)
 
     g.bottle_og_image_url = (
-        f"{img_s3_url}/{_bottle.id}_1.jpg" if _bottle.images else url_for("static", filename="glen.png", _external=True)
+        f"{img_s3_url}/{_bottle.images[0].key}"
+        if _bottle.images and _bottle.images[0].is_ready
+        else url_for("static", filename="glen.png", _external=True)
     )
 
     return render_template(
@@ -165,6 +266,22 @@ def bottle(username: str, user_num: int):
     )
 
 
+@bottle_bp.route("/<username:username>/bottle/<paddedint:user_num>/images/status", endpoint="image_status")
+def bottle_image_status(username: str, user_num: int):
+    """How many of a bottle's images are still queued; the detail page polls this while any are."""
+    user = utils.get_user_or_404(username)
+    utils.check_privacy(user)
+    _bottle = db.one_or_404(db.select(Bottle).filter_by(user_id=user.id, user_num=user_num))
+    if _bottle.is_private and not (current_user.is_authenticated and _bottle.user_id == current_user.id):
+        abort(404)
+    pending = db.session.scalar(
+        db.select(func.count(BottleImage.id)).where(
+            BottleImage.bottle_id == _bottle.id, BottleImage.is_ready.is_(False)
+        )
+    )
+    return jsonify({"pending": pending})
+
+
 @bottle_bp.route("/bottle/add", methods=["GET", "POST"], endpoint="add")
 @login_required
 def bottle_add():
@@ -235,20 +352,37 @@ def bottle_edit(username: str, user_num: int):
 @bottle_bp.route("/bottle/scan-label", methods=["POST"], endpoint="scan_label")
 @login_required
 def bottle_scan_label():
-    if not current_user.is_pro:
-        if current_user.glen_scan_count >= current_app.config["FREE_TIER_SCAN_LIMIT"]:
-            return jsonify({"error": "scan_limit_reached"}), 403
     files = request.files.getlist("image")
     if not files:
         return jsonify({"error": "No image provided"}), 400
-    images = [(f.read(), f.mimetype or "image/jpeg") for f in files]
-    result = scan_bottle_label(images)
-    if result is None:
-        return jsonify({"error": "Scan failed"}), 502
-    if not current_user.is_pro:
-        current_user.glen_scan_count += 1
-        db.session.commit()
-    return jsonify(result)
+    try:
+        images = prepare_scan_images([(f.read(), f.mimetype or "image/jpeg") for f in files])
+    except (OSError, ValueError):
+        return jsonify({"error": "Unreadable image"}), 400
+    # a repeat of an earlier scan is answered straight away, and doesn't count toward the limit
+    cached = get_cached_scan(scan_cache_key(images))
+    if cached is not None:
+        return jsonify({"status": "done", "result": cached})
+    if scan_limit_reached(current_user):
+        return jsonify({"error": "scan_limit_reached"}), 403
+    job = start_label_scan(current_user, images)
+    if job is None:
+        return jsonify({"error": "busy"}), 503, {"Retry-After": "5"}
+    status_url = url_for("bottle.scan_label_status", job_id=job.id)
+    return jsonify({"job_id": job.id, "status_url": status_url}), 202, {"Location": status_url}
+
+
+@bottle_bp.route("/bottle/scan-label/<job_id>", methods=["GET"], endpoint="scan_label_status")
+@login_required
+def bottle_scan_label_status(job_id: str):
+    job = get_label_scan(current_user, job_id)
+    if job is None:
+        abort(404)
+    if job.status == job.DONE:
+        return jsonify({"status": job.status, "result": json.loads(job.result)})
+    if job.status == job.FAILED:
+        return jsonify({"status": job.status, "error": "Scan failed"})
+    return jsonify({"status": job.status})
 
 
 @bottle_bp.route("/<username:username>/bottle/<paddedint:user_num>/delete", endpoint="delete")
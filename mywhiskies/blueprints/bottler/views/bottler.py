@@ -6,6 +6,8 @@ from flask_login import current_user, login_required
 from markupsafe import Markup
 
 from mywhiskies.blueprints.bottler import bottler_bp
+from mywhiskies.common.conditional import conditional_on_collection
+from mywhiskies.common.query_budget import LIST_PAGE_QUERY_BUDGET, query_budget
 from mywhiskies.extensions import db
 from mywhiskies.forms.bottler import BottlerAddForm, BottlerEditForm, BottlerQuickAddForm
 from mywhiskies.models import Bottler, BottleTypes
@@ -16,6 +18,7 @@ from mywhiskies.services.bottler.bottler import (
     delete_bottler,
     edit_bottler,
     list_bottlers,
+    search_bottlers,
 )
 
 _VALID_SORTS = {"name", "bottles", "location"}
@@ -24,6 +27,8 @@ _VALID_PER_PAGE = {25, 50, 100, 10000}
 
 
 @bottler_bp.route("/<username:username>/bottlers", methods=["GET"], endpoint="list")
+@query_budget(LIST_PAGE_QUERY_BUDGET)
+@conditional_on_collection
 def bottlers(username: str):
     user = utils.get_user_or_404(username)
     utils.check_privacy(user)
@@ -88,6 +93,8 @@ def bottler_legacy(username: str, bottler_uuid: UUID):
     methods=["GET"],
     endpoint="detail",
 )
+@query_budget(LIST_PAGE_QUERY_BUDGET)
+@conditional_on_collection
 def bottler(username: str, user_num: int):
     user = utils.get_user_or_404(username)
     utils.check_privacy(user)
@@ -226,7 +233,7 @@ def bottler_quick_add():
             db.session.add(bottler)
             db.session.commit()
             response = make_response(render_template("bottler/_quick_add_success.html", name=bottler.name))
-            trigger = {"closeModal": {"id": "quickAddBottlerModal", "newId": str(bottler.id)}}
+            trigger = {"closeModal": {"id": "quickAddBottlerModal", "newId": str(bottler.id), "newName": bottler.name}}
             response.headers["HX-Trigger"] = json.dumps(trigger)
             return response
     return render_template("bottler/_quick_add_form.html", form=form)
@@ -239,6 +246,14 @@ def bottler_options():
     return jsonify([{"id": b.id, "name": b.name} for b in bottlers])
 
 
+@bottler_bp.route("/bottler/search", endpoint="search")
+@login_required
+def bottler_search():
+    q = request.args.get("q", "")
+    page = request.args.get("page", 1, type=int)
+    return jsonify(search_bottlers(current_user, q, page))
+
+
 @bottler_bp.route("/<username:username>/bottler/<paddedint:user_num>/delete", endpoint="delete")
 @login_required
 def bottler_delete(username: str, user_num: int):
@@ -1,11 +1,13 @@
 import json
 from uuid import UUID
 
-from flask import abort, current_app, flash, jsonify, make_response, redirect, render_template, request, url_for
+from flask import abort, jsonify, make_response, redirect, render_template, request, url_for
 from flask_login import current_user, login_required
 from markupsafe import Markup
 
 from mywhiskies.blueprints.distillery import distillery_bp
+from mywhiskies.common.conditional import conditional_on_collection
+from mywhiskies.common.query_budget import LIST_PAGE_QUERY_BUDGET, query_budget
 from mywhiskies.extensions import db
 from mywhiskies.forms.distillery import DistilleryAddForm, DistilleryEditForm, DistilleryQuickAddForm
 from mywhiskies.models import BottleTypes, Distillery
@@ -13,10 +15,11 @@ from mywhiskies.services import utils
 from mywhiskies.services.bottle.bottle import list_bottles_for_entity
 from mywhiskies.services.distillery.distillery import (
     add_distillery,
-    bulk_add_distillery,
     delete_distillery,
+    distillery_choices,
     edit_distillery,
     list_distilleries,
+    search_distilleries,
 )
 
 _VALID_SORTS = {"name", "bottles", "location"}
@@ -34,42 +37,9 @@ def no_distilleries():
     )
 
 
-@distillery_bp.route("/bulk_distillery_add")
-@login_required
-def bulk_distillery_add():
-    is_htmx = bool(request.headers.get("HX-Request"))
-
-    if len(current_user.distilleries) > 0:
-        if is_htmx:
-            return (
-                '<div class="plan-notice plan-notice--success">'
-                "<i class='bi bi-check-circle-fill'></i> You already have distilleries added."
-                "</div>"
-            )
-        return redirect(url_for("core.main"))
-
-    if not request.referrer and not is_htmx:
-        return redirect(url_for("core.main"))
-
-    bulk_add_distillery(current_user, current_app)
-
-    if is_htmx:
-        resp = make_response(
-            '<div class="plan-notice plan-notice--success" id="distillery-nudge">'
-            "<i class='bi bi-check-circle-fill'></i> "
-            "Distilleries added! Pick one from the list below."
-            "<button type='button' class='btn-close ms-auto' style='font-size:.7rem;' "
-            "aria-label='Dismiss' onclick=\"document.getElementById('distillery-nudge').remove()\"></button>"
-            "</div>"
-        )
-        resp.headers["HX-Trigger"] = "distilleryBulkAdded"
-        return resp
-
-    flash("New distilleries have been added to your account.")
-    return redirect(url_for("core.main"))
-
-
 @distillery_bp.route("/<username>/distilleries", methods=["GET"], endpoint="list")
+@query_budget(LIST_PAGE_QUERY_BUDGET)
+@conditional_on_collection
 def distilleries(username: str):
     user = utils.get_user_or_404(username)
     utils.check_privacy(user)
@@ -137,6 +107,8 @@ def distillery_legacy(username: str, distillery_uuid: UUID):
     methods=["GET"],
     endpoint="detail",
 )
+@query_budget(LIST_PAGE_QUERY_BUDGET)
+@conditional_on_collection
 def distillery_detail(username: str, user_num: int):
     user = utils.get_user_or_404(username)
     utils.check_privacy(user)
@@ -275,7 +247,9 @@ def distillery_quick_add():
             db.session.add(distillery)
             db.session.commit()
             response = make_response(render_template("distillery/_quick_add_success.html", name=distillery.name))
-            trigger = {"closeModal": {"id": "quickAddDistilleryModal", "newId": str(distillery.id)}}
+            trigger = {
+                "closeModal": {"id": "quickAddDistilleryModal", "newId": str(distillery.id), "newName": distillery.name}
+            }
             response.headers["HX-Trigger"] = json.dumps(trigger)
             return response
     return render_template("distillery/_quick_add_form.html", form=form)
@@ -284,8 +258,15 @@ def distillery_quick_add():
 @distillery_bp.route("/distillery/options", endpoint="options")
 @login_required
 def distillery_options():
-    distilleries = sorted(current_user.distilleries, key=lambda d: d.name.lower())
-    return jsonify([{"id": d.id, "name": d.name} for d in distilleries])
+    return jsonify([{"id": value, "name": name} for value, name in distillery_choices(current_user)])
+
+
+@distillery_bp.route("/distillery/search", endpoint="search")
+@login_required
+def distillery_search():
+    q = request.args.get("q", "")
+    page = request.args.get("page", 1, type=int)
+    return jsonify(search_distilleries(current_user, q, page))
 
 
 @distillery_bp.route("/distillery/<uuid:distillery_id>/rename", methods=["POST"], endpoint="rename")
@@ -1,12 +1,18 @@
+import os
 import re
+import time
 
-import boto3
 import click
 from flask import current_app
 from flask.cli import with_appcontext
 
+from mywhiskies.common.storage import get_storage
 from mywhiskies.extensions import db
-from mywhiskies.models import Bottle
+from mywhiskies.models import Bottle, User
+from mywhiskies.services.bottle.image import backfill_thumbnails
+from mywhiskies.services.bottle.scan_import import import_label_scans
+from mywhiskies.services.bottle.upload_queue import process_upload_jobs
+from mywhiskies.services.distillery.distillery import sync_distillery_catalog
 from mywhiskies.services.user.cleanup import delete_inactive_users, warn_inactive_users
 
 
@@ -27,7 +33,6 @@ def cleanup_inactive_users_command():
 @with_appcontext
 def audit_orphaned_images_command(delete):
     """Report (and optionally delete) S3 images with no matching bottle in the DB."""
-    bucket = current_app.config["BOTTLE_IMAGE_S3_BUCKET"]
     prefixes = [
         current_app.config["BOTTLE_IMAGE_S3_KEY"],
         current_app.config["BOTTLE_IMAGE_FULL_S3_KEY"],
@@ -35,18 +40,15 @@ def audit_orphaned_images_command(delete):
 
     valid_ids = {str(row[0]) for row in db.session.execute(db.select(Bottle.id)).all()}
 
-    s3 = boto3.client("s3")
+    storage = get_storage()
     pattern = re.compile(r"^[^/]+/([^_]+)_")
 
     orphans = []
     for prefix in prefixes:
-        paginator = s3.get_paginator("list_objects_v2")
-        for page in paginator.paginate(Bucket=bucket, Prefix=f"{prefix}/"):
-            for obj in page.get("Contents", []):
-                key = obj["Key"]
-                m = pattern.match(key)
-                if m and m.group(1) not in valid_ids:
-                    orphans.append(key)
+        for key in storage.list(f"{prefix}/"):
+            m = pattern.match(key)
+            if m and m.group(1) not in valid_ids:
+                orphans.append(key)
 
     if not orphans:
         click.echo("No orphaned images found.")
@@ -59,8 +61,84 @@ def audit_orphaned_images_command(delete):
     if delete:
         click.echo("\nDeleting...")
         for key in orphans:
-            s3.delete_object(Bucket=bucket, Key=key)
+            storage.delete(key)
             click.echo(f"  Deleted: {key}")
         click.echo(f"\nDeleted {len(orphans)} orphaned image(s).")
     else:
         click.echo("\nRun with --delete to remove them.")
+
+
+@click.command("sync-distillery-catalog")
+@click.option("--path", default=None, help="JSON file to load (default: static/data/base_distilleries.json).")
+@with_appcontext
+def sync_distillery_catalog_command(path):
+    """Load the shared distillery catalog and push changes to the distilleries linked to it."""
+    path = path or os.path.join(current_app.static_folder, "data", "base_distilleries.json")
+    added, updated = sync_distillery_catalog(path)
+    current_app.logger.info(f"Distillery catalog synced: {added} added, {updated} updated.")
+    click.echo(f"Added: {added}  Updated: {updated}")
+
+
+@click.command("process-image-uploads")
+@click.option("--watch", is_flag=True, default=False, help="Keep polling for new uploads instead of exiting.")
+@click.option("--interval", default=5.0, show_default=True, help="Seconds between polls with --watch.")
+@with_appcontext
+def process_image_uploads_command(watch, interval):
+    """Render and store queued bottle image uploads (for running workers outside the web process)."""
+    while True:
+        ran = process_upload_jobs()
+        if ran:
+            click.echo(f"Processed: {ran}")
+        if not watch:
+            break
+        time.sleep(interval)
+
+
+@click.command("backfill-image-thumbnails")
+@click.option("--limit", default=None, type=int, help="Stop after this many images (default: all).")
+@with_appcontext
+def backfill_image_thumbnails_command(limit):
+    """Generate WebP thumbnails for bottle images stored before thumbnails existed."""
+    generated, failed = backfill_thumbnails(limit)
+    current_app.logger.info(f"Thumbnail backfill complete: {generated} generated, {failed} failed.")
+    click.echo(f"Generated: {generated}  Failed: {failed}")
+
+
+@click.command("import-label-scans")
+@click.argument("username")
+@click.argument("directory", type=click.Path(exists=True, file_okay=False))
+@click.option("--concurrency", default=4, show_default=True, help="Scans in flight at once.")
+@click.option("--per-minute", default=30.0, show_default=True, help="Most scans started per minute (0: no limit).")
+@click.option("--batch-size", default=25, show_default=True, help="Bottles inserted per transaction.")
+@click.option("--checkpoint", default=None, help="Progress file (default: .label-scan-import.json in DIRECTORY).")
+@with_appcontext
+def import_label_scans_command(username, directory, concurrency, per_minute, batch_size, checkpoint):
+    """Add a private draft bottle for every label photo in DIRECTORY (a subdirectory is one bottle)."""
+    user = db.session.scalar(db.select(User).filter_by(username=username))
+    if user is None:
+        raise click.ClickException(f"No user named {username}")
+    checkpoint = checkpoint or os.path.join(directory, ".label-scan-import.json")
+    try:
+        result = import_label_scans(
+            user,
+            directory,
+            checkpoint,
+            concurrency=concurrency,
+            per_minute=per_minute,
+            batch_size=batch_size,
+            progress=click.echo,
+        )
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    current_app.logger.info(
+        f"Label scan import for {username}: {result.imported} imported, {len(result.failed)} failed."
+    )
+    click.echo(f"Imported: {result.imported}  Failed: {len(result.failed)}  Already imported: {result.skipped}")
+    if result.imported:
+        click.echo("Photos are queued for the upload workers (or run `flask process-image-uploads`).")
+    for name in result.failed:
+        click.echo(f"  failed: {name}")
+    if result.failed:
+        click.echo("Run the same command again to retry the failures.")
+    if result.held:
+        click.echo(f"Not scanned: {result.held}, the free tier's scan limit was reached.")
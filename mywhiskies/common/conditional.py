@@ -0,0 +1,64 @@
+import hashlib
+from functools import wraps
+
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+
+from mywhiskies.models import User
+from mywhiskies.services import utils
+
+
+def collection_etag(user: User) -> str:
+    """
+    Strong ETag for a page showing part of `user`'s collection.
+
+    Changes whenever the collection does (via `User.collection_version`), and whenever
+    anything else that feeds the page does: the URL and query string, full page vs HTMX
+    partial, who is viewing (the navbar and is_my_list depend on it) and the app version.
+    """
+    if current_user.is_authenticated:
+        viewer = (current_user.id, current_user.username, current_user.is_pro)
+    else:
+        viewer = ("anonymous",)
+    parts = (
+        request.full_path,
+        bool(request.headers.get("HX-Request")),
+        user.id,
+        user.collection_version,
+        viewer,
+        current_app.config.get("APP_VERSION"),
+    )
+    return hashlib.sha256(repr(parts).encode()).hexdigest()[:32]
+
+
+def conditional_on_collection(view):
+    """
+    Answer `If-None-Match` with 304 for pages of a user's collection that haven't changed,
+    before the view runs any of its queries or renders anything.
+
+    The view must take the collection owner's `username`; privacy is checked before any
+    ETag is computed. Responses with pending flash messages are never cached.
+    """
+
+    @wraps(view)
+    def wrapped(username: str, *args, **kwargs):
+        if session.get("_flashes"):
+            return view(username, *args, **kwargs)
+
+        user = utils.get_user_or_404(username)
+        utils.check_privacy(user)
+        etag = collection_etag(user)
+        if etag in request.if_none_match:
+            response = current_app.response_class(status=304)
+        else:
+            response = make_response(view(username, *args, **kwargs))
+            if response.status_code != 200:
+                return response
+
+        response.set_etag(etag)
+        response.vary.update(("Cookie", "HX-Request"))
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
+
+    return wrapped
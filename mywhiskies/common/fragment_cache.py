@@ -0,0 +1,121 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from flask import current_app
+
+
+class FragmentCache:
+    """
+    Cache of rendered HTML fragments.
+
+    Entries live in a per-process LRU capped at `max_bytes`, optionally backed by a directory
+    that every worker on the host shares. Keys are expected to include everything the fragment
+    depends on (in particular the owner's collection version), so entries are never invalidated,
+    only evicted; files in the shared directory are ignored and pruned once older than `ttl`.
+    """
+
+    _PRUNE_EVERY = 200
+
+    def __init__(self, max_bytes: int, directory: Optional[str] = None, ttl: int = 86400) -> None:
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._size = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+                return html
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                return None
+            with open(path, encoding="utf-8") as f:
+                html = f.read()
+        except OSError:
+            return None
+        self._remember(key, html)
+        return html
+
+    def set(self, key: str, html: str) -> None:
+        self._remember(key, html)
+        if self.directory:
+            self._write(key, html)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _remember(self, key: str, html: str) -> None:
+        size = len(html.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old.encode("utf-8"))
+            self._entries[key] = html
+            self._size += size
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted.encode("utf-8"))
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.html")
+
+    def _write(self, key: str, html: str) -> None:
+        # write-then-rename so another worker never reads a half-written fragment
+        try:
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(html)
+            os.replace(tmp, self._path(key))
+        except OSError:
+            current_app.logger.warning("Could not write fragment cache file", exc_info=True)
+            return
+        self._writes += 1
+        if self._writes % self._PRUNE_EVERY == 0:
+            self._prune()
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.ttl
+        for entry in os.scandir(self.directory):
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except OSError:
+                pass
+
+
+def get_fragment_cache() -> Optional[FragmentCache]:
+    """The app's fragment cache, or None when FRAGMENT_CACHE_MAX_BYTES is 0."""
+    return current_app.extensions.get("fragment_cache")
+
+
+def register_fragment_cache(app) -> None:
+    max_bytes = app.config.get("FRAGMENT_CACHE_MAX_BYTES", 0)
+    if max_bytes:
+        app.extensions["fragment_cache"] = FragmentCache(
+            max_bytes=max_bytes,
+            directory=app.config.get("FRAGMENT_CACHE_DIR"),
+            ttl=app.config.get("FRAGMENT_CACHE_TTL", 86400),
+        )
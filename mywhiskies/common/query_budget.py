@@ -0,0 +1,82 @@
+from functools import wraps
+from typing import Iterable, Iterator
+
+from flask import Response, current_app, g, has_app_context, request, stream_with_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Bottle list and entity detail pages: a fixed handful of statements however many rows they show.
+LIST_PAGE_QUERY_BUDGET = 12
+# A streamed list page: the eager loads (images, barrel pickers, distilleries) run once per fetched batch.
+STREAM_BATCH_QUERY_BUDGET = 3
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A view ran more SQL statements than its budget allows."""
+
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany) -> None:
+    if has_app_context():
+        g.sql_statement_count = g.get("sql_statement_count", 0) + 1
+
+
+def sql_statement_count() -> int:
+    """SQL statements executed so far in the current app context."""
+    return g.get("sql_statement_count", 0)
+
+
+def count_stream_batch() -> None:
+    """Record that a streamed result fetched another batch of rows; each one adds to the view's budget."""
+    if has_app_context():
+        g.stream_batch_count = g.get("stream_batch_count", 0) + 1
+
+
+def _check(used: int, budget: int) -> None:
+    if used > budget:
+        msg = f"{request.endpoint} ran {used} SQL statements (budget {budget})"
+        if current_app.config.get("STRICT_SQL_CHECKS"):
+            raise QueryBudgetExceeded(msg)
+        current_app.logger.warning(msg)
+
+
+def _checked_stream(body: Iterable, used: int, max_statements: int, per_stream_batch: int) -> Iterator:
+    # runs inside the request context (see stream_with_context), which may bring a fresh `g`,
+    # so count from here and add what the view itself ran
+    start, batches = sql_statement_count(), g.get("stream_batch_count", 0)
+    yield from body
+    batches = g.get("stream_batch_count", 0) - batches
+    _check(used + sql_statement_count() - start, max_statements + per_stream_batch * batches)
+
+
+def query_budget(max_statements: int, per_stream_batch: int = 0):
+    """
+    Cap the number of SQL statements a view (including its template rendering) may run.
+
+    A streamed response is checked once its body has been sent, as its rows are fetched while
+    rendering; each batch it fetched (see count_stream_batch) allows `per_stream_batch` more.
+
+    Over budget is logged as a warning, or raised as QueryBudgetExceeded when
+    STRICT_SQL_CHECKS is set, which is how the tests catch N+1 regressions.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            start = sql_statement_count()
+            rv = view(*args, **kwargs)
+            used = sql_statement_count() - start
+            if isinstance(rv, Response) and rv.is_streamed:
+                rv.response = stream_with_context(_checked_stream(rv.response, used, max_statements, per_stream_batch))
+            else:
+                _check(used, max_statements)
+            return rv
+
+        return wrapped
+
+    return decorator
+
+
+def register_query_budget(app) -> None:
+    """Count SQL statements per app context so views can be held to a query_budget."""
+    if not event.contains(Engine, "before_cursor_execute", _count_statement):
+        event.listen(Engine, "before_cursor_execute", _count_statement)
@@ -0,0 +1,247 @@
+import os
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
+from flask import current_app, send_from_directory
+
+# (key, data, content type)
+StoredObject = Tuple[str, bytes, str]
+
+
+class StorageError(Exception):
+    """A storage backend call failed (missing object, network error, full disk, ...)."""
+
+
+class Storage(ABC):
+    """
+    A storage backend: put, get, delete and list objects by key, raising StorageError on failure.
+
+    The bulk operations are built on put/delete, one object at a time. They never stop at the
+    first failure: every object is attempted, and failures are returned by key so the caller
+    can decide which ones matter.
+    """
+
+    @abstractmethod
+    def put(self, key: str, data: bytes, content_type: str, cache_control: Optional[str] = None) -> None:
+        """Store `data` under `key`, replacing whatever was there."""
+
+    @abstractmethod
+    def get(self, key: str) -> bytes:
+        """The object stored under `key`."""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Delete the object under `key`; a missing object is not an error."""
+
+    @abstractmethod
+    def list(self, prefix: str) -> Iterator[str]:
+        """Keys of every stored object that starts with `prefix`."""
+
+    def put_many(self, objects: Sequence[StoredObject], cache_control: Optional[str] = None) -> Dict[str, str]:
+        """Store every object; returns {key: error} for those that failed."""
+        failures = {}
+        for key, data, content_type in objects:
+            try:
+                self.put(key, data, content_type, cache_control)
+            except StorageError as e:
+                failures[key] = str(e)
+        return failures
+
+    def delete_many(self, keys: Sequence[str]) -> Dict[str, str]:
+        """Delete every key (missing ones are not an error); returns {key: error} for those that failed."""
+        failures = {}
+        for key in keys:
+            try:
+                self.delete(key)
+            except StorageError as e:
+                failures[key] = str(e)
+        return failures
+
+
+class S3Storage(Storage):
+    """
+    Objects in an S3 bucket.
+
+    One client is shared by every thread in the process: boto3 clients are thread-safe, and
+    reusing one keeps its credentials and its pool of keep-alive connections instead of paying
+    for both on every request. It is created on first use, and again after a fork, along with
+    the bounded thread pool that runs bulk operations concurrently.
+    """
+
+    # most keys one DeleteObjects call accepts
+    DELETE_BATCH = 1000
+
+    def __init__(self, bucket: str, url: str, max_pool_connections: int = 50, max_concurrency: int = 16) -> None:
+        self.bucket = bucket
+        self.url = url
+        self.max_pool_connections = max_pool_connections
+        self.max_concurrency = max_concurrency
+        self._client = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _start(self) -> None:
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._client = boto3.client(
+                        "s3",
+                        config=Config(
+                            max_pool_connections=self.max_pool_connections,
+                            retries={"mode": "standard", "max_attempts": 3},
+                            tcp_keepalive=True,
+                        ),
+                    )
+                    self._executor = ThreadPoolExecutor(self.max_concurrency, thread_name_prefix="s3")
+                    self._pid = os.getpid()
+
+    @property
+    def client(self):
+        self._start()
+        return self._client
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        self._start()
+        return self._executor
+
+    def put(self, key: str, data: bytes, content_type: str, cache_control: Optional[str] = None) -> None:
+        extra = {"CacheControl": cache_control} if cache_control else {}
+        try:
+            self.client.put_object(Bucket=self.bucket, Key=key, Body=data, ContentType=content_type, **extra)
+        except (ClientError, BotoCoreError) as e:
+            raise StorageError(str(e)) from e
+
+    def get(self, key: str) -> bytes:
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+        except (ClientError, BotoCoreError) as e:
+            raise StorageError(str(e)) from e
+
+    def delete(self, key: str) -> None:
+        try:
+            self.client.delete_object(Bucket=self.bucket, Key=key)
+        except (ClientError, BotoCoreError) as e:
+            raise StorageError(str(e)) from e
+
+    def list(self, prefix: str) -> Iterator[str]:
+        try:
+            for page in self.client.get_paginator("list_objects_v2").paginate(Bucket=self.bucket, Prefix=prefix):
+                for obj in page.get("Contents", []):
+                    yield obj["Key"]
+        except (ClientError, BotoCoreError) as e:
+            raise StorageError(str(e)) from e
+
+    def put_many(self, objects: Sequence[StoredObject], cache_control: Optional[str] = None) -> Dict[str, str]:
+        """Store every object concurrently; returns {key: error} for those that failed."""
+
+        def put(obj: StoredObject) -> Optional[str]:
+            try:
+                self.put(*obj, cache_control)
+            except StorageError as e:
+                return str(e)
+            return None
+
+        errors = self.executor.map(put, objects)
+        return {key: error for (key, _, _), error in zip(objects, errors) if error}
+
+    def delete_many(self, keys: Sequence[str]) -> Dict[str, str]:
+        """Delete keys in DeleteObjects batches, run concurrently; returns {key: error} for those that failed."""
+
+        def delete_batch(batch: Sequence[str]) -> Dict[str, str]:
+            try:
+                response = self.client.delete_objects(
+                    Bucket=self.bucket, Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True}
+                )
+            except (ClientError, BotoCoreError) as e:
+                return {key: str(e) for key in batch}
+            return {error["Key"]: error.get("Message", error.get("Code", "")) for error in response.get("Errors", [])}
+
+        batches = [keys[i : i + self.DELETE_BATCH] for i in range(0, len(keys), self.DELETE_BATCH)]
+        failures = {}
+        for batch_failures in self.executor.map(delete_batch, batches):
+            failures.update(batch_failures)
+        return failures
+
+
+class LocalStorage(Storage):
+    """
+    Objects as files under `root`, served by the app itself at `url` (see register_storage).
+
+    For development and tests: images can be uploaded, listed and viewed without AWS.
+    """
+
+    def __init__(self, root: str, url: str) -> None:
+        self.root = root
+        self.url = url
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        path = os.path.normpath(os.path.join(self.root, key))
+        if not path.startswith(os.path.normpath(self.root) + os.sep):
+            raise StorageError(f"Invalid key: {key}")
+        return path
+
+    def put(self, key: str, data: bytes, content_type: str, cache_control: Optional[str] = None) -> None:
+        path = self._path(key)
+        # write-then-rename so a reader never sees a half-written file
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError as e:
+            raise StorageError(str(e)) from e
+
+    def get(self, key: str) -> bytes:
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except OSError as e:
+            raise StorageError(str(e)) from e
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            raise StorageError(str(e)) from e
+
+    def list(self, prefix: str) -> Iterator[str]:
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                key = os.path.relpath(os.path.join(dirpath, filename), self.root).replace(os.sep, "/")
+                if key.startswith(prefix) and not key.endswith(".tmp"):
+                    yield key
+
+
+def get_storage():
+    """The app's image storage backend (S3Storage or LocalStorage, per IMAGE_STORAGE)."""
+    return current_app.extensions["storage"]
+
+
+def register_storage(app) -> None:
+    if app.config.get("IMAGE_STORAGE", "s3") == "local":
+        root = app.config.get("IMAGE_STORAGE_DIR") or os.path.join(app.instance_path, "images")
+        app.extensions["storage"] = LocalStorage(root, url="/media")
+
+        @app.route("/media/<path:key>", endpoint="media")
+        def media(key: str):
+            return send_from_directory(get_storage().root, key, max_age=31536000)
+
+    else:
+        app.extensions["storage"] = S3Storage(
+            bucket=app.config["BOTTLE_IMAGE_S3_BUCKET"],
+            url=app.config["BOTTLE_IMAGE_S3_URL"],
+            max_pool_connections=app.config.get("S3_MAX_POOL_CONNECTIONS", 50),
+            max_concurrency=app.config.get("S3_MAX_CONCURRENCY", 16),
+        )
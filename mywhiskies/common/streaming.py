@@ -0,0 +1,29 @@
+from typing import Iterable, Iterator
+
+from flask import Response, stream_template
+
+# Jinja yields a piece per template node; coalesce them so the socket sees a few large writes.
+STREAM_CHUNK_BYTES = 16 * 1024
+
+
+def _coalesce(pieces: Iterable[str], chunk_bytes: int) -> Iterator[str]:
+    buffer, size = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunk_bytes:
+            yield "".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def stream_template_response(template_name: str, chunk_bytes: int = STREAM_CHUNK_BYTES, **context) -> Response:
+    """
+    Render `template_name` incrementally, sending it in chunks of about `chunk_bytes` as rendering
+    proceeds, so the head of the page goes out before the body has finished rendering.
+
+    Any generators in `context` are consumed as the template reaches them, inside the request
+    context, so rows can still be loaded lazily while the response is being sent.
+    """
+    return Response(_coalesce(stream_template(template_name, **context), chunk_bytes), mimetype="text/html")
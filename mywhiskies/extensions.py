@@ -18,12 +18,17 @@ def register_extensions(app):
         Bottle,
         BottleImage,
         Bottler,
+        CatalogDistillery,
         Distillery,
+        ImageUploadJob,
+        LabelScanCache,
+        LabelScanJob,
         PasskeyCredential,
         User,
         UserLogin,
         bottle_barrel_picker,
         bottle_distillery,
+        user_num_counter,
     )
 
     db.init_app(app)
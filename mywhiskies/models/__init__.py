@@ -1,8 +1,8 @@
 from .barrel_picker import BarrelPicker
-from .bottle import Bottle, BottleImage, BottleTypes
+from .bottle import Bottle, BottleImage, BottleTypes, ImageUploadJob, LabelScanCache, LabelScanJob
 from .bottler import Bottler
-from .core import bottle_barrel_picker, bottle_distillery
-from .distillery import Distillery
+from .core import bottle_barrel_picker, bottle_distillery, user_num_counter
+from .distillery import CatalogDistillery, Distillery
 from .user import PasskeyCredential, User, UserLogin
 
 __all__ = [
@@ -10,6 +10,10 @@ __all__ = [
     "Bottle",
     "BottleImage",
     "BottleTypes",
+    "CatalogDistillery",
+    "ImageUploadJob",
+    "LabelScanCache",
+    "LabelScanJob",
     "PasskeyCredential",
     "User",
     "UserLogin",
@@ -17,4 +21,5 @@ __all__ = [
     "Bottler",
     "bottle_barrel_picker",
     "bottle_distillery",
+    "user_num_counter",
 ]
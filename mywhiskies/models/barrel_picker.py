@@ -1,12 +1,11 @@
 import uuid
 from typing import TYPE_CHECKING, List, Optional
 
-import sqlalchemy as sa
 from sqlalchemy import ForeignKey, String, Text, UniqueConstraint, event
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy.orm import Session as OrmSession
 
 from mywhiskies.extensions import db
+from mywhiskies.models.core import add_name_match_indexes, assign_user_num, mark_collection_changed
 
 if TYPE_CHECKING:
     from mywhiskies.models import Bottle, User
@@ -35,36 +34,25 @@ class BarrelPicker(db.Model):
     )
 
 
+add_name_match_indexes(BarrelPicker)
+
+
 @event.listens_for(BarrelPicker, "before_insert")
 def barrel_picker_before_insert(mapper, connect, target) -> None:
     clean_barrel_picker_data(target)
-    result = connect.execute(
-        sa.text("SELECT COALESCE(MAX(user_num), 0) FROM barrel_picker WHERE user_id = :uid"),
-        {"uid": target.user_id},
-    )
-    db_max = result.scalar()
-    session = OrmSession.object_session(target)
-    pending_max = (
-        max(
-            (
-                obj.user_num
-                for obj in session.new
-                if isinstance(obj, BarrelPicker)
-                and obj.user_id == target.user_id
-                and obj is not target
-                and obj.user_num is not None
-            ),
-            default=0,
-        )
-        if session is not None
-        else 0
-    )
-    target.user_num = max(db_max, pending_max) + 1
+    mark_collection_changed(target)
+    assign_user_num(connect, target)
 
 
 @event.listens_for(BarrelPicker, "before_update")
 def barrel_picker_before_update(mapper, connect, target) -> None:
     clean_barrel_picker_data(target)
+    mark_collection_changed(target)
+
+
+@event.listens_for(BarrelPicker, "before_delete")
+def barrel_picker_before_delete(mapper, connect, target) -> None:
+    mark_collection_changed(target)
 
 
 def clean_barrel_picker_data(target) -> None:
@@ -10,10 +10,21 @@ from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.orm import Session as OrmSession
 
 from mywhiskies.extensions import db
-from mywhiskies.models.core import bottle_barrel_picker, bottle_distillery  # noqa: F401
+from mywhiskies.models.barrel_picker import BarrelPicker
+from mywhiskies.models.bottler import Bottler
+from mywhiskies.models.core import (  # noqa: F401
+    assign_user_num,
+    bottle_barrel_picker,
+    bottle_distillery,
+    mark_collection_changed,
+)
+from mywhiskies.models.distillery import Distillery
 
 if TYPE_CHECKING:
-    from mywhiskies.models import BarrelPicker, Bottler, Distillery, User
+    from mywhiskies.models import User
+
+# Smart quotes/apostrophes and their ASCII equivalents. iOS keyboards insert the curly variants.
+_QUOTE_FOLDS = str.maketrans({"‘": "'", "’": "'", "“": '"', "”": '"'})
 
 
 class BottleTypes(enum.Enum):
@@ -35,20 +46,109 @@ class BottleImage(db.Model):
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     bottle_id: Mapped[str] = mapped_column(ForeignKey("bottle.id"))
     sequence: Mapped[int]
+    # Object name in the image buckets, fixed when the image is created (see assign_image_key), so
+    # reordering never moves files and their URLs can be cached forever.
+    key: Mapped[str] = mapped_column(String(100))
     created_at: Mapped[datetime] = mapped_column(default=lambda: datetime.now(timezone.utc))
+    # False while the upload is queued; pages show a placeholder until a worker has stored it
+    is_ready: Mapped[bool] = mapped_column(default=True, server_default=sa.text("true"), nullable=False)
+    # True once WebP thumbnails of each THUMBNAIL_WIDTHS width are stored next to the display JPEG
+    has_thumbnails: Mapped[bool] = mapped_column(default=False, server_default=sa.text("false"), nullable=False)
 
     bottle: Mapped["Bottle"] = relationship("Bottle", back_populates="images")
+    upload_job: Mapped[Optional["ImageUploadJob"]] = relationship(
+        back_populates="image", cascade="all, delete-orphan", passive_deletes=True
+    )
+
+    __table_args__ = (
+        sa.UniqueConstraint("bottle_id", "sequence", name="_bottle_sequence_uc"),
+        sa.UniqueConstraint("key", name="uq_bottle_image_key"),
+    )
+
+    THUMBNAIL_WIDTHS = (160, 400)
+
+    def thumbnail_key(self, width: int) -> str:
+        return f"{self.key.rsplit('.', 1)[0]}_{width}w.webp"
+
+    @property
+    def thumbnail_keys(self) -> List[str]:
+        return [self.thumbnail_key(width) for width in self.THUMBNAIL_WIDTHS]
+
+
+class ImageUploadJob(db.Model):
+    """
+    A queued upload: the original file, waiting for a worker to render and store it.
+
+    `run_at` is when the job may next be claimed. Claiming pushes it out by a lease, so a
+    job whose worker died is picked up again; a failed attempt pushes it out by the backoff.
+    """
+
+    __tablename__ = "image_upload_job"
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    image_id: Mapped[str] = mapped_column(ForeignKey("bottle_image.id", ondelete="CASCADE"), unique=True)
+    # sized so MySQL makes it a LONGBLOB; a plain BLOB tops out at 64 KB
+    data: Mapped[bytes] = mapped_column(sa.LargeBinary(length=2**32 - 1))
+    is_pro: Mapped[bool] = mapped_column(default=False)
+    attempts: Mapped[int] = mapped_column(default=0)
+    run_at: Mapped[datetime] = mapped_column(default=lambda: datetime.now(timezone.utc), index=True)
+    last_error: Mapped[Optional[str]] = mapped_column(Text)
+    created_at: Mapped[datetime] = mapped_column(default=lambda: datetime.now(timezone.utc))
+
+    image: Mapped["BottleImage"] = relationship(back_populates="upload_job")
+
+
+class LabelScanJob(db.Model):
+    """
+    A label scan submitted to run in the background; the client polls it until it's done or failed.
+
+    The images themselves never touch the database: they are handed straight to the scan
+    runner in the process that accepted them.
+    """
+
+    __tablename__ = "label_scan_job"
+    PENDING, DONE, FAILED = "pending", "done", "failed"
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id: Mapped[str] = mapped_column(ForeignKey("user.id", ondelete="CASCADE"), index=True)
+    status: Mapped[str] = mapped_column(String(10), default=PENDING)
+    # the extracted fields as JSON, once done
+    result: Mapped[Optional[str]] = mapped_column(Text)
+    created_at: Mapped[datetime] = mapped_column(default=lambda: datetime.now(timezone.utc))
+    finished_at: Mapped[Optional[datetime]]
+
 
-    __table_args__ = (sa.UniqueConstraint("bottle_id", "sequence", name="_bottle_sequence_uc"),)
+class LabelScanCache(db.Model):
+    """A label scan's result, keyed by a hash of the images scanned and the prompt they were scanned with."""
+
+    __tablename__ = "label_scan_cache"
+
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    result: Mapped[str] = mapped_column(Text)
+    created_at: Mapped[datetime] = mapped_column(default=lambda: datetime.now(timezone.utc))
+    # when the entry last answered a scan; the least recently used go first when the cache is full
+    used_at: Mapped[datetime] = mapped_column(default=lambda: datetime.now(timezone.utc), index=True)
 
 
 class Bottle(db.Model):
     __tablename__ = "bottle"
-    __table_args__ = (UniqueConstraint("user_id", "user_num", name="uq_bottle_user_num"),)
+    __table_args__ = (
+        UniqueConstraint("user_id", "user_num", name="uq_bottle_user_num"),
+        # duplicate bottles are grouped per user by (group_key, type)
+        sa.Index("ix_bottle_user_group_key_type", "user_id", "group_key", "type"),
+        # Postgres-only: a trigram index answers the search box's substring match
+        sa.Index(
+            "ix_bottle_search_text_trgm",
+            "search_text",
+            postgresql_using="gin",
+            postgresql_ops={"search_text": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     date_created: Mapped[datetime] = mapped_column(default=lambda: datetime.now(timezone.utc))
     name: Mapped[str] = mapped_column(String(100))
+    # normalized name that duplicate bottles are grouped on; see clean_bottle_data
+    group_key: Mapped[str] = mapped_column(String(100))
     user_num: Mapped[int]
     type: Mapped[BottleTypes]
     abv: Mapped[Optional[decimal.Decimal]] = mapped_column(Numeric(6, 4))
@@ -66,6 +166,8 @@ class Bottle(db.Model):
     is_private: Mapped[bool] = mapped_column(default=False, server_default=sa.text("false"), nullable=False)
     is_single_barrel: Mapped[bool] = mapped_column(default=False, server_default=sa.text("false"), nullable=False)
     personal_note: Mapped[Optional[str]] = mapped_column(Text)
+    # folded name, description, bottler, distilleries and barrel pickers; see refresh_bottle_search_text
+    search_text: Mapped[Optional[str]] = mapped_column(Text)
 
     # foreign keys
     user_id: Mapped[str] = mapped_column(ForeignKey("user.id"))
@@ -108,40 +210,53 @@ class Bottle(db.Model):
         return next((img for img in self.images if img.sequence == sequence), None)
 
 
+# gin_trgm_ops needs the pg_trgm extension before the bottle table's indexes can be created
+event.listen(
+    Bottle.__table__,
+    "before_create",
+    sa.DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
+
+@event.listens_for(BottleImage, "before_insert")
+def assign_image_key(mapper, connect, target) -> None:
+    if not target.key:
+        target.key = f"{target.bottle_id}_{uuid.uuid4().hex}.jpg"
+
+
+@event.listens_for(BottleImage, "before_insert")
+@event.listens_for(BottleImage, "before_update")
+@event.listens_for(BottleImage, "before_delete")
+def bottle_image_changed(mapper, connect, target) -> None:
+    mark_collection_changed(target)
+
+
 @event.listens_for(Bottle, "before_insert")
 def bottle_before_insert(mapper, connect, target) -> None:
     clean_bottle_data(target)
-    result = connect.execute(
-        sa.text("SELECT COALESCE(MAX(user_num), 0) FROM bottle WHERE user_id = :uid"),
-        {"uid": target.user_id},
-    )
-    db_max = result.scalar()
-    session = OrmSession.object_session(target)
-    pending_max = (
-        max(
-            (
-                obj.user_num
-                for obj in session.new
-                if isinstance(obj, Bottle)
-                and obj.user_id == target.user_id
-                and obj is not target
-                and obj.user_num is not None
-            ),
-            default=0,
-        )
-        if session is not None
-        else 0
-    )
-    target.user_num = max(db_max, pending_max) + 1
+    mark_collection_changed(target)
+    assign_user_num(connect, target)
 
 
 @event.listens_for(Bottle, "before_update")
 def bottle_before_update(mapper, connect, target) -> None:
     clean_bottle_data(target)
+    mark_collection_changed(target)
+
+
+@event.listens_for(Bottle, "before_delete")
+def bottle_before_delete(mapper, connect, target) -> None:
+    mark_collection_changed(target)
+
+
+def bottle_group_key(name: str) -> str:
+    """Key that bottles of the same name are grouped on in the collection lists."""
+    return name.strip().lower()
 
 
 def clean_bottle_data(target) -> None:
     target.name = target.name.strip()
+    target.group_key = bottle_group_key(target.name)
     target.size = target.size if target.size else None
     target.year_barrelled = target.year_barrelled if target.year_barrelled else None
     target.year_bottled = target.year_bottled if target.year_bottled else None
@@ -149,3 +264,34 @@ def clean_bottle_data(target) -> None:
     target.description = target.description.strip() if target.description else None
     target.review = target.review.strip() if target.review else None
     target.stars = target.stars if target.stars else None
+
+
+def fold_search_text(value: str) -> str:
+    """Lowercase and replace smart quotes so searches match however the text was typed."""
+    return value.lower().translate(_QUOTE_FOLDS)
+
+
+def build_search_text(bottle: Bottle, session: OrmSession) -> str:
+    """Everything the collection search box matches against, folded into a single string."""
+    bottler = session.get(Bottler, bottle.bottler_id) if bottle.bottler_id else None
+    parts = [bottle.name, bottle.description, bottler.name if bottler else None]
+    # sorted, so the text doesn't depend on the order the links load in
+    parts += sorted(d.name for d in bottle.distilleries)
+    parts += sorted(p.name for p in bottle.barrel_pickers)
+    # newline-separated so a search term can never match across two fields
+    return fold_search_text("\n".join(p.strip() for p in parts if p))
+
+
+@event.listens_for(OrmSession, "before_flush")
+def refresh_bottle_search_text(session, flush_context, instances) -> None:
+    """Keep `Bottle.search_text` current when a bottle or the name of anything linked to it changes."""
+    bottles = {obj for obj in session.new | session.dirty if isinstance(obj, Bottle)}
+    for obj in session.dirty:
+        if isinstance(obj, (BarrelPicker, Bottler, Distillery)) and sa.inspect(obj).attrs.name.history.has_changes():
+            bottles.update(obj.bottles)
+    for bottle in bottles:
+        if bottle.name is None:
+            continue
+        search_text = build_search_text(bottle, session)
+        if bottle.search_text != search_text:
+            bottle.search_text = search_text
@@ -1,4 +1,8 @@
-from sqlalchemy import Column, ForeignKey
+from sqlalchemy import Column, ForeignKey, Index, Integer, String, event, func, literal, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session as OrmSession
+from sqlalchemy.orm import object_session
+from sqlalchemy.sql.elements import Grouping
 
 from mywhiskies.extensions import db
 
@@ -14,3 +18,140 @@ bottle_barrel_picker = db.Table(
     Column("bottle_id", ForeignKey("bottle.id"), primary_key=True),
     Column("barrel_picker_id", ForeignKey("barrel_picker.id"), primary_key=True),
 )
+
+# Last user_num handed out per (user, table). Rows are created on first use, seeded from the table's MAX(user_num).
+user_num_counter = db.Table(
+    "user_num_counter",
+    Column("user_id", ForeignKey("user.id", ondelete="CASCADE"), primary_key=True),
+    Column("entity", String(32), primary_key=True),
+    Column("last_num", Integer, nullable=False),
+)
+
+_USER_NUM_POOLS = "user_num_pools"
+
+
+def add_name_match_indexes(model, scoped: bool = True) -> None:
+    """
+    Index `model`'s name for services.utils.name_match_clause: lower(name), after user_id when
+    `scoped`, for prefix matches (text_pattern_ops so Postgres uses it for LIKE whatever the
+    collation), and on Postgres a trigram index on lower(name) for the start-of-a-word matches.
+
+    The lower(name) key part is parenthesized, as MySQL requires of an expression in an index;
+    Postgres and SQLite accept it as well.
+    """
+    table = model.__table__
+    lower_name = Grouping(func.lower(table.c.name)).label("lower_name")
+    columns = (table.c.user_id, lower_name) if scoped else (lower_name,)
+    Index(f"ix_{table.name}_lower_name", *columns, postgresql_ops={"lower_name": "text_pattern_ops"})
+    Index(
+        f"ix_{table.name}_lower_name_trgm",
+        func.lower(table.c.name).label("lower_name"),
+        postgresql_using="gin",
+        postgresql_ops={"lower_name": "gin_trgm_ops"},
+    ).ddl_if(dialect="postgresql")
+
+
+def _bump_user_num_counter(connection, user_id: str, entity: str, count: int):
+    """Add `count` to the counter row and return its new value, or None if the row doesn't exist yet."""
+    key = (user_num_counter.c.user_id == user_id, user_num_counter.c.entity == entity)
+    bump = update(user_num_counter).where(*key).values(last_num=user_num_counter.c.last_num + count)
+    if connection.dialect.update_returning:
+        return connection.execute(bump.returning(user_num_counter.c.last_num)).scalar()
+    if connection.execute(bump).rowcount == 0:
+        return None
+    # the UPDATE holds the row lock until commit, so this read can't see anyone else's bump
+    return connection.execute(select(user_num_counter.c.last_num).where(*key)).scalar()
+
+
+def _reserve_user_nums(connection, table, user_id: str, count: int) -> int:
+    """Atomically reserve `count` consecutive user_nums for `user_id` in `table`; returns the first."""
+    last = _bump_user_num_counter(connection, user_id, table.name, count)
+    if last is None:
+        seed = select(
+            literal(user_id, String(36)),
+            literal(table.name, String(32)),
+            func.coalesce(func.max(table.c.user_num), 0),
+        ).where(table.c.user_id == user_id)
+        columns = ["user_id", "entity", "last_num"]
+        insert = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}.get(connection.dialect.name)
+        # two first-time allocations can race to create the row; the loser just bumps the winner's
+        if insert is not None:
+            stmt = insert(user_num_counter).from_select(columns, seed).on_conflict_do_nothing()
+        else:
+            stmt = user_num_counter.insert().from_select(columns, seed).prefix_with("IGNORE", dialect="mysql")
+        connection.execute(stmt)
+        last = _bump_user_num_counter(connection, user_id, table.name, count)
+    return last - count + 1
+
+
+def assign_user_num(connection, target) -> None:
+    """
+    Give a pending bottle, distillery, bottler or barrel picker the next number in its owner's sequence.
+
+    The first call in a flush reserves numbers for every pending object of the same class and owner
+    with one UPDATE; later calls take the next number from that reservation, so a flush of n objects
+    costs one round trip rather than n, and concurrent flushes can never hand out the same number.
+    """
+    cls = type(target)
+    session = object_session(target)
+    pools = session.info.setdefault(_USER_NUM_POOLS, {}) if session is not None else {}
+    pool_key = (cls.__table__.name, target.user_id)
+    next_num, end = pools.get(pool_key, (0, 0))
+    if next_num >= end:
+        pending = 1
+        if session is not None:
+            pending = sum(1 for obj in session.new if type(obj) is cls and obj.user_id == target.user_id) or 1
+        next_num = _reserve_user_nums(connection, cls.__table__, target.user_id, pending)
+        end = next_num + pending
+    target.user_num = next_num
+    pools[pool_key] = (next_num + 1, end)
+
+
+_CHANGED_USERS = "collection_changed_users"
+_CHANGED_BOTTLES = "collection_changed_bottles"
+
+
+def mark_collection_changed(target) -> None:
+    """
+    Record that `target` (a bottle, bottle image, distillery, bottler or barrel picker) was written,
+    so its owner's `User.collection_version` is bumped once at the end of the flush.
+    """
+    session = object_session(target)
+    if session is None:
+        return
+    if getattr(target, "user_id", None):
+        session.info.setdefault(_CHANGED_USERS, set()).add(target.user_id)
+    elif getattr(target, "bottle_id", None):
+        session.info.setdefault(_CHANGED_BOTTLES, set()).add(target.bottle_id)
+
+
+@event.listens_for(OrmSession, "after_flush_postexec")
+@event.listens_for(OrmSession, "after_soft_rollback")
+def discard_user_num_pools(session, *args) -> None:
+    # reservations only live for one flush; numbers left over after a failed flush went back with the rollback
+    session.info.pop(_USER_NUM_POOLS, None)
+
+
+@event.listens_for(OrmSession, "after_flush_postexec")
+def bump_collection_versions(session, flush_context) -> None:
+    user_ids = session.info.pop(_CHANGED_USERS, set())
+    bottle_ids = session.info.pop(_CHANGED_BOTTLES, set())
+    if not (user_ids or bottle_ids):
+        return
+
+    from mywhiskies.models.bottle import Bottle
+    from mywhiskies.models.user import User
+
+    conn = session.connection()
+    if bottle_ids:
+        user_ids |= set(conn.execute(select(Bottle.user_id).where(Bottle.id.in_(bottle_ids))).scalars())
+    # one UPDATE per flush, incremented in the database so concurrent writers never lose a bump
+    conn.execute(
+        update(User.__table__)
+        .where(User.__table__.c.id.in_(user_ids))
+        .values(collection_version=User.__table__.c.collection_version + 1)
+    )
+    for user_id in user_ids:
+        user = session.identity_map.get(session.identity_key(User, user_id))
+        if user is not None:
+            session.expire(user, ["collection_version"])
@@ -1,20 +1,44 @@
 import uuid
 from typing import TYPE_CHECKING, List, Optional
 
-import sqlalchemy as sa
-from sqlalchemy import ForeignKey, String, Text, UniqueConstraint, event
+from sqlalchemy import ForeignKey, String, Text, UniqueConstraint, event, inspect, select
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy.orm import Session as OrmSession
 
 from mywhiskies.extensions import db
+from mywhiskies.models.core import add_name_match_indexes, assign_user_num, mark_collection_changed
 
 if TYPE_CHECKING:
     from mywhiskies.models import Bottle, User
 
 
+# the fields a linked distillery shares with its catalog entry
+CATALOG_FIELDS = ("name", "description", "region_1", "region_2", "url")
+
+
+class CatalogDistillery(db.Model):
+    """
+    A distillery in the shared reference catalog that every user can pick from.
+
+    Users don't get a copy of the catalog. A user's Distillery row linked to an entry is
+    only created the first time they put that distillery on a bottle.
+    """
+
+    __tablename__ = "catalog_distillery"
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    name: Mapped[str] = mapped_column(String(65), unique=True)
+    description: Mapped[Optional[str]] = mapped_column(Text)
+    region_1: Mapped[str] = mapped_column(String(36))
+    region_2: Mapped[str] = mapped_column(String(36))
+    url: Mapped[Optional[str]] = mapped_column(String(64))
+
+
 class Distillery(db.Model):
     __tablename__ = "distillery"
-    __table_args__ = (UniqueConstraint("user_id", "user_num", name="uq_distillery_user_num"),)
+    __table_args__ = (
+        UniqueConstraint("user_id", "user_num", name="uq_distillery_user_num"),
+        UniqueConstraint("user_id", "catalog_id", name="uq_distillery_user_catalog"),
+    )
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     name: Mapped[str] = mapped_column(String(65))
@@ -26,44 +50,62 @@ class Distillery(db.Model):
 
     # foreign keys
     user_id: Mapped[str] = mapped_column(ForeignKey("user.id"))
+    # set while this row is an unedited link to a catalog entry
+    catalog_id: Mapped[Optional[str]] = mapped_column(ForeignKey("catalog_distillery.id", ondelete="SET NULL"))
 
     # relationships
     user: Mapped["User"] = relationship(back_populates="distilleries")
+    catalog: Mapped[Optional["CatalogDistillery"]] = relationship()
     bottles: Mapped[List["Bottle"]] = relationship(
         "Bottle", secondary="bottle_distillery", back_populates="distilleries"
     )
 
 
+add_name_match_indexes(CatalogDistillery, scoped=False)
+add_name_match_indexes(Distillery)
+
+
 @event.listens_for(Distillery, "before_insert")
 def distillery_before_insert(mapper, connect, target) -> None:
     clean_distillery_data(target)
-    result = connect.execute(
-        sa.text("SELECT COALESCE(MAX(user_num), 0) FROM distillery WHERE user_id = :uid"),
-        {"uid": target.user_id},
-    )
-    db_max = result.scalar()
-    session = OrmSession.object_session(target)
-    pending_max = (
-        max(
-            (
-                obj.user_num
-                for obj in session.new
-                if isinstance(obj, Distillery)
-                and obj.user_id == target.user_id
-                and obj is not target
-                and obj.user_num is not None
-            ),
-            default=0,
-        )
-        if session is not None
-        else 0
-    )
-    target.user_num = max(db_max, pending_max) + 1
+    mark_collection_changed(target)
+    assign_user_num(connect, target)
 
 
 @event.listens_for(Distillery, "before_update")
 def distillery_before_update(mapper, connect, target) -> None:
     clean_distillery_data(target)
+    detach_edited_catalog_link(connect, target)
+    mark_collection_changed(target)
+
+
+@event.listens_for(Distillery, "before_delete")
+def distillery_before_delete(mapper, connect, target) -> None:
+    mark_collection_changed(target)
+
+
+@event.listens_for(CatalogDistillery, "before_insert")
+@event.listens_for(CatalogDistillery, "before_update")
+def catalog_distillery_before_save(mapper, connect, target) -> None:
+    clean_distillery_data(target)
+
+
+def detach_edited_catalog_link(connection, target: Distillery) -> None:
+    """
+    Copy-on-write for catalog links: once a user's edits make a linked distillery differ
+    from its catalog entry, it becomes the user's own and catalog updates stop reaching it.
+    """
+    if target.catalog_id is None:
+        return
+    state = inspect(target)
+    if not any(state.attrs[field].history.has_changes() for field in CATALOG_FIELDS):
+        return
+    table = CatalogDistillery.__table__
+    entry = connection.execute(
+        select(*[table.c[field] for field in CATALOG_FIELDS]).where(table.c.id == target.catalog_id)
+    ).one_or_none()
+    if entry is None or any((getattr(target, f) or "") != (getattr(entry, f) or "") for f in CATALOG_FIELDS):
+        target.catalog_id = None
 
 
 def clean_distillery_data(target) -> None:
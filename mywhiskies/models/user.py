@@ -4,6 +4,7 @@ from time import time
 from typing import TYPE_CHECKING, List, Optional
 
 import jwt
+import sqlalchemy as sa
 from flask import current_app
 from flask_login import UserMixin
 from sqlalchemy import String
@@ -42,6 +43,8 @@ class User(UserMixin, db.Model):
     stripe_customer_id: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
     stripe_subscription_id: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
     glen_scan_count: Mapped[int] = mapped_column(default=0)
+    # bumped on every write to the user's bottles, images, distilleries, bottlers and barrel pickers
+    collection_version: Mapped[int] = mapped_column(default=0, server_default=sa.text("0"))
     is_private: Mapped[bool] = mapped_column(default=False)
     is_deleted: Mapped[bool] = mapped_column(default=False)
     deleted_date: Mapped[Optional[datetime]]
@@ -1,15 +1,12 @@
 from typing import Dict, Tuple
 
 from flask import current_app
+from sqlalchemy import func, select
 
 from mywhiskies.extensions import db
 from mywhiskies.forms.barrel_picker import BarrelPickerAddForm, BarrelPickerEditForm
-from mywhiskies.models import BarrelPicker, User
-
-_SORT_FNS = {
-    "name": lambda p: p.name.lower(),
-    "bottles": lambda p: len(p.bottles),
-}
+from mywhiskies.models import BarrelPicker, Bottle, User, bottle_barrel_picker
+from mywhiskies.services.utils import choice_page, list_with_bottle_counts, name_match_clause
 
 
 def list_barrel_pickers(
@@ -21,21 +18,24 @@ def list_barrel_pickers(
     page: int = 1,
     per_page: int = 25,
 ) -> Dict:
-    pickers = list(user.barrel_pickers)
-    if q:
-        pickers = [p for p in pickers if q.lower() in p.name.lower()]
-    total = len(pickers)
-    pickers.sort(key=_SORT_FNS.get(sort, _SORT_FNS["name"]), reverse=(direction == "desc"))
-    total_pages = max(1, (total + per_page - 1) // per_page)
-    page = min(page, total_pages)
-    offset = (page - 1) * per_page
-    return {
-        "barrel_pickers": pickers[offset : offset + per_page],
-        "total": total,
-        "page": page,
-        "per_page": per_page,
-        "total_pages": total_pages,
-    }
+    counts = (
+        select(bottle_barrel_picker.c.barrel_picker_id.label("entity_id"), func.count().label("bottle_count"))
+        .join(Bottle, Bottle.id == bottle_barrel_picker.c.bottle_id)
+        .where(Bottle.user_id == user.id)
+        .group_by(bottle_barrel_picker.c.barrel_picker_id)
+        .subquery()
+    )
+    data = list_with_bottle_counts(BarrelPicker, counts, user, q, sort, direction, page, per_page)
+    data["barrel_pickers"] = data.pop("items")
+    return data
+
+
+def search_barrel_pickers(user: User, q: str = "", page: int = 1) -> Dict:
+    """A page of the user's barrel pickers matching `q`, for the bottle form's picker."""
+    matches = select(BarrelPicker.id.label("id"), BarrelPicker.name.label("text")).where(
+        BarrelPicker.user_id == user.id, name_match_clause(BarrelPicker.name, q)
+    )
+    return choice_page(matches, page)
 
 
 def add_barrel_picker(form: BarrelPickerAddForm, user: User) -> BarrelPicker:
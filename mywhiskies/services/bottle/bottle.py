@@ -1,9 +1,8 @@
-import random
-from itertools import groupby
 from typing import Dict, List, Optional, Union
 
 from flask import current_app, flash, url_for
 from markupsafe import Markup
+from sqlalchemy import func
 
 from mywhiskies.extensions import db
 from mywhiskies.forms.bottle import BottleAddForm, BottleEditForm
@@ -12,54 +11,13 @@ from mywhiskies.services.bottle.image import (
     delete_bottle_images,
     process_bottle_images,
 )
-
-
-def _normalize(s: str) -> str:
-    """Normalize smart quotes/apostrophes to their ASCII equivalents."""
-    return s.replace("‘", "'").replace("’", "'").replace("“", '"').replace("”", '"')
-
-
-_SORT_FNS = {
-    "name": lambda b: b.name.lower(),
-    "type": lambda b: b.type.value.lower(),
-    "abv": lambda b: float(b.abv) if b.abv else 0.0,
-    "rating": lambda b: float(b.stars) if b.stars else 0.0,
-    "sb": lambda b: b.is_single_barrel,
-    "private": lambda b: b.is_private,
-}
-
-_GROUP_SORT_FNS = {
-    "name": lambda g: g["name"].lower(),
-    "type": lambda g: g["type"].value.lower(),
-    "abv": lambda g: g["abv_max"] or 0.0,
-    "rating": lambda g: g["max_stars"] or 0.0,
-    "sb": lambda g: g["all_sb"],
-    "private": lambda g: any(b.is_private for b in g["bottles"]),
-}
-
-
-def _make_groups(bottles: list) -> list:
-    """Group bottles by (name, type) into dicts with aggregate display values."""
-    bottles_sorted = sorted(bottles, key=lambda b: (b.name.lower(), b.type.name))
-    groups = []
-    for _, group_iter in groupby(bottles_sorted, key=lambda b: (b.name.lower(), b.type.name)):
-        items = list(group_iter)
-        abvs = [float(b.abv) for b in items if b.abv]
-        stars_vals = [float(b.stars) for b in items if b.stars]
-        groups.append(
-            {
-                "name": items[0].name,
-                "type": items[0].type,
-                "count": len(items),
-                "bottles": items,
-                "is_group": len(items) > 1,
-                "abv_min": min(abvs) if abvs else None,
-                "abv_max": max(abvs) if abvs else None,
-                "max_stars": max(stars_vals) if stars_vals else None,
-                "all_sb": all(b.is_single_barrel for b in items),
-            }
-        )
-    return groups
+from mywhiskies.services.bottle.listing import (
+    bottle_filter_clauses,
+    entity_scope,
+    query_bottle_groups,
+    query_bottle_page,
+)
+from mywhiskies.services.distillery.distillery import resolve_distilleries
 
 
 def list_bottles_by_user(
@@ -72,75 +30,44 @@ def list_bottles_by_user(
     direction: str = "asc",
     page: int = 1,
     per_page: int = 25,
+    stream: bool = False,
 ) -> Dict:
-    bottles = list(user.bottles)
-
-    if not is_my_list:
-        bottles = [b for b in bottles if not b.is_private]
-
-    active_types = {b.type.name for b in bottles}
-    has_killed = any(b.date_killed for b in bottles)
-
-    killed_matches = 0
-    if not show_killed:
-        killed = [b for b in bottles if b.date_killed]
-        if types:
-            killed = [b for b in killed if b.type.name in types]
-        if q:
-            q_lower = _normalize(q.lower())
-            killed = [
-                b
-                for b in killed
-                if q_lower in _normalize(b.name.lower())
-                or (b.description and q_lower in _normalize(b.description.lower()))
-                or (b.bottler and q_lower in _normalize(b.bottler.name.lower()))
-                or any(q_lower in _normalize(d.name.lower()) for d in b.distilleries)
-                or any(q_lower in _normalize(p.name.lower()) for p in b.barrel_pickers)
-            ]
-        killed_matches = len(killed)
-        bottles = [b for b in bottles if not b.date_killed]
-
-    if types:
-        bottles = [b for b in bottles if b.type.name in types]
-
-    if q:
-        q_lower = _normalize(q.lower())
-        bottles = [
-            b
-            for b in bottles
-            if q_lower in _normalize(b.name.lower())
-            or (b.description and q_lower in _normalize(b.description.lower()))
-            or (b.bottler and q_lower in _normalize(b.bottler.name.lower()))
-            or any(q_lower in _normalize(d.name.lower()) for d in b.distilleries)
-            or any(q_lower in _normalize(p.name.lower()) for p in b.barrel_pickers)
-        ]
-
-    groups = _make_groups(bottles)
-    groups.sort(
-        key=_GROUP_SORT_FNS.get(sort, _GROUP_SORT_FNS["name"]),
-        reverse=(direction == "desc"),
+    return query_bottle_groups(
+        scope=[Bottle.user_id == user.id],
+        is_my_list=is_my_list,
+        q=q,
+        types=types,
+        show_killed=show_killed,
+        sort=sort,
+        direction=direction,
+        page=page,
+        per_page=per_page,
+        stream=stream,
     )
 
-    total = len(groups)
-    total_bottles = sum(g["count"] for g in groups)
-    private_count = sum(1 for g in groups for b in g["bottles"] if b.is_private) if is_my_list else 0
-
-    total_pages = max(1, (total + per_page - 1) // per_page)
-    page = min(page, total_pages)
-    offset = (page - 1) * per_page
 
-    return {
-        "grouped": groups[offset : offset + per_page],
-        "total": total,
-        "total_bottles": total_bottles,
-        "private_count": private_count,
-        "page": page,
-        "per_page": per_page,
-        "total_pages": total_pages,
-        "has_killed": has_killed,
-        "active_types": active_types,
-        "killed_matches": killed_matches,
-    }
+def page_bottles_by_user(
+    user: User,
+    is_my_list: bool,
+    q: str = "",
+    types: Optional[List[str]] = None,
+    show_killed: bool = False,
+    sort: str = "name",
+    direction: str = "asc",
+    cursor: Optional[str] = None,
+    limit: int = 50,
+) -> Dict:
+    return query_bottle_page(
+        scope=[Bottle.user_id == user.id],
+        is_my_list=is_my_list,
+        q=q,
+        types=types,
+        show_killed=show_killed,
+        sort=sort,
+        direction=direction,
+        cursor=cursor,
+        limit=limit,
+    )
 
 
 def list_bottles_for_entity(
@@ -154,99 +81,46 @@ def list_bottles_for_entity(
     page: int = 1,
     per_page: int = 25,
 ) -> Dict:
-    bottles = list(entity.bottles)
-
-    if not is_my_list:
-        bottles = [b for b in bottles if not b.is_private]
-
-    has_killed = any(b.date_killed for b in bottles)
-
-    killed_matches = 0
-    if not show_killed:
-        killed = [b for b in bottles if b.date_killed]
-        if types:
-            killed = [b for b in killed if b.type.name in types]
-        if q:
-            q_lower = _normalize(q.lower())
-            killed = [
-                b
-                for b in killed
-                if q_lower in _normalize(b.name.lower())
-                or (b.description and q_lower in _normalize(b.description.lower()))
-                or (b.bottler and q_lower in _normalize(b.bottler.name.lower()))
-                or any(q_lower in _normalize(d.name.lower()) for d in b.distilleries)
-                or any(q_lower in _normalize(p.name.lower()) for p in b.barrel_pickers)
-            ]
-        killed_matches = len(killed)
-        bottles = [b for b in bottles if not b.date_killed]
-
-    if types:
-        bottles = [b for b in bottles if b.type.name in types]
-
-    if q:
-        q_lower = _normalize(q.lower())
-        bottles = [
-            b
-            for b in bottles
-            if q_lower in _normalize(b.name.lower())
-            or (b.description and q_lower in _normalize(b.description.lower()))
-            or (b.bottler and q_lower in _normalize(b.bottler.name.lower()))
-            or any(q_lower in _normalize(d.name.lower()) for d in b.distilleries)
-            or any(q_lower in _normalize(p.name.lower()) for p in b.barrel_pickers)
-        ]
-
-    groups = _make_groups(bottles)
-    groups.sort(
-        key=_GROUP_SORT_FNS.get(sort, _GROUP_SORT_FNS["name"]),
-        reverse=(direction == "desc"),
+    return query_bottle_groups(
+        scope=entity_scope(entity),
+        is_my_list=is_my_list,
+        q=q,
+        types=types,
+        show_killed=show_killed,
+        sort=sort,
+        direction=direction,
+        page=page,
+        per_page=per_page,
     )
 
-    total = len(groups)
-    total_bottles = sum(g["count"] for g in groups)
-    private_count = sum(1 for g in groups for b in g["bottles"] if b.is_private) if is_my_list else 0
-
-    total_pages = max(1, (total + per_page - 1) // per_page)
-    page = min(page, total_pages)
-    offset = (page - 1) * per_page
-
-    return {
-        "grouped": groups[offset : offset + per_page],
-        "total": total,
-        "total_bottles": total_bottles,
-        "private_count": private_count,
-        "page": page,
-        "per_page": per_page,
-        "total_pages": total_pages,
-        "has_killed": has_killed,
-        "killed_matches": killed_matches,
-    }
-
 
 def get_random_bottle(
     user: User,
     q: str = "",
     types: Optional[List[str]] = None,
 ) -> Optional[Bottle]:
-    bottles = [b for b in user.bottles if not b.date_killed]
-    if types:
-        bottles = [b for b in bottles if b.type.name in types]
-    if q:
-        q_lower = _normalize(q.lower())
-        bottles = [
-            b
-            for b in bottles
-            if q_lower in _normalize(b.name.lower())
-            or (b.description and q_lower in _normalize(b.description.lower()))
-            or (b.bottler and q_lower in _normalize(b.bottler.name.lower()))
-            or any(q_lower in _normalize(d.name.lower()) for d in b.distilleries)
-            or any(q_lower in _normalize(p.name.lower()) for p in b.barrel_pickers)
-        ]
-    return random.choice(bottles) if bottles else None
+    stmt = (
+        db.select(Bottle)
+        .where(Bottle.user_id == user.id, Bottle.date_killed.is_(None), *bottle_filter_clauses(q, types))
+        .order_by(func.random())
+        .limit(1)
+    )
+    return db.session.execute(stmt).scalar_one_or_none()
 
 
 def set_bottle_details(form: BottleAddForm, bottle: Optional[Bottle] = None, user: Optional[User] = None) -> Bottle:
-    distilleries = [db.session.get(Distillery, did) for did in form.distilleries.data]
-    barrel_pickers = [db.session.get(BarrelPicker, pid) for pid in (form.barrel_pickers.data or [])]
+    owner = user or bottle.user
+    distilleries = resolve_distilleries(owner, form.distilleries.data)
+    picker_ids = form.barrel_pickers.data or []
+    pickers = {}
+    if picker_ids:
+        pickers = {
+            p.id: p
+            for p in db.session.scalars(
+                db.select(BarrelPicker).where(BarrelPicker.user_id == owner.id, BarrelPicker.id.in_(picker_ids))
+            )
+        }
+    barrel_pickers = [pickers[pid] for pid in picker_ids if pid in pickers]
     bottler_id = form.bottler_id.data if form.bottler_id.data != "0" else None
     if bottle is None:
         bottle = Bottle(user_id=user.id)
@@ -1,7 +1,9 @@
 from typing import Union
 
 from mywhiskies.forms.bottle import BottleAddForm, BottleEditForm
-from mywhiskies.models import BottleTypes, User
+from mywhiskies.models import BarrelPicker, Bottler, BottleTypes, User
+from mywhiskies.services.distillery.distillery import selected_distillery_choices
+from mywhiskies.services.utils import selected_choices
 
 
 def prep_bottle_form(user: User, form: Union[BottleAddForm, BottleEditForm]) -> Union[BottleAddForm, BottleEditForm]:
@@ -22,22 +24,20 @@ def _set_up_bottle_type(form: Union[BottleAddForm, BottleEditForm]) -> None:
     form.type.choices.insert(0, ("", "Choose a Bottle Type"))
 
 
+# The pickers search as you type (see the entities' search endpoints), so their choices are
+# just what's selected: one IN query per field, which also makes validation reject other ids.
+
+
 def _set_up_distilleries(form: Union[BottleAddForm, BottleEditForm], user: User) -> None:
-    distilleries = user.distilleries
-    distilleries.sort(key=lambda d: d.name)
-    form.distilleries.choices = [(d.id, d.name) for d in distilleries]
+    form.distilleries.choices = selected_distillery_choices(user, form.distilleries.data)
 
 
 def _set_up_barrel_pickers(form: Union[BottleAddForm, BottleEditForm], user: User) -> None:
-    pickers = sorted(user.barrel_pickers, key=lambda p: p.name)
-    form.barrel_pickers.choices = [(p.id, p.name) for p in pickers]
+    form.barrel_pickers.choices = selected_choices(BarrelPicker, user, form.barrel_pickers.data)
 
 
 def _set_up_bottlers(form: Union[BottleAddForm, BottleEditForm], user: User) -> None:
-    bottlers = user.bottlers
-    bottlers.sort(key=lambda d: d.name)
-    form.bottler_id.choices = [(b.id, b.name) for b in bottlers]
-    form.bottler_id.choices.insert(0, (0, "Distillery Bottling"))
+    form.bottler_id.choices = [(0, "Distillery Bottling"), *selected_choices(Bottler, user, [form.bottler_id.data])]
 
 
 def _set_up_star_rating(form: Union[BottleAddForm, BottleEditForm]) -> None:
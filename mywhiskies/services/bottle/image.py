@@ -1,26 +1,32 @@
 import io
 import json
-from typing import Optional, Tuple
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
 
-import boto3
-from botocore.exceptions import ClientError
 from flask import current_app
 from PIL import Image, ImageOps
 
+from mywhiskies.common.storage import StorageError, get_storage
 from mywhiskies.extensions import db
 from mywhiskies.forms.bottle import BottleAddForm
-from mywhiskies.models import Bottle, BottleImage
+from mywhiskies.models import Bottle, BottleImage, ImageUploadJob
 
 DISPLAY_MAX = 1200
 JPEG_QUALITY = 85
 FULL_JPEG_QUALITY = 95
+WEBP_QUALITY = 80
+# Refuse uploads bigger than this before decoding them (a 48MP phone photo is ~48M).
+MAX_IMAGE_PIXELS = 64_000_000
+REDUCING_GAP = 2.0
+# a stored image never changes under its key
+IMAGE_CACHE_CONTROL = "public, max-age=31536000, immutable"
 
 
 def get_s3_config():
+    """(bucket, display key prefix, display image base URL) for the configured storage backend."""
     return (
         current_app.config["BOTTLE_IMAGE_S3_BUCKET"],
         current_app.config["BOTTLE_IMAGE_S3_KEY"],
-        f"{current_app.config['BOTTLE_IMAGE_S3_URL']}/{current_app.config['BOTTLE_IMAGE_S3_KEY']}",
+        f"{get_storage().url}/{current_app.config['BOTTLE_IMAGE_S3_KEY']}",
     )
 
 
@@ -31,74 +37,163 @@ def get_full_s3_config():
     )
 
 
-def _to_resized_jpg_bytes(file_storage) -> bytes:
+class ImageTooLarge(ValueError):
+    """The upload's header declares more pixels than MAX_IMAGE_PIXELS."""
+
+
+class Rendition(NamedTuple):
+    """
+    An encoding to produce from an upload: fit within `max_size` px (None for full size),
+    or scaled to `max_size` px wide when `by_width` is set.
+    """
+
+    max_size: Optional[int]
+    quality: int
+    progressive: bool = False
+    format: str = "JPEG"
+    by_width: bool = False
+
+
+FULL = Rendition(None, FULL_JPEG_QUALITY)
+DISPLAY = Rendition(DISPLAY_MAX, JPEG_QUALITY, progressive=True)
+# sized by width so srcset `w` descriptors are exact for the fixed-width cards that show them
+THUMBNAILS = tuple(Rendition(w, WEBP_QUALITY, format="WEBP", by_width=True) for w in BottleImage.THUMBNAIL_WIDTHS)
+
+
+def renditions_for(is_pro: bool) -> Tuple[Rendition, ...]:
+    """The renditions stored for an upload: display and thumbnails, plus the full-res copy for Pro users."""
+    return ((FULL,) if is_pro else ()) + (DISPLAY,) + THUMBNAILS
+
+
+def open_checked_image(file_storage) -> Image.Image:
+    """Open an upload lazily: only its header is read, and checked against MAX_IMAGE_PIXELS."""
     file_storage.seek(0)
-    img = Image.open(file_storage)
+    try:
+        img = Image.open(file_storage)
+    except Image.DecompressionBombError as e:
+        raise ImageTooLarge(str(e)) from e
+    if img.width * img.height > MAX_IMAGE_PIXELS:
+        raise ImageTooLarge(f"{img.width}x{img.height} image exceeds {MAX_IMAGE_PIXELS} pixels")
+    return img
+
+
+def open_normalized_image(file_storage, draft_size: Optional[int]) -> Image.Image:
+    """
+    Decode an upload once into an upright RGB image.
+
+    The pixel count is checked from the header before anything is decoded. With a
+    `draft_size`, JPEGs are decoded at the smallest DCT scale that still covers it,
+    which is far cheaper than decoding a camera file at full size and shrinking it.
+    """
+    img = open_checked_image(file_storage)
+    if draft_size:
+        # square box: EXIF rotation hasn't been applied yet
+        img.draft("RGB", (draft_size, draft_size))
     img = ImageOps.exif_transpose(img)
     if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
         background = Image.new("RGB", img.size, (255, 255, 255))
         img = img.convert("RGBA")
         background.paste(img, mask=img.getchannel("A"))
-        img = background
-    else:
-        img = img.convert("RGB")
-    img.thumbnail((DISPLAY_MAX, DISPLAY_MAX), resample=Image.Resampling.LANCZOS)
-    out = io.BytesIO()
-    # exif= is intentionally omitted — convert("RGB") drops EXIF, and omitting it
-    # from save() ensures no metadata leaks into the stored file (#424).
-    img.save(out, format="JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
-    return out.getvalue()
-
-
-def _to_full_jpg_bytes(file_storage) -> bytes:
-    """Full-resolution JPEG — same pipeline as display but without the thumbnail step."""
+        return background
+    return img.convert("RGB")
+
+
+def fit_image(img: Image.Image, max_size: Optional[int], by_width: bool = False) -> Image.Image:
+    """Shrink `img` to fit `max_size` on its longer side (or its width); never enlarges."""
+    if not max_size:
+        return img
+    scale = max_size / (img.width if by_width else max(img.width, img.height))
+    if scale >= 1:
+        return img
+    size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+    # reducing_gap box-reduces by an integer factor first, then LANCZOS covers the rest
+    return img.resize(size, resample=Image.Resampling.LANCZOS, reducing_gap=REDUCING_GAP)
+
+
+def encode_renditions(file_storage, renditions: Sequence[Rendition]) -> List[bytes]:
+    """Encoded bytes for each rendition, in order, all cut from a single decode of the upload."""
+    sizes = [r.max_size for r in renditions]
+    img = open_normalized_image(file_storage, None if None in sizes else max(sizes))
+    out = []
+    for rendition in renditions:
+        options = {"quality": rendition.quality}
+        if rendition.format == "JPEG":
+            options.update(optimize=True, progressive=rendition.progressive)
+        else:
+            # thumbnails are small, so the slowest (smallest) WebP method costs little
+            options["method"] = 6
+        buf = io.BytesIO()
+        # exif= is intentionally omitted — convert("RGB") drops EXIF, and omitting it
+        # from save() ensures no metadata leaks into the stored file (#424).
+        fit_image(img, rendition.max_size, rendition.by_width).save(buf, format=rendition.format, **options)
+        out.append(buf.getvalue())
+    return out
+
+
+def queue_upload(bottle: Bottle, sequence: int, file_storage, is_pro: bool) -> BottleImage:
+    """
+    Record an upload as a pending image. The file is only header-checked here; rendering and
+    storing it is left to the upload workers (see upload_queue), so the request doesn't wait on them.
+    """
+    open_checked_image(file_storage)
     file_storage.seek(0)
-    img = Image.open(file_storage)
-    img = ImageOps.exif_transpose(img)
-    if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
-        background = Image.new("RGB", img.size, (255, 255, 255))
-        img = img.convert("RGBA")
-        background.paste(img, mask=img.getchannel("A"))
-        img = background
-    else:
-        img = img.convert("RGB")
-    out = io.BytesIO()
-    # exif= intentionally omitted — see _to_resized_jpg_bytes (#424).
-    img.save(out, format="JPEG", quality=FULL_JPEG_QUALITY, optimize=True)
-    return out.getvalue()
+    image = BottleImage(bottle_id=bottle.id, sequence=sequence, is_ready=False)
+    image.upload_job = ImageUploadJob(data=file_storage.read(), is_pro=is_pro)
+    db.session.add(image)
+    return image
 
 
-def _upload_full(s3_client, full_bucket: str, full_key: str, key: str, data: bytes) -> None:
-    """Upload to the pro full-res bucket. Failures are non-fatal."""
-    try:
-        s3_client.put_object(
-            Body=data,
-            Bucket=full_bucket,
-            Key=f"{full_key}/{key}",
-            ContentType="image/jpeg",
-            CacheControl="public, max-age=31536000",
-        )
-    except ClientError:
-        pass
-
-
-def _delete_full(s3_client, full_bucket: str, full_key: str, key: str) -> None:
-    """Delete from the pro full-res bucket. Failures are non-fatal (key may not exist)."""
-    try:
-        s3_client.delete_object(Bucket=full_bucket, Key=f"{full_key}/{key}")
-    except ClientError:
-        pass
+def _wake_upload_workers() -> None:
+    workers = current_app.extensions.get("upload_workers")
+    if workers is not None:
+        workers.notify()
 
 
-def _copy_full(s3_client, full_bucket: str, full_key: str, src_key: str, dst_key: str) -> None:
-    try:
-        s3_client.copy_object(
-            Bucket=full_bucket,
-            CopySource=f"{full_bucket}/{full_key}/{src_key}",
-            Key=f"{full_key}/{dst_key}",
-        )
-    except ClientError:
-        pass
+def store_renditions(image: BottleImage, encoded: Dict[Rendition, bytes]) -> None:
+    """
+    Store an image's encoded renditions, all at once, and record that it has thumbnails.
+
+    Raises StorageError when the display image or a thumbnail couldn't be stored; the
+    pro full-res copy is a bonus, so failing to store it is only logged. Keys never change,
+    so retrying after a partial failure just overwrites what did get stored.
+    """
+    _, img_s3_key, _ = get_s3_config()
+    _, full_key = get_full_s3_config()
+    objects = []
+    if DISPLAY in encoded:
+        objects.append((f"{img_s3_key}/{image.key}", encoded[DISPLAY], "image/jpeg"))
+    for rendition in THUMBNAILS:
+        objects.append((f"{img_s3_key}/{image.thumbnail_key(rendition.max_size)}", encoded[rendition], "image/webp"))
+    if FULL in encoded:
+        objects.append((f"{full_key}/{image.key}", encoded[FULL], "image/jpeg"))
+
+    failures = get_storage().put_many(objects, IMAGE_CACHE_CONTROL)
+    full_error = failures.pop(f"{full_key}/{image.key}", None)
+    if full_error:
+        current_app.logger.warning(f"Could not store full-res copy of image {image.key}: {full_error}")
+    if failures:
+        raise StorageError("; ".join(f"{key}: {error}" for key, error in failures.items()))
+    image.has_thumbnails = True
+
+
+def stored_image_keys(images: Sequence[BottleImage]) -> List[str]:
+    """Storage keys of images' display files and thumbnails, for delete_stored_images."""
+    return [key for img in images for key in (img.key, *img.thumbnail_keys)]
+
+
+def delete_stored_images(keys: Sequence[str]) -> None:
+    """
+    Delete stored image files from the display and pro full-res buckets in one batched call.
+    Failures are non-fatal: the rows are already gone, so at worst a file is orphaned.
+    """
+    if not keys:
+        return
+    _, img_s3_key, _ = get_s3_config()
+    _, full_key = get_full_s3_config()
+    # the full-res copy regardless of current pro status: the user may have been pro when they uploaded
+    failures = get_storage().delete_many([f"{prefix}/{key}" for key in keys for prefix in (img_s3_key, full_key)])
+    if failures:
+        current_app.logger.warning(f"Could not delete {len(failures)} stored image file(s): {sorted(failures)}")
 
 
 def process_bottle_images(form, bottle: Bottle, is_pro: bool = False) -> Tuple[bool, Optional[str]]:
@@ -106,6 +201,9 @@ def process_bottle_images(form, bottle: Bottle, is_pro: bool = False) -> Tuple[b
     Process the drop-zone form submission: parse `image_order` JSON and apply
     uploads, reordering, and removals in one atomic operation.
 
+    Images are stored under immutable keys, so reordering and removal only touch
+    `sequence` rows; removed files are deleted once the change is committed.
+
     Falls back to `add_bottle_images` when `image_order` is empty (JS disabled).
 
     Returns (True, None) on success, (False, error_message) on failure.
@@ -125,117 +223,45 @@ def process_bottle_images(form, bottle: Bottle, is_pro: bool = False) -> Tuple[b
     if not image_order:
         return True, None
 
-    s3_client = boto3.client("s3")
-    img_s3_bucket, img_s3_key, _ = get_s3_config()
-    full_bucket, full_key = get_full_s3_config()
-
     existing_map = {img.id: img for img in bottle.images}
     keep_ids = {item["id"] for item in image_order if item.get("type") == "existing" and item.get("id")}
-
-    for img_id, img in list(existing_map.items()):
-        if img_id not in keep_ids:
-            try:
-                s3_client.delete_object(
-                    Bucket=img_s3_bucket,
-                    Key=f"{img_s3_key}/{bottle.id}_{img.sequence}.jpg",
-                )
-            except ClientError:
-                pass
-            _delete_full(s3_client, full_bucket, full_key, f"{bottle.id}_{img.sequence}.jpg")
-            db.session.delete(img)
-    db.session.flush()
-
+    removed = [img for img_id, img in existing_map.items() if img_id not in keep_ids]
+    removed_keys = stored_image_keys(removed)
     kept = {img_id: img for img_id, img in existing_map.items() if img_id in keep_ids}
-    orig_seqs = {img_id: img.sequence for img_id, img in kept.items()}
-
-    final_seqs: dict = {}
-    for final_seq, item in enumerate(image_order, start=1):
-        if item.get("type") == "existing" and item.get("id") in kept:
-            final_seqs[item["id"]] = final_seq
 
     try:
-        to_rename = {
-            img_id: (orig_seqs[img_id], new_seq)
-            for img_id, new_seq in final_seqs.items()
-            if orig_seqs[img_id] != new_seq
-        }
-        if to_rename:
-            for img_id, (old_seq, new_seq) in to_rename.items():
-                s3_client.copy_object(
-                    Bucket=img_s3_bucket,
-                    CopySource=f"{img_s3_bucket}/{img_s3_key}/{bottle.id}_{old_seq}.jpg",
-                    Key=f"{img_s3_key}/{bottle.id}_tmp_{new_seq}.jpg",
-                )
-                if is_pro:
-                    _copy_full(
-                        s3_client, full_bucket, full_key, f"{bottle.id}_{old_seq}.jpg", f"{bottle.id}_tmp_{new_seq}.jpg"
-                    )
-            for img_id, (old_seq, new_seq) in to_rename.items():
-                s3_client.copy_object(
-                    Bucket=img_s3_bucket,
-                    CopySource=f"{img_s3_bucket}/{img_s3_key}/{bottle.id}_tmp_{new_seq}.jpg",
-                    Key=f"{img_s3_key}/{bottle.id}_{new_seq}.jpg",
-                )
-                s3_client.delete_object(
-                    Bucket=img_s3_bucket,
-                    Key=f"{img_s3_key}/{bottle.id}_tmp_{new_seq}.jpg",
-                )
-                if is_pro:
-                    _copy_full(
-                        s3_client, full_bucket, full_key, f"{bottle.id}_tmp_{new_seq}.jpg", f"{bottle.id}_{new_seq}.jpg"
-                    )
-                    _delete_full(s3_client, full_bucket, full_key, f"{bottle.id}_tmp_{new_seq}.jpg")
-            final_seqs_set = {new_seq for _, new_seq in to_rename.values()}
-            for _, (old_seq, _) in to_rename.items():
-                if old_seq not in final_seqs_set:
-                    s3_client.delete_object(
-                        Bucket=img_s3_bucket,
-                        Key=f"{img_s3_key}/{bottle.id}_{old_seq}.jpg",
-                    )
-                    if is_pro:
-                        _delete_full(s3_client, full_bucket, full_key, f"{bottle.id}_{old_seq}.jpg")
-
+        for img in removed:
+            db.session.delete(img)
+        # (bottle_id, sequence) is unique: move kept images out of the way before renumbering
         for img in kept.values():
             img.sequence = 10 + img.sequence
-            db.session.flush()
-        for img_id, new_seq in final_seqs.items():
-            kept[img_id].sequence = new_seq
-            db.session.flush()
+        db.session.flush()
 
         for final_seq, item in enumerate(image_order, start=1):
-            if item.get("type") == "new":
+            if item.get("type") == "existing" and item.get("id") in kept:
+                kept[item["id"]].sequence = final_seq
+            elif item.get("type") == "new":
                 slot = item.get("slot")
-                if slot:
-                    ff = getattr(form, f"bottle_image_{slot}", None)
-                    if ff and ff.data:
-                        if is_pro:
-                            full_bytes = _to_full_jpg_bytes(ff.data)
-                            _upload_full(s3_client, full_bucket, full_key, f"{bottle.id}_{final_seq}.jpg", full_bytes)
-                        jpg_bytes = _to_resized_jpg_bytes(ff.data)
-                        s3_client.put_object(
-                            Body=jpg_bytes,
-                            Bucket=img_s3_bucket,
-                            Key=f"{img_s3_key}/{bottle.id}_{final_seq}.jpg",
-                            ContentType="image/jpeg",
-                            CacheControl="public, max-age=31536000",
-                        )
-                        db.session.add(BottleImage(bottle_id=bottle.id, sequence=final_seq))
-                        db.session.flush()
+                ff = getattr(form, f"bottle_image_{slot}", None) if slot else None
+                if ff and ff.data:
+                    queue_upload(bottle, final_seq, ff.data, is_pro)
 
         db.session.commit()
-        return True, None
 
-    except (ClientError, OSError, ValueError):
+    except ImageTooLarge:
+        db.session.rollback()
+        return False, f"Images can be at most {MAX_IMAGE_PIXELS // 1_000_000} megapixels."
+    except (OSError, ValueError):
         db.session.rollback()
         return False, "An error occurred while uploading images."
 
+    delete_stored_images(removed_keys)
+    _wake_upload_workers()
+    return True, None
 
-def add_bottle_images(form: BottleAddForm, bottle: Bottle, is_pro: bool = False) -> bool:
-    """Process image uploads for a bottle (JS-disabled fallback path)."""
-    s3_client = boto3.client("s3")
-    img_s3_bucket, img_s3_key, _ = get_s3_config()
-    full_bucket, full_key = get_full_s3_config()
 
+def add_bottle_images(form: BottleAddForm, bottle: Bottle, is_pro: bool = False) -> bool:
+    """Queue image uploads for a bottle (JS-disabled fallback path)."""
     valid_uploads = []
     for field_num in range(1, 4):
         image_field = form[f"bottle_image_{field_num}"]
@@ -249,128 +275,71 @@ def add_bottle_images(form: BottleAddForm, bottle: Bottle, is_pro: bool = False)
     next_sequence = max(existing_sequences, default=0) + 1
 
     try:
-        for image_data in valid_uploads:
-            sequence = next_sequence
-            next_sequence += 1
-
-            if is_pro:
-                full_bytes = _to_full_jpg_bytes(image_data)
-                _upload_full(s3_client, full_bucket, full_key, f"{bottle.id}_{sequence}.jpg", full_bytes)
-
-            jpg_bytes = _to_resized_jpg_bytes(image_data)
-            s3_client.put_object(
-                Body=jpg_bytes,
-                Bucket=img_s3_bucket,
-                Key=f"{img_s3_key}/{bottle.id}_{sequence}.jpg",
-                ContentType="image/jpeg",
-                CacheControl="public, max-age=31536000",
-            )
-            db.session.add(BottleImage(bottle_id=bottle.id, sequence=sequence))
+        for sequence, image_data in enumerate(valid_uploads, start=next_sequence):
+            queue_upload(bottle, sequence, image_data, is_pro)
 
         db.session.commit()
 
-    except (ClientError, OSError, ValueError):
+    except (OSError, ValueError):
         db.session.rollback()
         return False
 
-    resequence_bottle_images(bottle, is_pro=is_pro)
+    _wake_upload_workers()
+    resequence_bottle_images(bottle)
     return True
 
 
-def resequence_bottle_images(bottle, is_pro: bool = False):
-    """Ensure all bottle images have sequential sequence numbers without gaps."""
-    s3_client = boto3.client("s3")
-    img_s3_bucket, img_s3_key, _ = get_s3_config()
-    full_bucket, full_key = get_full_s3_config()
-
-    images = sorted(bottle.images, key=lambda img: img.sequence)
-
-    sequence_changes = {}
-    for new_seq, img in enumerate(images, start=1):
+def resequence_bottle_images(bottle: Bottle) -> None:
+    """Renumber a bottle's images 1..n, closing any gaps. Rows only: stored files don't move."""
+    changed = False
+    for new_seq, img in enumerate(sorted(bottle.images, key=lambda img: img.sequence), start=1):
         if img.sequence != new_seq:
-            sequence_changes[img.id] = (img.sequence, new_seq)
+            # ascending, so the slot being moved into has already been vacated
             img.sequence = new_seq
             db.session.flush()
-
-    if sequence_changes:
-        for _, (old_seq, new_seq) in sequence_changes.items():
-            s3_client.copy_object(
-                Bucket=img_s3_bucket,
-                CopySource=f"{img_s3_bucket}/{img_s3_key}/{bottle.id}_{old_seq}.jpg",
-                Key=f"{img_s3_key}/{bottle.id}_temp_{new_seq}.jpg",
-            )
-            if is_pro:
-                _copy_full(
-                    s3_client, full_bucket, full_key, f"{bottle.id}_{old_seq}.jpg", f"{bottle.id}_temp_{new_seq}.jpg"
-                )
-
-        for _, (old_seq, new_seq) in sequence_changes.items():
-            s3_client.copy_object(
-                Bucket=img_s3_bucket,
-                CopySource=f"{img_s3_bucket}/{img_s3_key}/{bottle.id}_temp_{new_seq}.jpg",
-                Key=f"{img_s3_key}/{bottle.id}_{new_seq}.jpg",
-            )
-            s3_client.delete_object(
-                Bucket=img_s3_bucket,
-                Key=f"{img_s3_key}/{bottle.id}_temp_{new_seq}.jpg",
-            )
-            if old_seq != new_seq:
-                s3_client.delete_object(
-                    Bucket=img_s3_bucket,
-                    Key=f"{img_s3_key}/{bottle.id}_{old_seq}.jpg",
-                )
-            if is_pro:
-                _copy_full(
-                    s3_client, full_bucket, full_key, f"{bottle.id}_temp_{new_seq}.jpg", f"{bottle.id}_{new_seq}.jpg"
-                )
-                _delete_full(s3_client, full_bucket, full_key, f"{bottle.id}_temp_{new_seq}.jpg")
-                if old_seq != new_seq:
-                    _delete_full(s3_client, full_bucket, full_key, f"{bottle.id}_{old_seq}.jpg")
-
+            changed = True
+    if changed:
         db.session.commit()
 
 
-def delete_bottle_images(bottle, image_ids=None):
+def delete_bottle_images(bottle: Bottle, image_ids=None) -> None:
     """Delete specific images or all images for a bottle."""
-    s3_client = boto3.client("s3")
-    img_s3_bucket, img_s3_key, _ = get_s3_config()
-    full_bucket, full_key = get_full_s3_config()
-
     images_to_delete = list(bottle.images)
     if image_ids:
         images_to_delete = [img for img in bottle.images if img.id in image_ids]
+    keys = stored_image_keys(images_to_delete)
 
     for img in images_to_delete:
-        s3_client.delete_object(
-            Bucket=img_s3_bucket,
-            Key=f"{img_s3_key}/{bottle.id}_{img.sequence}.jpg",
-        )
-        _delete_full(s3_client, full_bucket, full_key, f"{bottle.id}_{img.sequence}.jpg")
         db.session.delete(img)
-
+        bottle.images.remove(img)
+    db.session.flush()
+    resequence_bottle_images(bottle)
     db.session.commit()
 
-    remaining_images = (
-        db.session.query(BottleImage).filter(BottleImage.bottle_id == bottle.id).order_by(BottleImage.sequence).all()
-    )
+    delete_stored_images(keys)
 
-    for new_seq, img in enumerate(remaining_images, start=1):
-        old_seq = img.sequence
-        if old_seq != new_seq:
-            s3_client.copy_object(
-                Bucket=img_s3_bucket,
-                CopySource=f"{img_s3_bucket}/{img_s3_key}/{bottle.id}_{old_seq}.jpg",
-                Key=f"{img_s3_key}/{bottle.id}_{new_seq}.jpg",
-            )
-            s3_client.delete_object(
-                Bucket=img_s3_bucket,
-                Key=f"{img_s3_key}/{bottle.id}_{old_seq}.jpg",
-            )
-            # Mirror resequence in full bucket regardless of current pro status —
-            # user may have been pro when they uploaded.
-            _copy_full(s3_client, full_bucket, full_key, f"{bottle.id}_{old_seq}.jpg", f"{bottle.id}_{new_seq}.jpg")
-            _delete_full(s3_client, full_bucket, full_key, f"{bottle.id}_{old_seq}.jpg")
-            img.sequence = new_seq
-            db.session.flush()
 
-    db.session.commit()
+def backfill_thumbnails(limit: Optional[int] = None) -> Tuple[int, int]:
+    """
+    Generate thumbnails for stored images that predate them, cutting them from the display JPEG.
+
+    Each image is committed on its own, so an interrupted run resumes where it stopped.
+    Returns (generated, failed); failures (e.g. legacy PNG-only images) are logged and skipped.
+    """
+    stmt = db.select(BottleImage).where(BottleImage.is_ready, ~BottleImage.has_thumbnails).order_by(BottleImage.id)
+    if limit:
+        stmt = stmt.limit(limit)
+    storage = get_storage()
+    _, img_s3_key, _ = get_s3_config()
+    generated = failed = 0
+    for image in db.session.scalars(stmt).all():
+        try:
+            display = storage.get(f"{img_s3_key}/{image.key}")
+            store_renditions(image, dict(zip(THUMBNAILS, encode_renditions(io.BytesIO(display), THUMBNAILS))))
+        except (StorageError, OSError, ValueError) as e:
+            current_app.logger.warning(f"Could not generate thumbnails for image {image.key}: {e}")
+            failed += 1
+            continue
+        db.session.commit()
+        generated += 1
+    return generated, failed
@@ -0,0 +1,428 @@
+import base64
+import binascii
+import json
+from decimal import Decimal, InvalidOperation
+from itertools import groupby
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+import sqlalchemy as sa
+from sqlalchemy.sql.elements import ColumnElement
+
+from mywhiskies.common.query_budget import count_stream_batch
+from mywhiskies.extensions import db
+from mywhiskies.models import (
+    BarrelPicker,
+    Bottle,
+    Bottler,
+    BottleTypes,
+    Distillery,
+    bottle_barrel_picker,
+    bottle_distillery,
+)
+from mywhiskies.models.bottle import fold_search_text
+from mywhiskies.services.bottle.loaders import bottle_row_options
+
+# Postgres text search configuration: no stemming or stop words, bottle names aren't English prose.
+_SIMPLE = sa.literal_column("'simple'")
+
+
+def _is_postgres() -> bool:
+    return db.session.get_bind().dialect.name == "postgresql"
+
+
+def _search_vector() -> ColumnElement:
+    return sa.func.to_tsvector(_SIMPLE, sa.func.coalesce(Bottle.search_text, sa.literal_column("''")))
+
+
+def bottle_search_clause(q: str) -> ColumnElement:
+    """
+    Match `q` against a bottle's name, description, bottler, distilleries and barrel pickers.
+
+    A substring match on every dialect, so every database finds the same bottles; on Postgres
+    the trigram index answers it. Word matching only feeds the ranking (bottle_search_rank).
+    """
+    return Bottle.search_text.contains(fold_search_text(q), autoescape=True)
+
+
+def bottle_search_rank(q: str) -> ColumnElement:
+    """Relevance of a bottle to `q`; higher is better."""
+    term = fold_search_text(q)
+    if not _is_postgres():
+        # search_text starts with the bottle name, so a prefix hit is a name hit
+        return sa.case((Bottle.search_text.startswith(term, autoescape=True), 1.0), else_=0.5)
+    return sa.func.ts_rank(_search_vector(), sa.func.plainto_tsquery(_SIMPLE, term)) + sa.func.word_similarity(
+        term, sa.func.coalesce(Bottle.search_text, "")
+    )
+
+
+def bottle_filter_clauses(q: str = "", types: Optional[List[str]] = None) -> List[ColumnElement]:
+    """WHERE clauses for the type checkboxes and search box shared by every bottle list."""
+    clauses = []
+    if types:
+        clauses.append(Bottle.type.in_([BottleTypes[t] for t in types if t in BottleTypes.__members__]))
+    if q:
+        clauses.append(bottle_search_clause(q))
+    return clauses
+
+
+def entity_scope(entity: Union[BarrelPicker, Bottler, Distillery]) -> List[ColumnElement]:
+    """
+    WHERE clauses selecting the bottles linked to a distillery, bottler or barrel picker,
+    for use as the `scope` of query_bottle_groups.
+
+    Association tables are matched with a semi-join (IN) rather than a join, so a bottle
+    is counted once however it is linked.
+    """
+    if isinstance(entity, Bottler):
+        link = Bottle.bottler_id == entity.id
+    else:
+        table, column = (
+            (bottle_distillery, "distillery_id")
+            if isinstance(entity, Distillery)
+            else (bottle_barrel_picker, "barrel_picker_id")
+        )
+        link = Bottle.id.in_(sa.select(table.c.bottle_id).where(table.c[column] == entity.id))
+    # entities and their bottles always share an owner; scoping by user lets the user_id indexes do the work
+    return [Bottle.user_id == entity.user_id, link]
+
+
+def _flag(clause: ColumnElement) -> ColumnElement:
+    return sa.case((clause, 1), else_=0)
+
+
+def bottle_facets(
+    visible: List[ColumnElement],
+    q: str = "",
+    types: Optional[List[str]] = None,
+    show_killed: bool = False,
+) -> Dict:
+    """
+    Filter sidebar counts for the bottles matched by `visible`, from a single UNION ALL query.
+
+    Each facet is counted the way a faceted sidebar expects: type counts honour the search
+    and the killed toggle but not the type checkboxes themselves; killed/active counts honour
+    the search and the type checkboxes; single-barrel, distillery and bottler counts honour
+    every filter on the page.
+    """
+    is_killed = _flag(Bottle.date_killed.is_not(None))
+    is_sb = _flag(Bottle.is_single_barrel)
+    hits = sa.func.sum(_flag(bottle_search_clause(q))) if q else sa.func.count(Bottle.id)
+
+    # one row per (type, killed, single barrel) combination; every type/status facet rolls up from these
+    by_kind = (
+        sa.select(
+            sa.literal("kind").label("facet"),
+            sa.cast(Bottle.type, sa.String).label("key"),
+            is_killed.label("killed"),
+            is_sb.label("sb"),
+            sa.func.count(Bottle.id).label("total"),
+            hits.label("hits"),
+        )
+        .where(*visible)
+        .group_by(Bottle.type, is_killed, is_sb)
+    )
+
+    filters = bottle_filter_clauses(q, types)
+    if not show_killed:
+        filters.append(Bottle.date_killed.is_(None))
+    by_distillery = (
+        sa.select(
+            sa.literal("distillery"),
+            bottle_distillery.c.distillery_id,
+            sa.literal(0),
+            sa.literal(0),
+            sa.func.count(Bottle.id),
+            sa.func.count(Bottle.id),
+        )
+        .join(bottle_distillery, bottle_distillery.c.bottle_id == Bottle.id)
+        .where(*visible, *filters)
+        .group_by(bottle_distillery.c.distillery_id)
+    )
+    by_bottler = (
+        sa.select(
+            sa.literal("bottler"),
+            Bottle.bottler_id,
+            sa.literal(0),
+            sa.literal(0),
+            sa.func.count(Bottle.id),
+            sa.func.count(Bottle.id),
+        )
+        .where(*visible, *filters, Bottle.bottler_id.is_not(None))
+        .group_by(Bottle.bottler_id)
+    )
+    rows = db.session.execute(sa.union_all(by_kind, by_distillery, by_bottler)).all()
+
+    selected = set(types) if types else set(BottleTypes.__members__)
+    facets = {
+        "types": {},
+        "active_types": set(),
+        "has_killed": False,
+        "active": 0,
+        "killed": 0,
+        "single_barrel": 0,
+        "distilleries": {},
+        "bottlers": {},
+    }
+    for facet, key, killed, sb, total, hit_count in rows:
+        hit_count = int(hit_count or 0)
+        if facet == "distillery":
+            facets["distilleries"][key] = hit_count
+            continue
+        if facet == "bottler":
+            facets["bottlers"][key] = hit_count
+            continue
+        facets["active_types"].add(key)
+        facets["has_killed"] = facets["has_killed"] or bool(killed)
+        shown = show_killed or not killed
+        if shown:
+            facets["types"][key] = facets["types"].get(key, 0) + hit_count
+        if key in selected:
+            facets["killed" if killed else "active"] += hit_count
+            if shown and sb:
+                facets["single_barrel"] += hit_count
+    return facets
+
+
+def _group_sort_expr(cols, sort: str) -> ColumnElement:
+    """SQL equivalent of the per-group sort keys the list pages offer."""
+    if sort == "type":
+        return sa.case(*[(cols.type == t, t.value.lower()) for t in BottleTypes])
+    if sort == "abv":
+        return sa.func.coalesce(cols.abv_max, 0)
+    if sort == "rating":
+        return sa.func.coalesce(cols.max_stars, 0)
+    if sort == "sb":
+        return cols.all_sb
+    if sort == "private":
+        return cols.any_private
+    if sort == "relevance":
+        return -cols.relevance
+    return cols.name_key
+
+
+def _group_order_by(cols, sort: str, direction: str) -> list:
+    sort_expr = _group_sort_expr(cols, sort)
+    # Groups are always tie-broken by (name, type) ascending, whichever way the primary key runs.
+    return [
+        sort_expr.desc() if direction == "desc" else sort_expr.asc(),
+        cols.name_key,
+        sa.cast(cols.type, sa.String),
+    ]
+
+
+def _as_float(value) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+# rows fetched (and eager-loaded) per round trip when a page is streamed
+_STREAM_BATCH_SIZE = 200
+
+
+def _iter_streamed(result) -> Iterator:
+    """Rows of a yield_per result, counting each batch fetched against the view's query budget."""
+    for partition in result.partitions():
+        count_stream_batch()
+        yield from partition
+
+
+def _iter_groups(rows) -> Iterator[Dict]:
+    """Fold rows of (Bottle, group aggregates), ordered by group, into one dict per group."""
+    for _, group_rows in groupby(rows, key=lambda r: (r.name_key, r.type)):
+        group_rows = list(group_rows)
+        head = group_rows[0]
+        yield {
+            "name": head.Bottle.name,
+            "type": head.type,
+            "count": head.count,
+            "bottles": [r.Bottle for r in group_rows],
+            "is_group": head.count > 1,
+            "abv_min": _as_float(head.abv_min),
+            "abv_max": _as_float(head.abv_max),
+            "max_stars": _as_float(head.max_stars),
+            "all_sb": bool(head.all_sb),
+            "relevance": float(head.relevance),
+        }
+
+
+def query_bottle_groups(
+    scope: List[ColumnElement],
+    is_my_list: bool,
+    q: str = "",
+    types: Optional[List[str]] = None,
+    show_killed: bool = False,
+    sort: str = "name",
+    direction: str = "asc",
+    page: int = 1,
+    per_page: int = 25,
+    stream: bool = False,
+) -> Dict:
+    """
+    List the bottles matched by `scope` grouped by (name, type), with filtering, search,
+    group ordering and LIMIT/OFFSET all applied in the database.
+
+    `scope` is the list of WHERE clauses that selects the collection being listed
+    (e.g. a user's bottles). Only the bottles on the requested page are loaded.
+    With `stream`, "grouped" is a generator that fetches the page in batches as it's
+    consumed, for rendering very large pages without holding them all in memory.
+    """
+    visible = list(scope)
+    if not is_my_list:
+        visible.append(Bottle.is_private.is_(False))
+
+    facets = bottle_facets(visible, q, types, show_killed)
+
+    filters = bottle_filter_clauses(q, types)
+    if not show_killed:
+        filters.append(Bottle.date_killed.is_(None))
+
+    is_private = sa.case((Bottle.is_private, 1), else_=0)
+    grouped = (
+        sa.select(
+            Bottle.group_key.label("name_key"),
+            Bottle.type.label("type"),
+            sa.func.count(Bottle.id).label("count"),
+            # a 0 ABV means "not recorded", so it mustn't become the group's minimum
+            sa.func.min(sa.func.nullif(Bottle.abv, 0)).label("abv_min"),
+            sa.func.max(sa.func.nullif(Bottle.abv, 0)).label("abv_max"),
+            sa.func.max(Bottle.stars).label("max_stars"),
+            sa.func.min(sa.case((Bottle.is_single_barrel, 1), else_=0)).label("all_sb"),
+            sa.func.max(is_private).label("any_private"),
+            sa.func.sum(is_private).label("private_count"),
+            sa.func.max(bottle_search_rank(q) if q else sa.literal(0.0)).label("relevance"),
+        )
+        .where(*visible, *filters)
+        .group_by(Bottle.group_key, Bottle.type)
+        .subquery("grouped")
+    )
+
+    total, total_bottles, private_count = db.session.execute(
+        sa.select(
+            sa.func.count(),
+            sa.func.coalesce(sa.func.sum(grouped.c.count), 0),
+            sa.func.coalesce(sa.func.sum(grouped.c.private_count), 0),
+        ).select_from(grouped)
+    ).one()
+
+    total_pages = max(1, (total + per_page - 1) // per_page)
+    page = min(page, total_pages)
+    offset = (page - 1) * per_page
+
+    groups = []
+    if total:
+        page_groups = (
+            sa.select(grouped)
+            .order_by(*_group_order_by(grouped.c, sort, direction))
+            .limit(per_page)
+            .offset(offset)
+            .subquery("page_groups")
+        )
+        stmt = (
+            sa.select(Bottle, page_groups)
+            .join(page_groups, sa.and_(Bottle.group_key == page_groups.c.name_key, Bottle.type == page_groups.c.type))
+            .where(*visible, *filters)
+            .order_by(*_group_order_by(page_groups.c, sort, direction), Bottle.user_num)
+            .options(*bottle_row_options())
+        )
+        if stream:
+            groups = _iter_groups(
+                _iter_streamed(db.session.execute(stmt.execution_options(yield_per=_STREAM_BATCH_SIZE)))
+            )
+        else:
+            groups = list(_iter_groups(db.session.execute(stmt).all()))
+
+    return {
+        "grouped": groups,
+        "total": total,
+        "total_bottles": int(total_bottles),
+        "private_count": int(private_count) if is_my_list else 0,
+        "page": page,
+        "per_page": per_page,
+        "total_pages": total_pages,
+        "has_killed": facets["has_killed"],
+        "active_types": facets["active_types"],
+        "killed_matches": 0 if show_killed else facets["killed"],
+        "facets": facets,
+    }
+
+
+# Sorts the keyset API supports: each is a total order once user_num breaks ties.
+KEYSET_SORTS = {"name", "type", "abv", "rating"}
+_NUMERIC_KEYSET_SORTS = {"abv", "rating"}
+
+
+class InvalidCursor(ValueError):
+    """A keyset cursor that is malformed or was issued for a different sort."""
+
+
+def _keyset_sort_expr(sort: str) -> ColumnElement:
+    if sort == "type":
+        return sa.case(*[(Bottle.type == t, t.value.lower()) for t in BottleTypes])
+    if sort == "abv":
+        return sa.func.coalesce(Bottle.abv, 0)
+    if sort == "rating":
+        return sa.func.coalesce(Bottle.stars, 0)
+    return Bottle.group_key
+
+
+def encode_cursor(sort: str, direction: str, key, user_num: int) -> str:
+    """Opaque cursor pointing just past the bottle with sort key `key` and `user_num`."""
+    payload = {"s": sort, "d": direction, "k": str(key) if sort in _NUMERIC_KEYSET_SORTS else key, "n": user_num}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, direction: str) -> Tuple:
+    """Return the (key, user_num) position in `cursor`, or raise InvalidCursor."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        issued_for, key, user_num = (payload["s"], payload["d"]), payload["k"], int(payload["n"])
+        key = Decimal(key) if sort in _NUMERIC_KEYSET_SORTS else str(key)
+    except (binascii.Error, ValueError, KeyError, TypeError, InvalidOperation) as e:
+        raise InvalidCursor("malformed cursor") from e
+    if issued_for != (sort, direction):
+        raise InvalidCursor("cursor was issued for a different sort order")
+    return key, user_num
+
+
+def query_bottle_page(
+    scope: List[ColumnElement],
+    is_my_list: bool,
+    q: str = "",
+    types: Optional[List[str]] = None,
+    show_killed: bool = False,
+    sort: str = "name",
+    direction: str = "asc",
+    cursor: Optional[str] = None,
+    limit: int = 50,
+) -> Dict:
+    """
+    One page of the bottles matched by `scope`, ordered by (sort key, user_num) and
+    paginated by keyset rather than OFFSET, so every page costs the same however deep it is.
+
+    Returns the bottles and a `next_cursor` to pass back for the following page
+    (None on the last page). Raises InvalidCursor for a bad `cursor`.
+    """
+    if sort not in KEYSET_SORTS:
+        sort = "name"
+    sort_key = _keyset_sort_expr(sort)
+    position = sa.tuple_(sort_key, Bottle.user_num)
+
+    stmt = sa.select(Bottle, sort_key.label("sort_key")).where(*scope, *bottle_filter_clauses(q, types))
+    if not is_my_list:
+        stmt = stmt.where(Bottle.is_private.is_(False))
+    if not show_killed:
+        stmt = stmt.where(Bottle.date_killed.is_(None))
+    if cursor:
+        after = sa.tuple_(*[sa.literal(v) for v in decode_cursor(cursor, sort, direction)])
+        stmt = stmt.where(position < after if direction == "desc" else position > after)
+    if direction == "desc":
+        stmt = stmt.order_by(sort_key.desc(), Bottle.user_num.desc())
+    else:
+        stmt = stmt.order_by(sort_key.asc(), Bottle.user_num.asc())
+
+    rows = db.session.execute(stmt.limit(limit + 1).options(*bottle_row_options())).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(sort, direction, last.sort_key, last.Bottle.user_num)
+    return {"bottles": [r.Bottle for r in rows], "next_cursor": next_cursor, "sort": sort}
@@ -0,0 +1,40 @@
+from flask import current_app
+from sqlalchemy.orm import joinedload, raiseload, selectinload
+
+from mywhiskies.models import Bottle
+
+# Loader bundles for the pages that render many bottles at once. Every relationship a
+# page touches per bottle is loaded up front (one extra SELECT per collection instead
+# of one per bottle). With STRICT_SQL_CHECKS on, anything else a page reaches for
+# raises instead of quietly lazy loading, so new N+1s show up as test failures.
+# The trailing lazyload("*") keeps that strictness from reaching the related objects
+# themselves (a distillery loaded here may still lazy load its own bottles).
+
+
+def _strict(options: list) -> list:
+    if current_app.config.get("STRICT_SQL_CHECKS"):
+        # sql_only: many-to-ones already in the identity map (e.g. bottle.user) are still allowed
+        options.append(raiseload("*", sql_only=True))
+    return options
+
+
+def bottle_row_options() -> list:
+    """Everything bottle/_bottle_rows.html and the entity detail pages read per bottle."""
+    return _strict(
+        [
+            selectinload(Bottle.images).lazyload("*"),
+            selectinload(Bottle.barrel_pickers).lazyload("*"),
+            selectinload(Bottle.distilleries).lazyload("*"),
+            joinedload(Bottle.bottler).lazyload("*"),
+        ]
+    )
+
+
+def bottle_export_options() -> list:
+    """What the CSV/JSON export reads per bottle."""
+    return _strict([selectinload(Bottle.distilleries).lazyload("*")])
+
+
+def bottle_image_options() -> list:
+    """What the image export and account deletion read per bottle."""
+    return _strict([selectinload(Bottle.images).lazyload("*")])
@@ -1,14 +1,20 @@
 import base64
+import hashlib
 import io
 import json
+import math
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
 from typing import Optional
 
 import anthropic
 from flask import current_app
-from PIL import Image
 
 from mywhiskies.models import BottleTypes
+from mywhiskies.services.bottle.image import JPEG_QUALITY, fit_image, open_checked_image, open_normalized_image
+from mywhiskies.services.bottle.scan_cache import cache_scan, get_cached_scan
 
 _TYPE_VALUES = ", ".join(t.value for t in BottleTypes)
 
@@ -36,43 +42,154 @@ if not visible on the label.
 
 Return only the JSON object, no explanation, no markdown fences.""".format(type_values=_TYPE_VALUES)
 
+_MODEL = "claude-opus-4-7"
+# Changes whenever the prompt or model does, so cached results from an older one are never served.
+PROMPT_VERSION = hashlib.sha256(f"{_MODEL}\n{_PROMPT}".encode()).hexdigest()[:16]
 
 _MAX_BYTES = 9 * 1024 * 1024  # 9 MB — stay comfortably under Anthropic's 10 MB limit
+# The model downsamples anything beyond this before looking at it, so larger images only add
+# upload bytes and latency.
+_MODEL_MAX_EDGE = 1568
+_MODEL_MAX_PIXELS = 1_150_000
+# Formats the API accepts as they are.
+_PASSTHROUGH_TYPES = {"image/jpeg", "image/png", "image/gif", "image/webp"}
+_PREPARE_WORKERS = 4
+
+
+def _scan_edge(width: int, height: int) -> Optional[int]:
+    """The long edge to resize an image to for the model, or None when it's small enough already."""
+    scale = min(_MODEL_MAX_EDGE / max(width, height), math.sqrt(_MODEL_MAX_PIXELS / (width * height)))
+    if scale >= 1:
+        return None
+    return max(1, math.floor(max(width, height) * scale))
+
 
+def _prepare_image(image: tuple[bytes, str]) -> tuple[bytes, str]:
+    """
+    One image as the model should receive it.
 
-def _shrink_if_needed(data: bytes, mime_type: str) -> tuple[bytes, str]:
-    if len(data) <= _MAX_BYTES:
+    The target size comes straight from the header, so a photo that is too big is decoded
+    (at a reduced JPEG scale where possible), resized and encoded exactly once. An image
+    that is already small enough, in a format the API takes, is passed through untouched.
+    """
+    data, mime_type = image
+    img = open_checked_image(io.BytesIO(data))
+    edge = _scan_edge(img.width, img.height)
+    if edge is None and mime_type in _PASSTHROUGH_TYPES and len(data) <= _MAX_BYTES:
         return data, mime_type
-    img = Image.open(io.BytesIO(data))
-    if img.mode not in ("RGB", "L"):
-        img = img.convert("RGB")
-    scale = 0.8
-    while True:
-        w = max(1, int(img.width * scale))
-        h = max(1, int(img.height * scale))
-        resized = img.resize((w, h), Image.LANCZOS)
-        buf = io.BytesIO()
-        resized.save(buf, format="JPEG", quality=85)
-        result = buf.getvalue()
-        if len(result) <= _MAX_BYTES or (w <= 200 and h <= 200):
-            return result, "image/jpeg"
-        scale *= 0.8
+    img = fit_image(open_normalized_image(io.BytesIO(data), edge), edge)
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+    return buf.getvalue(), "image/jpeg"
+
+
+class StubLabelScanClient:
+    """
+    Stands in for anthropic.Anthropic when LABEL_SCAN_CLIENT is "stub".
+
+    Answers every request with `result` (as the model would, JSON text) and keeps the
+    requests it was sent in `calls`.
+    """
+
+    def __init__(self, result: Optional[dict] = None) -> None:
+        self.result = result if result is not None else {"name": "Stub Label Bourbon", "type": "BOURBON"}
+        self.calls: list[dict] = []
+        self.messages = self
+
+    def create(self, **kwargs) -> SimpleNamespace:
+        self.calls.append(kwargs)
+        return SimpleNamespace(content=[SimpleNamespace(text=json.dumps(self.result))])
+
+
+_client_lock = threading.Lock()
+
+
+def get_scan_client():
+    """
+    The process-wide client label scans are sent through, or None when scanning isn't configured.
+
+    The Anthropic client is thread-safe and keeps a connection pool, so one is shared by
+    every scan rather than built per request.
+    """
+    client = current_app.extensions.get("label_scan_client")
+    if client is None:
+        with _client_lock:
+            client = current_app.extensions.get("label_scan_client")
+            if client is None:
+                if current_app.config.get("LABEL_SCAN_CLIENT") == "stub":
+                    client = StubLabelScanClient()
+                elif current_app.config.get("ANTHROPIC_API_KEY"):
+                    client = anthropic.Anthropic(
+                        api_key=current_app.config["ANTHROPIC_API_KEY"],
+                        timeout=current_app.config.get("LABEL_SCAN_TIMEOUT", 60),
+                    )
+                else:
+                    return None
+                current_app.extensions["label_scan_client"] = client
+    return client
+
+
+def prepare_scan_images(images: list[tuple[bytes, str]]) -> list[tuple[bytes, str]]:
+    """
+    The images as they are sent to the model, prepared in parallel; preparing them twice changes nothing.
+
+    Raises OSError or ValueError for an image that can't be read.
+    """
+    if len(images) > 1:
+        with ThreadPoolExecutor(min(len(images), _PREPARE_WORKERS), thread_name_prefix="scan-prepare") as pool:
+            prepared = list(pool.map(_prepare_image, images))
+    else:
+        prepared = [_prepare_image(image) for image in images]
+    before = sum(len(data) for data, _ in images)
+    after = sum(len(data) for data, _ in prepared)
+    if after < before:
+        current_app.logger.info(
+            f"Label scan: prepared {len(images)} image(s), {before} -> {after} bytes ({before - after} saved)"
+        )
+    return prepared
+
+
+def scan_cache_key(images: list[tuple[bytes, str]]) -> str:
+    """Identifies a scan of these prepared images with the current prompt."""
+    digest = hashlib.sha256(PROMPT_VERSION.encode())
+    for image_data, mime_type in images:
+        digest.update(f"\n{mime_type}:{len(image_data)}\n".encode())
+        digest.update(image_data)
+    return digest.hexdigest()
 
 
 def scan_bottle_label(images: list[tuple[bytes, str]]) -> Optional[dict]:
     """Scan one or more bottle label images and return extracted fields.
 
     images: list of (image_data, mime_type) tuples
+
+    A scan of images already scanned with the current prompt is answered from the cache.
     """
-    api_key = current_app.config.get("ANTHROPIC_API_KEY", "")
-    if not api_key or not images:
+    if get_scan_client() is None or not images:
         return None
+    images = prepare_scan_images(images)
+    key = scan_cache_key(images)
+    cached = get_cached_scan(key)
+    if cached is not None:
+        return cached
+    result = request_label_scan(images)
+    if result is not None:
+        cache_scan(key, result)
+    return result
+
+
+def request_label_scan(images: list[tuple[bytes, str]]) -> Optional[dict]:
+    """
+    Send prepared images to the model and parse its answer; None on failure.
 
-    client = anthropic.Anthropic(api_key=api_key)
+    Touches neither the cache nor the database, so it can run on any thread with an app context.
+    """
+    client = get_scan_client()
+    if client is None or not images:
+        return None
 
     content = []
     for image_data, mime_type in images:
-        image_data, mime_type = _shrink_if_needed(image_data, mime_type)
         b64 = base64.standard_b64encode(image_data).decode("utf-8")
         content.append(
             {
@@ -88,7 +205,7 @@ def scan_bottle_label(images: list[tuple[bytes, str]]) -> Optional[dict]:
 
     try:
         message = client.messages.create(
-            model="claude-opus-4-7",
+            model=_MODEL,
             max_tokens=512,
             messages=[{"role": "user", "content": content}],
         )
@@ -0,0 +1,66 @@
+import itertools
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from mywhiskies.extensions import db
+from mywhiskies.models import LabelScanCache
+
+# Each process prunes after this many of its own writes.
+_PRUNE_EVERY = 100
+_writes = itertools.count(1)
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _ttl() -> timedelta:
+    return timedelta(seconds=current_app.config.get("LABEL_SCAN_CACHE_TTL", 0))
+
+
+def get_cached_scan(key: str) -> Optional[dict]:
+    """The cached result for a scan key, or None when there isn't a live one."""
+    if not _ttl():
+        return None
+    entry = db.session.scalar(
+        db.select(LabelScanCache).where(LabelScanCache.key == key, LabelScanCache.created_at > _now() - _ttl())
+    )
+    if entry is None:
+        return None
+    entry.used_at = _now()
+    db.session.commit()
+    return json.loads(entry.result)
+
+
+def cache_scan(key: str, result: dict) -> None:
+    """Remember a scan's result; now and then drop expired entries and the least recently used past the cap."""
+    if not _ttl():
+        return
+    db.session.merge(LabelScanCache(key=key, result=json.dumps(result), created_at=_now(), used_at=_now()))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # a concurrent scan of the same images got there first
+        db.session.rollback()
+        return
+    if next(_writes) % _PRUNE_EVERY == 0:
+        prune_scan_cache()
+
+
+def prune_scan_cache() -> int:
+    """Delete expired entries, then the least recently used beyond LABEL_SCAN_CACHE_MAX_ENTRIES. Returns how many."""
+    deleted = db.session.execute(db.delete(LabelScanCache).where(LabelScanCache.created_at <= _now() - _ttl())).rowcount
+    max_entries = current_app.config.get("LABEL_SCAN_CACHE_MAX_ENTRIES", 0)
+    if max_entries:
+        # the newest `used_at` that falls outside the cap; it and everything older goes
+        cutoff = db.session.scalar(
+            db.select(LabelScanCache.used_at).order_by(LabelScanCache.used_at.desc()).offset(max_entries).limit(1)
+        )
+        if cutoff is not None:
+            deleted += db.session.execute(db.delete(LabelScanCache).where(LabelScanCache.used_at <= cutoff)).rowcount
+    db.session.commit()
+    return deleted
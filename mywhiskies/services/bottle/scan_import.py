@@ -0,0 +1,262 @@
+import json
+import mimetypes
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from flask import Flask, current_app
+
+from mywhiskies.extensions import db
+from mywhiskies.models import Bottle, BottleTypes, User
+from mywhiskies.services.bottle.image import queue_upload
+from mywhiskies.services.bottle.scan import prepare_scan_images, request_label_scan, scan_cache_key
+from mywhiskies.services.bottle.scan_cache import cache_scan, get_cached_scan
+from mywhiskies.services.bottle.scan_jobs import count_label_scans, scans_remaining
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp", ".gif"}
+# a bottle holds at most this many images
+MAX_IMAGES = 3
+
+ScanImages = list[tuple[bytes, str]]
+
+
+class ImportItem(NamedTuple):
+    """One bottle to import: a photo, or a subdirectory of photos of the same bottle."""
+
+    name: str  # relative to the import directory; identifies the item in the checkpoint
+    paths: List[str]
+
+
+class ImportResult(NamedTuple):
+    imported: int
+    failed: List[str]
+    skipped: int  # already imported by an earlier run
+    held: int = 0  # not scanned: the free tier's scan limit was reached
+
+
+class BatchScan(NamedTuple):
+    results: List[Optional[dict]]  # per item, in order; None where it failed or wasn't scanned
+    scans_used: int  # successful scans that weren't answered from the cache
+    held: List[int]  # indexes of items not scanned because of the scan limit
+
+
+class RateLimiter:
+    """Spaces calls at least 60/`per_minute` seconds apart, across threads; 0 means no limit."""
+
+    def __init__(self, per_minute: float) -> None:
+        self.interval = 60 / per_minute if per_minute else 0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def _is_image(filename: str) -> bool:
+    return not filename.startswith(".") and os.path.splitext(filename)[1].lower() in IMAGE_SUFFIXES
+
+
+def find_import_items(directory: str) -> List[ImportItem]:
+    """Photos directly in `directory` are one bottle each; each subdirectory is one bottle with up to 3 photos."""
+    items = []
+    for entry in sorted(os.scandir(directory), key=lambda e: e.name):
+        if entry.is_dir() and not entry.name.startswith("."):
+            paths = sorted(os.path.join(entry.path, name) for name in os.listdir(entry.path) if _is_image(name))
+            if paths:
+                items.append(ImportItem(entry.name, paths[:MAX_IMAGES]))
+        elif entry.is_file() and _is_image(entry.name):
+            items.append(ImportItem(entry.name, [entry.path]))
+    return items
+
+
+def _load_checkpoint(path: str, user: User) -> Dict[str, int]:
+    """{item name: user_num} for items an earlier run imported for `user`."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            checkpoint = json.load(f)
+    except FileNotFoundError:
+        return {}
+    if checkpoint.get("user_id") != user.id:
+        raise ValueError(f"Checkpoint {path} belongs to another user")
+    return checkpoint["imported"]
+
+
+def _save_checkpoint(path: str, user: User, imported: Dict[str, int]) -> None:
+    # write-then-rename so an interrupted run never leaves a half-written checkpoint
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({"user_id": user.id, "imported": imported}, f, indent=1)
+    os.replace(tmp, path)
+
+
+def _in_app_context(app: Flask, fn: Callable, *args):
+    with app.app_context():
+        return fn(*args)
+
+
+def _prepare(item: ImportItem) -> Optional[ScanImages]:
+    try:
+        images = []
+        for path in item.paths:
+            with open(path, "rb") as f:
+                images.append((f.read(), mimetypes.guess_type(path)[0] or "image/jpeg"))
+        return prepare_scan_images(images)
+    except (OSError, ValueError):
+        current_app.logger.warning(f"Label scan import: can't read {item.name}", exc_info=True)
+        return None
+
+
+def _scan(limiter: RateLimiter, images: ScanImages) -> Optional[dict]:
+    limiter.wait()
+    try:
+        return request_label_scan(images)
+    except Exception:
+        current_app.logger.exception("Label scan import: scan failed")
+        return None
+
+
+def _scan_batch(
+    pool: ThreadPoolExecutor, limiter: RateLimiter, items: List[ImportItem], scans_left: Optional[int]
+) -> BatchScan:
+    """
+    Scan each item, answering from the cache where possible and making at most `scans_left`
+    new scans (None: no limit).
+
+    Images are prepared and scanned on the pool; the cache is read and filled here, on the
+    calling thread, as it's the only one with a database session.
+    """
+    app = current_app._get_current_object()
+    prepared = list(pool.map(lambda item: _in_app_context(app, _prepare, item), items))
+    keys = [scan_cache_key(images) if images else None for images in prepared]
+    results = [get_cached_scan(key) if key else None for key in keys]
+    misses = [n for n, result in enumerate(results) if result is None and prepared[n]]
+    held = []
+    if scans_left is not None:
+        misses, held = misses[:scans_left], misses[scans_left:]
+    scanned = pool.map(lambda n: _in_app_context(app, _scan, limiter, prepared[n]), misses)
+    scans_used = 0
+    for n, result in zip(misses, scanned):
+        if result is not None:
+            cache_scan(keys[n], result)
+            results[n] = result
+            scans_used += 1
+    return BatchScan(results, scans_used, held)
+
+
+def _draft_bottle(user: User, item: ImportItem, result: dict, distilleries: dict, bottlers: dict) -> Bottle:
+    """A private bottle filled in from a scan, for the owner to check and publish."""
+
+    def number(key: str, kind: type):
+        try:
+            return kind(result[key]) if result.get(key) is not None else None
+        except (TypeError, ValueError):
+            return None
+
+    try:
+        bottle_type = BottleTypes(result.get("type"))
+    except ValueError:
+        bottle_type = BottleTypes.OTHER
+    name = str(result.get("name") or os.path.splitext(item.name)[0])[:100]
+    bottle = Bottle(
+        user_id=user.id,
+        name=name,
+        type=bottle_type,
+        abv=number("abv", float),
+        size=number("size", int),
+        year_barrelled=number("year_barrelled", int),
+        year_bottled=number("year_bottled", int),
+        is_single_barrel=bool(result.get("is_single_barrel")),
+        description=result.get("description") or None,
+        is_private=True,
+        personal_note=f"Imported from a label scan of {item.name}. Check the details, then make it public.",
+    )
+    distillery = distilleries.get(str(result.get("distillery") or "").casefold())
+    if distillery is not None:
+        bottle.distilleries.append(distillery)
+    bottle.bottler = bottlers.get(str(result.get("bottler") or "").casefold())
+    return bottle
+
+
+def _insert_drafts(user: User, scanned: List[tuple], scans_used: int) -> Dict[str, int]:
+    """
+    Insert a batch of draft bottles and queue their photos, and count the scans they used up,
+    all in one commit. Returns {item name: user_num}.
+    """
+    distilleries = {d.name.casefold(): d for d in user.distilleries}
+    bottlers = {b.name.casefold(): b for b in user.bottlers}
+    bottles = [_draft_bottle(user, item, result, distilleries, bottlers) for item, result in scanned]
+    db.session.add_all(bottles)
+    # one flush for the batch: one user_num reservation covers every bottle in it
+    db.session.flush()
+    for (item, _), bottle in zip(scanned, bottles):
+        for sequence, path in enumerate(item.paths, start=1):
+            with open(path, "rb") as f:
+                queue_upload(bottle, sequence, f, user.is_pro)
+    user_nums = {item.name: bottle.user_num for (item, _), bottle in zip(scanned, bottles)}
+    if scans_used:
+        count_label_scans(user.id, scans_used)
+    db.session.commit()
+    return user_nums
+
+
+def import_label_scans(
+    user: User,
+    directory: str,
+    checkpoint_path: str,
+    concurrency: int = 4,
+    per_minute: float = 30,
+    batch_size: int = 25,
+    progress: Callable[[str], None] = lambda message: None,
+) -> ImportResult:
+    """
+    Scan a directory of label photos and add a draft bottle for each, with its photos queued for upload.
+
+    Scans run `concurrency` at a time, no more than `per_minute` a minute. Bottles are inserted
+    `batch_size` at a time, and each committed batch is recorded in the checkpoint, so a run that
+    is interrupted, or that had failures, picks up where it left off when started again.
+    Non-Pro users stop at the free tier's bottle limit, and at its scan limit: as in the app,
+    each successful scan that isn't answered from the cache uses one up.
+    """
+    imported = _load_checkpoint(checkpoint_path, user)
+    items = find_import_items(directory)
+    todo = [item for item in items if item.name not in imported]
+    skipped = len(items) - len(todo)
+    if not user.is_pro:
+        bottle_count = db.session.scalar(db.select(db.func.count(Bottle.id)).where(Bottle.user_id == user.id))
+        room = current_app.config["FREE_TIER_BOTTLE_LIMIT"] - bottle_count
+        if len(todo) > room:
+            progress(f"Free-tier limit: importing {max(room, 0)} of {len(todo)} bottles.")
+            todo = todo[: max(room, 0)]
+
+    limiter = RateLimiter(per_minute)
+    failed = []
+    count = 0
+    held = 0
+    with ThreadPoolExecutor(concurrency, thread_name_prefix="scan-import") as pool:
+        for start in range(0, len(todo), batch_size):
+            batch = todo[start : start + batch_size]
+            scan = _scan_batch(pool, limiter, batch, scans_remaining(user))
+            failed += [
+                item.name
+                for n, (item, result) in enumerate(zip(batch, scan.results))
+                if result is None and n not in scan.held
+            ]
+            scanned = [(item, result) for item, result in zip(batch, scan.results) if result is not None]
+            if scanned:
+                imported.update(_insert_drafts(user, scanned, scan.scans_used))
+                _save_checkpoint(checkpoint_path, user, imported)
+                count += len(scanned)
+            progress(f"{start + len(batch)}/{len(todo)} scanned: {count} imported, {len(failed)} failed")
+            if scan.held:
+                held = len(scan.held) + len(todo) - start - len(batch)
+                progress(f"Free-tier scan limit reached: {held} bottles not scanned.")
+                break
+    return ImportResult(count, failed, skipped, held)
@@ -0,0 +1,168 @@
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from flask import Flask, current_app
+
+from mywhiskies.extensions import db
+from mywhiskies.models import LabelScanJob, User
+from mywhiskies.services.bottle.scan import scan_bottle_label
+
+# A job still pending after this was lost with the process running it.
+ABANDONED_AFTER = timedelta(minutes=5)
+# Finished jobs are kept this long for the client to collect.
+RETENTION = timedelta(days=1)
+
+ScanImages = list[tuple[bytes, str]]
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def scans_remaining(user: User) -> Optional[int]:
+    """Scans a free-tier user has left, counting the ones still running as used; None for Pro users."""
+    if user.is_pro:
+        return None
+    pending = db.session.scalar(
+        db.select(db.func.count(LabelScanJob.id)).where(
+            LabelScanJob.user_id == user.id,
+            LabelScanJob.status == LabelScanJob.PENDING,
+            LabelScanJob.created_at > _now() - ABANDONED_AFTER,
+        )
+    )
+    return max(current_app.config["FREE_TIER_SCAN_LIMIT"] - user.glen_scan_count - pending, 0)
+
+
+def scan_limit_reached(user: User) -> bool:
+    """True when a free-tier user has no scans left."""
+    return scans_remaining(user) == 0
+
+
+def count_label_scans(user_id: str, scans: int = 1) -> None:
+    """
+    Use up free-tier scans; Pro users' scans aren't counted. Incremented in SQL, as scans can
+    finish concurrently. Only successful scans count. The caller commits.
+    """
+    db.session.execute(
+        db.update(User)
+        .where(User.id == user_id, User.is_pro.is_(False))
+        .values(glen_scan_count=User.glen_scan_count + scans)
+    )
+
+
+def start_label_scan(user: User, images: ScanImages) -> Optional[LabelScanJob]:
+    """Record a scan job and hand it to the runner. Returns None when the runner is full."""
+    db.session.execute(
+        db.delete(LabelScanJob).where(LabelScanJob.user_id == user.id, LabelScanJob.created_at < _now() - RETENTION)
+    )
+    job = LabelScanJob(user_id=user.id)
+    db.session.add(job)
+    db.session.commit()
+    if not get_label_scans().submit(job.id, images):
+        db.session.delete(job)
+        db.session.commit()
+        return None
+    return job
+
+
+def get_label_scan(user: User, job_id: str) -> Optional[LabelScanJob]:
+    """One of the user's scan jobs, with a pending job that was abandoned reported as failed."""
+    db.session.execute(
+        db.update(LabelScanJob)
+        .where(
+            LabelScanJob.id == job_id,
+            LabelScanJob.status == LabelScanJob.PENDING,
+            LabelScanJob.created_at < _now() - ABANDONED_AFTER,
+        )
+        .values(status=LabelScanJob.FAILED, finished_at=_now())
+    )
+    db.session.commit()
+    return db.session.scalar(db.select(LabelScanJob).filter_by(id=job_id, user_id=user.id))
+
+
+def run_label_scan(job_id: str, images: ScanImages) -> bool:
+    """Scan a job's images and record the outcome. Returns True when the scan succeeded."""
+    job = db.session.get(LabelScanJob, job_id)
+    if job is None:
+        return False
+    try:
+        result = scan_bottle_label(images)
+    except Exception:
+        current_app.logger.exception(f"Label scan {job_id} failed")
+        result = None
+
+    job.finished_at = _now()
+    if result is None:
+        job.status = LabelScanJob.FAILED
+    else:
+        job.status = LabelScanJob.DONE
+        job.result = json.dumps(result)
+        count_label_scans(job.user_id)
+    db.session.commit()
+    return result is not None
+
+
+class LabelScanRunner:
+    """
+    Runs label scans on a bounded pool of threads, off the request workers.
+
+    At most `max_pending` scans are accepted at once (running plus waiting); past that,
+    `submit` refuses rather than queueing without limit. The pool is created on first use so
+    each forked server process gets its own. With `workers=0` scans run inline.
+    """
+
+    def __init__(self, app: Flask, workers: int, max_pending: int) -> None:
+        self.app = app
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[threading.BoundedSemaphore] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _start(self) -> None:
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    if self.workers:
+                        self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="label-scan")
+                    self._slots = threading.BoundedSemaphore(self.max_pending)
+                    self._pid = os.getpid()
+
+    def submit(self, job_id: str, images: ScanImages) -> bool:
+        """Start scanning; False when this process already has `max_pending` scans."""
+        self._start()
+        if not self._slots.acquire(blocking=False):
+            return False
+        if not self.workers:
+            try:
+                run_label_scan(job_id, images)
+            finally:
+                self._slots.release()
+            return True
+        self._executor.submit(self._run, job_id, images)
+        return True
+
+    def _run(self, job_id: str, images: ScanImages) -> None:
+        try:
+            with self.app.app_context():
+                try:
+                    run_label_scan(job_id, images)
+                except Exception:
+                    self.app.logger.exception(f"Label scan runner failed on {job_id}")
+        finally:
+            self._slots.release()
+
+
+def get_label_scans() -> LabelScanRunner:
+    return current_app.extensions["label_scans"]
+
+
+def register_label_scans(app: Flask) -> None:
+    app.extensions["label_scans"] = LabelScanRunner(
+        app, app.config.get("LABEL_SCAN_WORKERS", 0), app.config.get("LABEL_SCAN_MAX_PENDING", 16)
+    )
@@ -0,0 +1,68 @@
+from typing import Callable, Dict, Iterable, Optional
+
+from flask import url_for
+
+from mywhiskies.models import Bottle
+
+
+def _number(value) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+def _date(value) -> Optional[str]:
+    return value.date().isoformat() if value else None
+
+
+BOTTLE_FIELDS: Dict[str, Callable[[Bottle], object]] = {
+    "user_num": lambda b: b.user_num,
+    "name": lambda b: b.name,
+    "type": lambda b: b.type.value,
+    "abv": lambda b: _number(b.abv),
+    "stars": lambda b: _number(b.stars),
+    "cost": lambda b: _number(b.cost),
+    "size": lambda b: b.size,
+    "year_barrelled": lambda b: b.year_barrelled,
+    "year_bottled": lambda b: b.year_bottled,
+    "is_single_barrel": lambda b: b.is_single_barrel,
+    "date_purchased": lambda b: _date(b.date_purchased),
+    "date_opened": lambda b: _date(b.date_opened),
+    "date_killed": lambda b: _date(b.date_killed),
+    "description": lambda b: b.description,
+    "review": lambda b: b.review,
+    "url": lambda b: b.url,
+    "bottler": lambda b: b.bottler.name if b.bottler else None,
+    "distilleries": lambda b: sorted(d.name for d in b.distilleries),
+    "barrel_pickers": lambda b: sorted(p.name for p in b.barrel_pickers),
+    "image_count": lambda b: len(b.images),
+    "detail_url": lambda b: url_for("bottle.detail", username=b.user.username, user_num=b.user_num, _external=True),
+}
+
+# only ever shown to the bottle's owner
+OWNER_FIELDS: Dict[str, Callable[[Bottle], object]] = {
+    "is_private": lambda b: b.is_private,
+    "personal_note": lambda b: b.personal_note,
+}
+
+DEFAULT_FIELDS = ("user_num", "name", "type", "abv", "stars", "detail_url")
+
+
+def parse_fields(raw: Optional[str], is_my_list: bool) -> tuple:
+    """
+    Turn a `fields=name,abv` query parameter into the list of fields to serialize.
+
+    Raises ValueError naming any field that doesn't exist or isn't visible to the viewer.
+    """
+    if not raw:
+        return DEFAULT_FIELDS
+    fields = tuple(dict.fromkeys(f.strip() for f in raw.split(",") if f.strip()))
+    allowed = BOTTLE_FIELDS.keys() | (OWNER_FIELDS.keys() if is_my_list else set())
+    unknown = [f for f in fields if f not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+
+def bottle_to_dict(bottle: Bottle, fields: Iterable[str]) -> Dict:
+    """Serialize the requested `fields` of a bottle; fields must come from parse_fields."""
+    getters = BOTTLE_FIELDS | OWNER_FIELDS
+    return {f: getters[f](bottle) for f in fields}
@@ -0,0 +1,180 @@
+import io
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from flask import Flask, current_app
+from sqlalchemy.orm.exc import ObjectDeletedError, StaleDataError
+
+from mywhiskies.common.storage import StorageError
+from mywhiskies.extensions import db
+from mywhiskies.models import ImageUploadJob
+from mywhiskies.services.bottle.image import (
+    delete_bottle_images,
+    delete_stored_images,
+    encode_renditions,
+    renditions_for,
+    store_renditions,
+    stored_image_keys,
+)
+
+# How long a claimed job is hidden from other workers; a worker that dies mid-job loses it after this.
+LEASE = timedelta(minutes=5)
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = timedelta(seconds=15)
+BACKOFF_MAX = timedelta(minutes=30)
+_CLAIM_CANDIDATES = 5
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def backoff(attempts: int) -> timedelta:
+    """Delay before retrying a job that has failed `attempts` times."""
+    return min(BACKOFF_BASE * 2 ** min(attempts - 1, 16), BACKOFF_MAX)
+
+
+def claim_upload_job() -> Optional[str]:
+    """
+    Claim the next due job, or None when nothing is due.
+
+    The claim is a conditional UPDATE on the `run_at` that was read, so when several
+    workers (threads or processes) race for a job exactly one of them gets it.
+    """
+    now = _now()
+    candidates = db.session.execute(
+        db.select(ImageUploadJob.id, ImageUploadJob.run_at)
+        .where(ImageUploadJob.run_at <= now)
+        .order_by(ImageUploadJob.run_at)
+        .limit(_CLAIM_CANDIDATES)
+    ).all()
+    for job_id, run_at in candidates:
+        claimed = db.session.execute(
+            db.update(ImageUploadJob)
+            .where(ImageUploadJob.id == job_id, ImageUploadJob.run_at == run_at)
+            .values(run_at=now + LEASE, attempts=ImageUploadJob.attempts + 1)
+        ).rowcount
+        db.session.commit()
+        if claimed:
+            return job_id
+    return None
+
+
+def run_upload_job(job_id: str) -> bool:
+    """Render and store a claimed job's image. Returns True once the image is ready."""
+    job = db.session.get(ImageUploadJob, job_id)
+    if job is None:
+        return False
+    image = job.image
+    if image is None:
+        # the image went away without the database cascading to its job
+        db.session.delete(job)
+        db.session.commit()
+        return False
+    keys = stored_image_keys([image])
+
+    try:
+        renditions = renditions_for(job.is_pro)
+        encoded = dict(zip(renditions, encode_renditions(io.BytesIO(job.data), renditions)))
+        store_renditions(image, encoded)
+    except StorageError as e:
+        if job.attempts >= MAX_ATTEMPTS:
+            _give_up(job, e)
+        else:
+            job.run_at = _now() + backoff(job.attempts)
+            job.last_error = str(e)[:500]
+            db.session.commit()
+            current_app.logger.warning(f"Image upload {job.id} failed (attempt {job.attempts}), will retry: {e}")
+        return False
+    except (OSError, ValueError) as e:
+        # the file itself is bad; retrying won't help
+        _give_up(job, e)
+        return False
+
+    image.is_ready = True
+    db.session.delete(job)
+    try:
+        db.session.commit()
+    except (ObjectDeletedError, StaleDataError):
+        # the image was removed while it was being stored; what was just stored is now orphaned
+        db.session.rollback()
+        db.session.execute(db.delete(ImageUploadJob).where(ImageUploadJob.id == job_id))
+        db.session.commit()
+        delete_stored_images(keys)
+        current_app.logger.info(f"Image upload {job_id} finished after its image was removed; deleted what it stored")
+        return False
+    return True
+
+
+def _give_up(job: ImageUploadJob, error: Exception) -> None:
+    image = job.image
+    current_app.logger.error(
+        f"Image upload {job.id} for bottle {image.bottle_id} failed after {job.attempts} attempt(s): {error}"
+    )
+    db.session.delete(job)
+    # drops the placeholder and closes the gap it leaves in the sequence
+    delete_bottle_images(image.bottle, [image.id])
+
+
+def process_upload_jobs(limit: Optional[int] = None) -> int:
+    """Run due jobs until none are left, or `limit` have run. Returns how many ran."""
+    ran = 0
+    while limit is None or ran < limit:
+        job_id = claim_upload_job()
+        if job_id is None:
+            break
+        run_upload_job(job_id)
+        ran += 1
+    return ran
+
+
+class UploadWorkers:
+    """
+    Daemon threads that drain the upload queue inside a web process.
+
+    Threads are started on first use rather than at app creation so that each forked
+    server process gets its own. They poll every `poll_interval` seconds, which also picks
+    up jobs queued by other processes, and are woken early when this process queues one.
+    """
+
+    def __init__(self, app: Flask, size: int, poll_interval: float) -> None:
+        self.app = app
+        self.size = size
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+
+    def start(self) -> None:
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            for n in range(self.size):
+                threading.Thread(target=self._run, name=f"image-upload-{n}", daemon=True).start()
+
+    def notify(self) -> None:
+        self.start()
+        self._wake.set()
+
+    def _run(self) -> None:
+        while True:
+            with self.app.app_context():
+                try:
+                    ran = process_upload_jobs(limit=1)
+                except Exception:
+                    self.app.logger.exception("Image upload worker failed")
+                    ran = 0
+            if not ran:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+
+def register_upload_workers(app: Flask) -> None:
+    size = app.config.get("IMAGE_UPLOAD_WORKERS", 0)
+    if size:
+        workers = UploadWorkers(app, size, app.config.get("IMAGE_UPLOAD_POLL_SECONDS", 5))
+        app.extensions["upload_workers"] = workers
+        app.before_request(workers.start)
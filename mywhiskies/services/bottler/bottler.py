@@ -2,16 +2,12 @@ from typing import Dict
 
 from flask import current_app, flash, url_for
 from markupsafe import Markup
+from sqlalchemy import func, select
 
 from mywhiskies.extensions import db
 from mywhiskies.forms.bottler import BottlerAddForm, BottlerEditForm
-from mywhiskies.models import Bottler, User
-
-_SORT_FNS = {
-    "name": lambda b: b.name.lower(),
-    "bottles": lambda b: len(b.bottles),
-    "location": lambda b: f"{b.region_1 or ''} {b.region_2 or ''}".lower(),
-}
+from mywhiskies.models import Bottle, Bottler, User
+from mywhiskies.services.utils import choice_page, list_with_bottle_counts, name_match_clause
 
 
 def list_bottlers(
@@ -23,25 +19,26 @@ def list_bottlers(
     page: int = 1,
     per_page: int = 25,
 ) -> Dict:
-    bottlers = list(user.bottlers)
-
-    if q:
-        bottlers = [b for b in bottlers if q.lower() in b.name.lower()]
-
-    total = len(bottlers)
-    bottlers.sort(key=_SORT_FNS.get(sort, _SORT_FNS["name"]), reverse=(direction == "desc"))
-
-    total_pages = max(1, (total + per_page - 1) // per_page)
-    page = min(page, total_pages)
-    offset = (page - 1) * per_page
-
-    return {
-        "bottlers": bottlers[offset : offset + per_page],
-        "total": total,
-        "page": page,
-        "per_page": per_page,
-        "total_pages": total_pages,
-    }
+    counts = (
+        select(Bottle.bottler_id.label("entity_id"), func.count().label("bottle_count"))
+        .where(Bottle.user_id == user.id, Bottle.bottler_id.is_not(None))
+        .group_by(Bottle.bottler_id)
+        .subquery()
+    )
+    location = func.lower(func.coalesce(Bottler.region_1, "") + " " + func.coalesce(Bottler.region_2, ""))
+    data = list_with_bottle_counts(
+        Bottler, counts, user, q, sort, direction, page, per_page, sort_exprs={"location": location}
+    )
+    data["bottlers"] = data.pop("items")
+    return data
+
+
+def search_bottlers(user: User, q: str = "", page: int = 1) -> Dict:
+    """A page of the user's bottlers matching `q`, for the bottle form's bottler picker."""
+    matches = select(Bottler.id.label("id"), Bottler.name.label("text")).where(
+        Bottler.user_id == user.id, name_match_clause(Bottler.name, q)
+    )
+    return choice_page(matches, page)
 
 
 def add_bottler(form: BottlerAddForm, user: User) -> None:
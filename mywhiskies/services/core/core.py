@@ -1,10 +1,10 @@
 from typing import Any, Dict, List, Tuple
 
 from flask_login import current_user
-from sqlalchemy import func, select
+from sqlalchemy import func, select, union
 
 from mywhiskies.extensions import db
-from mywhiskies.models import Bottle, Distillery, User
+from mywhiskies.models import Bottle, CatalogDistillery, Distillery, User
 
 
 def get_index_counts() -> Dict[str, Any]:
@@ -22,7 +22,9 @@ def _get_user_count() -> int:
 
 
 def _get_distillery_count() -> int:
-    return db.session.execute(select(func.count(Distillery.name.distinct()))).scalar()
+    # the catalog plus the distilleries users added themselves; linked copies share their catalog entry's name
+    names = union(select(Distillery.name), select(CatalogDistillery.name)).subquery()
+    return db.session.execute(select(func.count()).select_from(names)).scalar()
 
 
 def _get_bottle_count() -> int:
@@ -1,35 +1,134 @@
 import json
-import os
-from typing import Dict
+from typing import Dict, List, Tuple
 
-from flask import Flask, current_app, flash, url_for
+from flask import current_app, flash, url_for
 from markupsafe import Markup
-from sqlalchemy import insert
+from sqlalchemy import func, literal, select, union_all
 
 from mywhiskies.extensions import db
 from mywhiskies.forms.distillery import DistilleryAddForm, DistilleryEditForm
-from mywhiskies.models import Distillery, User
-
-_SORT_FNS = {
-    "name": lambda d: d.name.lower(),
-    "bottles": lambda d: len(d.bottles),
-    "location": lambda d: f"{d.region_1 or ''} {d.region_2 or ''}".lower(),
-}
-
-
-def bulk_add_distillery(user: User, app: Flask) -> None:
-    json_file = os.path.join(app.static_folder, "data", "base_distilleries.json")
-
-    with open(json_file, mode="r", encoding="utf-8") as f:
-        data = json.load(f)
-
-        base_distilleries = data.get("distilleries")
-        for i, distillery in enumerate(base_distilleries, 1):
-            distillery["user_id"] = user.id
-            distillery["user_num"] = i
-
-        db.session.execute(insert(Distillery), base_distilleries)
-        db.session.commit()
+from mywhiskies.models import Bottle, CatalogDistillery, Distillery, User, bottle_distillery
+from mywhiskies.models.distillery import CATALOG_FIELDS
+from mywhiskies.services.utils import choice_page, list_with_bottle_counts, name_match_clause, selected_choices
+
+# prefix of picker values that refer to a catalog entry rather than one of the user's distilleries
+CATALOG_PREFIX = "catalog:"
+
+
+def catalog_choices(user: User) -> List[CatalogDistillery]:
+    """Catalog distilleries `user` can still pick: not yet linked, and no distillery of theirs has the name."""
+    own_names = select(func.lower(Distillery.name)).where(Distillery.user_id == user.id)
+    return db.session.scalars(
+        select(CatalogDistillery)
+        .where(func.lower(CatalogDistillery.name).not_in(own_names))
+        .order_by(CatalogDistillery.name)
+    ).all()
+
+
+def distillery_choices(user: User) -> List[Tuple[str, str]]:
+    """(value, name) pairs for a distillery picker: the user's own distilleries, then the catalog's."""
+    own = sorted(user.distilleries, key=lambda d: d.name.lower())
+    return [(d.id, d.name) for d in own] + [(f"{CATALOG_PREFIX}{c.id}", c.name) for c in catalog_choices(user)]
+
+
+def search_distilleries(user: User, q: str = "", page: int = 1) -> Dict:
+    """A page of the user's distilleries and pickable catalog entries matching `q`, for the picker's search."""
+    own_names = select(func.lower(Distillery.name)).where(Distillery.user_id == user.id)
+    own = select(Distillery.id.label("id"), Distillery.name.label("text")).where(
+        Distillery.user_id == user.id, name_match_clause(Distillery.name, q)
+    )
+    catalog = select(
+        (literal(CATALOG_PREFIX) + CatalogDistillery.id).label("id"), CatalogDistillery.name.label("text")
+    ).where(name_match_clause(CatalogDistillery.name, q), func.lower(CatalogDistillery.name).not_in(own_names))
+    return choice_page(union_all(own, catalog), page)
+
+
+def selected_distillery_choices(user: User, values: List) -> List[Tuple[str, str]]:
+    """(value, name) choices for the picked distilleries and catalog entries, from one query each."""
+    values = [str(getattr(v, "id", v)) for v in values or [] if v]
+    catalog_ids = [v.removeprefix(CATALOG_PREFIX) for v in values if v.startswith(CATALOG_PREFIX)]
+    names = dict(selected_choices(Distillery, user, [v for v in values if not v.startswith(CATALOG_PREFIX)]))
+    if catalog_ids:
+        entries = select(CatalogDistillery.id, CatalogDistillery.name).where(CatalogDistillery.id.in_(catalog_ids))
+        names.update((f"{CATALOG_PREFIX}{id_}", name) for id_, name in db.session.execute(entries))
+    return [(v, names[v]) for v in values if v in names]
+
+
+def resolve_distilleries(user: User, values: List[str]) -> List[Distillery]:
+    """
+    Turn picker values into the user's Distillery rows, in order.
+
+    Catalog picks are linked on first use: the user gets a Distillery copied from the
+    catalog entry, which later picks of the same entry reuse.
+    """
+    catalog_ids = [v.removeprefix(CATALOG_PREFIX) for v in values if v.startswith(CATALOG_PREFIX)]
+    linked = {}
+    if catalog_ids:
+        linked = {
+            d.catalog_id: d
+            for d in db.session.scalars(
+                select(Distillery).where(Distillery.user_id == user.id, Distillery.catalog_id.in_(catalog_ids))
+            )
+        }
+        for entry in db.session.scalars(select(CatalogDistillery).where(CatalogDistillery.id.in_(catalog_ids))):
+            if entry.id not in linked:
+                linked[entry.id] = Distillery(
+                    user_id=user.id, catalog_id=entry.id, **{f: getattr(entry, f) for f in CATALOG_FIELDS}
+                )
+                db.session.add(linked[entry.id])
+
+    own_ids = [v for v in values if not v.startswith(CATALOG_PREFIX)]
+    own = {}
+    if own_ids:
+        own = {
+            d.id: d
+            for d in db.session.scalars(
+                select(Distillery).where(Distillery.user_id == user.id, Distillery.id.in_(own_ids))
+            )
+        }
+
+    distilleries = []
+    for value in values:
+        if value.startswith(CATALOG_PREFIX):
+            distillery = linked.get(value.removeprefix(CATALOG_PREFIX))
+        else:
+            distillery = own.get(value)
+        if distillery is not None:
+            distilleries.append(distillery)
+    return distilleries
+
+
+def sync_distillery_catalog(path: str) -> Tuple[int, int]:
+    """
+    Load the catalog from a JSON file of `{"distilleries": [...]}`, matching entries on name.
+
+    Changed entries are pushed to every user distillery still linked to them. Returns the
+    number of entries added and updated.
+    """
+    with open(path, mode="r", encoding="utf-8") as f:
+        rows = json.load(f)["distilleries"]
+
+    existing = {c.name: c for c in db.session.scalars(select(CatalogDistillery))}
+    added = updated = 0
+    for row in rows:
+        values = {f: row.get(f) for f in CATALOG_FIELDS}
+        entry = existing.get(values["name"].strip())
+        if entry is None:
+            db.session.add(CatalogDistillery(**values))
+            added += 1
+            continue
+        for field, value in values.items():
+            setattr(entry, field, value)
+        if not db.session.is_modified(entry):
+            continue
+        # flush first so the links below still match their entry and aren't detached
+        db.session.flush()
+        updated += 1
+        for distillery in db.session.scalars(select(Distillery).where(Distillery.catalog_id == entry.id)):
+            for field in CATALOG_FIELDS:
+                setattr(distillery, field, getattr(entry, field))
+    db.session.commit()
+    return added, updated
 
 
 def list_distilleries(
@@ -41,25 +140,19 @@ def list_distilleries(
     page: int = 1,
     per_page: int = 25,
 ) -> Dict:
-    distilleries = list(user.distilleries)
-
-    if q:
-        distilleries = [d for d in distilleries if q.lower() in d.name.lower()]
-
-    total = len(distilleries)
-    distilleries.sort(key=_SORT_FNS.get(sort, _SORT_FNS["name"]), reverse=(direction == "desc"))
-
-    total_pages = max(1, (total + per_page - 1) // per_page)
-    page = min(page, total_pages)
-    offset = (page - 1) * per_page
-
-    return {
-        "distilleries": distilleries[offset : offset + per_page],
-        "total": total,
-        "page": page,
-        "per_page": per_page,
-        "total_pages": total_pages,
-    }
+    counts = (
+        select(bottle_distillery.c.distillery_id.label("entity_id"), func.count().label("bottle_count"))
+        .join(Bottle, Bottle.id == bottle_distillery.c.bottle_id)
+        .where(Bottle.user_id == user.id)
+        .group_by(bottle_distillery.c.distillery_id)
+        .subquery()
+    )
+    location = func.lower(func.coalesce(Distillery.region_1, "") + " " + func.coalesce(Distillery.region_2, ""))
+    data = list_with_bottle_counts(
+        Distillery, counts, user, q, sort, direction, page, per_page, sort_exprs={"location": location}
+    )
+    data["distilleries"] = data.pop("items")
+    return data
 
 
 def add_distillery(form: DistilleryAddForm, user: User) -> None:
@@ -1,74 +1,104 @@
-from collections import Counter
 from typing import Any, Dict, List, Optional
 
-from mywhiskies.models import User
+import sqlalchemy as sa
+
+from mywhiskies.extensions import db
+from mywhiskies.models import Bottle, Bottler, Distillery, User, bottle_distillery
 from mywhiskies.models.bottle import BottleTypes
 
+TOP_LIMIT = 10
+
+
+def _count_if(condition) -> sa.ColumnElement:
+    return sa.func.coalesce(sa.func.sum(sa.case((condition, 1), else_=0)), 0)
+
 
 def get_collection_insights(user: User) -> Dict[str, Any]:
-    bottles = user.bottles
-    total = len(bottles)
+    """
+    Summary statistics for a user's collection.
 
+    Computed by four aggregate queries (totals and ABV buckets, types, distilleries, bottlers),
+    so the cost doesn't grow with the number of bottles loaded into Python.
+    """
+    mine = Bottle.user_id == user.id
+    totals = db.session.execute(
+        db.select(
+            sa.func.count(Bottle.id).label("total"),
+            sa.func.count(Bottle.date_killed).label("killed"),
+            sa.func.avg(Bottle.abv).label("avg_abv"),
+            _count_if(Bottle.is_single_barrel).label("single_barrel"),
+            _count_if(Bottle.abv < 46).label("under_46"),
+            _count_if(Bottle.abv.between(46, 55)).label("range_46_55"),
+            _count_if(Bottle.abv > 55).label("over_55"),
+            _count_if(Bottle.abv.is_(None)).label("unknown"),
+        ).where(mine)
+    ).one()
+
+    total = totals.total
     if total == 0:
         return _empty_insights()
 
-    active = [b for b in bottles if not b.date_killed]
-    killed = [b for b in bottles if b.date_killed]
-
-    abv_bottles = [b for b in bottles if b.abv is not None]
-    avg_abv: Optional[float] = None
-    if abv_bottles:
-        avg_abv = round(sum(float(b.abv) for b in abv_bottles) / len(abv_bottles), 1)
-
-    type_counts: Counter = Counter(b.type for b in bottles)
-    most_common_type: Optional[str] = None
-    if type_counts:
-        most_common_type = type_counts.most_common(1)[0][0].value
-
-    single_barrel_count = sum(1 for b in bottles if b.is_single_barrel)
-
-    type_breakdown: List[Dict] = []
-    for bottle_type in BottleTypes:
-        count = type_counts.get(bottle_type, 0)
-        if count > 0:
-            type_breakdown.append(
-                {
-                    "type": bottle_type.value,
-                    "count": count,
-                    "percentage": round(count / total * 100, 1),
-                }
-            )
-    type_breakdown.sort(key=lambda x: x["count"], reverse=True)
+    avg_abv: Optional[float] = round(float(totals.avg_abv), 1) if totals.avg_abv is not None else None
 
-    abv_under_46 = sum(1 for b in bottles if b.abv is not None and float(b.abv) < 46)
-    abv_46_55 = sum(1 for b in bottles if b.abv is not None and 46 <= float(b.abv) <= 55)
-    abv_over_55 = sum(1 for b in bottles if b.abv is not None and float(b.abv) > 55)
-    abv_unknown = sum(1 for b in bottles if b.abv is None)
+    type_counts = dict(
+        db.session.execute(db.select(Bottle.type, sa.func.count()).where(mine).group_by(Bottle.type)).all()
+    )
+    type_breakdown: List[Dict] = [
+        {
+            "type": bottle_type.value,
+            "count": type_counts[bottle_type],
+            "percentage": round(type_counts[bottle_type] / total * 100, 1),
+        }
+        for bottle_type in BottleTypes
+        if type_counts.get(bottle_type)
+    ]
+    type_breakdown.sort(key=lambda x: x["count"], reverse=True)
+    most_common_type = type_breakdown[0]["type"] if type_breakdown else None
 
-    distillery_counts: Counter = Counter()
-    for b in bottles:
-        for d in b.distilleries:
-            distillery_counts[d.name] += 1
-    top_distilleries = [{"name": name, "count": count} for name, count in distillery_counts.most_common(10)]
+    distillery_count = sa.func.count().label("count")
+    top_distilleries = [
+        {"name": name, "count": count}
+        for name, count in db.session.execute(
+            db.select(Distillery.name, distillery_count)
+            .select_from(Bottle)
+            .join(bottle_distillery, bottle_distillery.c.bottle_id == Bottle.id)
+            .join(Distillery, Distillery.id == bottle_distillery.c.distillery_id)
+            .where(mine)
+            .group_by(Distillery.name)
+            .order_by(distillery_count.desc(), Distillery.name)
+            .limit(TOP_LIMIT)
+        )
+    ]
 
-    bottler_counts: Counter = Counter(b.bottler.name for b in bottles if b.bottler)
-    top_bottlers = [{"name": name, "count": count} for name, count in bottler_counts.most_common(10)]
+    bottler_count = sa.func.count().label("count")
+    top_bottlers = [
+        {"name": name, "count": count}
+        for name, count in db.session.execute(
+            db.select(Bottler.name, bottler_count)
+            .select_from(Bottle)
+            .join(Bottler, Bottler.id == Bottle.bottler_id)
+            .where(mine)
+            .group_by(Bottler.name)
+            .order_by(bottler_count.desc(), Bottler.name)
+            .limit(TOP_LIMIT)
+        )
+    ]
 
     return {
         "summary": {
             "total": total,
-            "active": len(active),
-            "killed": len(killed),
+            "active": total - totals.killed,
+            "killed": totals.killed,
             "avg_abv": avg_abv,
             "most_common_type": most_common_type,
-            "single_barrel_count": single_barrel_count,
+            "single_barrel_count": int(totals.single_barrel),
         },
         "type_breakdown": type_breakdown,
         "abv_distribution": {
-            "under_46": abv_under_46,
-            "range_46_55": abv_46_55,
-            "over_55": abv_over_55,
-            "unknown": abv_unknown,
+            "under_46": int(totals.under_46),
+            "range_46_55": int(totals.range_46_55),
+            "over_55": int(totals.over_55),
+            "unknown": int(totals.unknown),
         },
         "top_distilleries": top_distilleries,
         "top_bottlers": top_bottlers,
@@ -4,12 +4,17 @@ import zipfile
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
 
-import boto3
-from botocore.exceptions import ClientError
 from flask import current_app, flash
 
+from mywhiskies.common.storage import StorageError, get_storage
 from mywhiskies.extensions import db
-from mywhiskies.models import User, UserLogin
+from mywhiskies.models import Bottle, LabelScanJob, User, UserLogin, user_num_counter
+from mywhiskies.services.bottle.image import delete_stored_images, stored_image_keys
+from mywhiskies.services.bottle.loaders import bottle_export_options, bottle_image_options
+
+
+def _user_bottles(user: User, options: list) -> list[Bottle]:
+    return list(db.session.scalars(db.select(Bottle).where(Bottle.user_id == user.id).options(*options)))
 
 
 def is_email_taken(email: str) -> bool:
@@ -49,12 +54,14 @@ def build_export_bottles(
     include_private: bool = True,
     include_notes: bool = True,
 ) -> list[dict]:
+    stmt = db.select(Bottle).where(Bottle.user_id == user.id).options(*bottle_export_options())
+    if not include_killed:
+        stmt = stmt.where(Bottle.date_killed.is_(None))
+    if not include_private:
+        stmt = stmt.where(Bottle.is_private.is_(False))
+
     rows = []
-    for bottle in sorted(user.bottles, key=lambda b: b.name.lower()):
-        if not include_killed and bottle.date_killed:
-            continue
-        if not include_private and bottle.is_private:
-            continue
+    for bottle in sorted(db.session.scalars(stmt), key=lambda b: b.name.lower()):
         rows.append(
             {
                 "name": bottle.name,
@@ -97,26 +104,24 @@ def create_export_json(user: User, bottles: list[dict]) -> str:
 
 
 def create_export_images_zip(user: User) -> str:
-    s3_client = boto3.client("s3")
-    img_s3_bucket = current_app.config["BOTTLE_IMAGE_S3_BUCKET"]
+    storage = get_storage()
     img_s3_key = current_app.config["BOTTLE_IMAGE_S3_KEY"]
     img_full_s3_key = current_app.config["BOTTLE_IMAGE_FULL_S3_KEY"]
     path = f"/tmp/{user.id}_images.zip"
 
     tasks = []
-    for bottle in user.bottles:
+    for bottle in _user_bottles(user, bottle_image_options()):
         safe_name = bottle.name.replace("/", "-").replace(":", "-")
         for img in bottle.images:
             zip_filename = f"{bottle.user_num:04d}_{safe_name}_{img.sequence}.jpg"
             key_prefix = img_full_s3_key if user.is_pro else img_s3_key
-            s3_object_key = f"{key_prefix}/{bottle.id}_{img.sequence}.jpg"
+            s3_object_key = f"{key_prefix}/{img.key}"
             tasks.append((zip_filename, s3_object_key))
 
     def fetch(zip_filename, s3_key):
         try:
-            obj = s3_client.get_object(Bucket=img_s3_bucket, Key=s3_key)
-            return zip_filename, obj["Body"].read()
-        except ClientError:
+            return zip_filename, storage.get(s3_key)
+        except StorageError:
             return zip_filename, None
 
     with zipfile.ZipFile(path, "w", zipfile.ZIP_STORED) as zf:
@@ -145,27 +150,9 @@ def change_user_password(user: User, current_password: str, new_password: str) -
 
 
 def delete_user_account(user: User) -> None:
-    s3_client = boto3.client("s3")
-    img_s3_bucket = current_app.config["BOTTLE_IMAGE_S3_BUCKET"]
-    img_s3_key = current_app.config["BOTTLE_IMAGE_S3_KEY"]
-    img_full_s3_key = current_app.config["BOTTLE_IMAGE_FULL_S3_KEY"]
-
-    for bottle in list(user.bottles):
-        for img in list(bottle.images):
-            try:
-                s3_client.delete_object(
-                    Bucket=img_s3_bucket,
-                    Key=f"{img_s3_key}/{bottle.id}_{img.sequence}.jpg",
-                )
-            except ClientError:
-                pass
-            try:
-                s3_client.delete_object(
-                    Bucket=img_s3_bucket,
-                    Key=f"{img_full_s3_key}/{bottle.id}_{img.sequence}.jpg",
-                )
-            except ClientError:
-                pass
+    stored_keys = []
+    for bottle in _user_bottles(user, bottle_image_options()):
+        stored_keys += stored_image_keys(bottle.images)
         db.session.delete(bottle)
 
     for bottler in list(user.bottlers):
@@ -175,5 +162,9 @@ def delete_user_account(user: User) -> None:
         db.session.delete(distillery)
 
     db.session.execute(db.delete(UserLogin).where(UserLogin.user_id == user.id))
+    db.session.execute(db.delete(LabelScanJob).where(LabelScanJob.user_id == user.id))
+    db.session.execute(db.delete(user_num_counter).where(user_num_counter.c.user_id == user.id))
     db.session.delete(user)
     db.session.commit()
+
+    delete_stored_images(stored_keys)
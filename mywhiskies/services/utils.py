@@ -1,8 +1,10 @@
+from typing import Dict, Iterable, List
+
 from flask import abort, flash
 from flask_login import current_user as _current_user
 from flask_wtf import FlaskForm as Form
 from markupsafe import Markup
-from sqlalchemy import func
+from sqlalchemy import ColumnElement, Select, Subquery, func, or_, select, true
 
 from mywhiskies.extensions import db
 from mywhiskies.models import User
@@ -42,3 +44,106 @@ def get_flash_msg(form: Form) -> dict:
         flash_msg += "</ul>"
 
     return {"message": flash_msg, "reset_errors": reset_errors}
+
+
+def list_with_bottle_counts(
+    model,
+    counts: Subquery,
+    user: User,
+    q: str = "",
+    sort: str = "name",
+    direction: str = "asc",
+    page: int = 1,
+    per_page: int = 25,
+    sort_exprs: Dict[str, ColumnElement] = None,
+) -> Dict:
+    """
+    One page of `user`'s distilleries, bottlers or barrel pickers with how many bottles each has.
+
+    `counts` is a subquery of (entity_id, bottle_count) rows; entities without bottles are
+    outer-joined to a count of 0. Searching, sorting (by name, bottle count or anything in
+    `sort_exprs`) and paging all happen in SQL, ties broken by name.
+    """
+    bottle_count = func.coalesce(counts.c.bottle_count, 0)
+    name_key = func.lower(model.name)
+    sorts = {"name": name_key, "bottles": bottle_count, **(sort_exprs or {})}
+    sort_key = sorts.get(sort, name_key)
+
+    filters = [model.user_id == user.id]
+    if q:
+        filters.append(name_key.contains(q.lower(), autoescape=True))
+
+    total = db.session.scalar(select(func.count()).select_from(model).where(*filters))
+    total_pages = max(1, (total + per_page - 1) // per_page)
+    page = min(page, total_pages)
+
+    order_by = [sort_key, name_key, model.id]
+    if direction == "desc":
+        order_by = [col.desc() for col in order_by]
+    rows = db.session.execute(
+        select(model, bottle_count)
+        .outerjoin(counts, counts.c.entity_id == model.id)
+        .where(*filters)
+        .order_by(*order_by)
+        .limit(per_page)
+        .offset((page - 1) * per_page)
+    ).all()
+
+    return {
+        "items": [entity for entity, _ in rows],
+        "bottle_counts": {entity.id: n for entity, n in rows},
+        "total": total,
+        "page": page,
+        "per_page": per_page,
+        "total_pages": total_pages,
+    }
+
+
+# matches per page of a choice search
+CHOICE_PAGE_SIZE = 20
+
+
+def name_match_clause(name: ColumnElement, q: str) -> ColumnElement:
+    """
+    Case-insensitive match of `q` against the start of a name or of any word in it.
+
+    The prefix match uses the model's lower(name) index and, on Postgres, the word match its
+    trigram index (see models.core.add_name_match_indexes).
+    """
+    term = q.strip().lower()
+    if not term:
+        return true()
+    name = func.lower(name)
+    return or_(name.startswith(term, autoescape=True), name.contains(f" {term}", autoescape=True))
+
+
+def choice_page(choices: Select, page: int = 1, per_page: int = CHOICE_PAGE_SIZE) -> Dict:
+    """
+    One page of a select of (id, text) choices, ordered by text, in the shape select2's
+    AJAX transport expects: `{"results": [{"id", "text"}], "pagination": {"more"}}`.
+    """
+    sub = choices.subquery()
+    rows = db.session.execute(
+        select(sub.c.id, sub.c.text)
+        .order_by(func.lower(sub.c.text), sub.c.id)
+        .limit(per_page + 1)
+        .offset((max(page, 1) - 1) * per_page)
+    ).all()
+    return {
+        "results": [{"id": id_, "text": text} for id_, text in rows[:per_page]],
+        "pagination": {"more": len(rows) > per_page},
+    }
+
+
+def selected_choices(model, user: User, values: Iterable) -> List[tuple]:
+    """
+    (id, name) choices for the ids in `values` that belong to `user`, in the order given,
+    looked up in one query. Ids of anything else are dropped, so form validation rejects them.
+    """
+    ids = [str(getattr(v, "id", v)) for v in values or [] if v]
+    if not ids:
+        return []
+    names = dict(
+        db.session.execute(select(model.id, model.name).where(model.user_id == user.id, model.id.in_(ids))).all()
+    )
+    return [(id_, names[id_]) for id_ in ids if id_ in names]
@@ -5,7 +5,7 @@ Usage:
     python scripts/seed_data.py <username> [--images]
 
 The user must already exist. All seeded records are attached to that user.
---images  Fetch random placeholder photos from picsum.photos and upload to S3.
+--images  Fetch random placeholder photos from picsum.photos and store them the way uploads are.
 """
 
 import io
@@ -13,7 +13,6 @@ import random
 import sys
 from datetime import datetime, timedelta
 
-import boto3
 import requests
 from faker import Faker
 from PIL import Image, ImageOps
@@ -23,7 +22,9 @@ sys.path.insert(0, ".")
 from mywhiskies.app import create_app
 from mywhiskies.extensions import db
 from mywhiskies.models import Bottle, Bottler, Distillery, User
-from mywhiskies.models.bottle import BottleImage, BottleTypes
+from mywhiskies.models.bottle import BottleTypes
+from mywhiskies.services.bottle.image import queue_upload
+from mywhiskies.services.bottle.upload_queue import process_upload_jobs
 
 fake = Faker()
 
@@ -176,25 +177,18 @@ def _fetch_jpeg_bytes(width: int = 800, height: int = 600) -> bytes | None:
         return None
 
 
-def upload_bottle_images(app, bottle: Bottle, num_images: int) -> None:
-    """Fetch random images and upload them to S3 for the given bottle."""
-    s3_client = boto3.client("s3")
-    bucket = app.config["BOTTLE_IMAGE_S3_BUCKET"]
-    key = app.config["BOTTLE_IMAGE_S3_KEY"]
-
-    for sequence in range(1, num_images + 1):
+def upload_bottle_images(bottle: Bottle, num_images: int, is_pro: bool) -> None:
+    """
+    Fetch random images and queue them as uploads for the given bottle. They are stored, under
+    the keys their BottleImage rows get, by process_upload_jobs once the bottles are committed.
+    """
+    sequence = 0
+    for _ in range(num_images):
         jpeg_bytes = _fetch_jpeg_bytes()
         if not jpeg_bytes:
             continue
-        s3_key = f"{key}/{bottle.id}_{sequence}.jpg"
-        s3_client.put_object(
-            Body=jpeg_bytes,
-            Bucket=bucket,
-            Key=s3_key,
-            ContentType="image/jpeg",
-            CacheControl="public, max-age=31536000",
-        )
-        db.session.add(BottleImage(bottle_id=bottle.id, sequence=sequence))
+        sequence += 1
+        queue_upload(bottle, sequence, io.BytesIO(jpeg_bytes), is_pro)
     db.session.flush()
 
 
@@ -249,7 +243,6 @@ def seed_bottles(
     bottlers: list[Bottler],
     count: int = 40,
     with_images: bool = False,
-    app=None,
 ) -> None:
     statuses = ["open"] * 10 + ["killed"] * 5 + ["unopen"] * 25
     bottles = []
@@ -309,10 +302,10 @@ def seed_bottles(
     print(f"  Created {count} bottles")
 
     if with_images:
-        print("  Uploading images to S3 (this may take a moment)...")
+        print("  Fetching images (this may take a moment)...")
         for i, bottle in enumerate(bottles, 1):
             num_images = random.choices([1, 2, 3], weights=[60, 30, 10])[0]
-            upload_bottle_images(app, bottle, num_images)
+            upload_bottle_images(bottle, num_images, user.is_pro)
             print(f"    [{i}/{count}] {bottle.name} — {num_images} image(s)")
         db.session.flush()
 
@@ -340,8 +333,10 @@ def main():
         print(f"Seeding data for user: {user.username}")
         distilleries = seed_distilleries(user)
         bottlers = seed_bottlers(user)
-        seed_bottles(user, distilleries, bottlers, with_images=with_images, app=app)
+        seed_bottles(user, distilleries, bottlers, with_images=with_images)
         db.session.commit()
+        if with_images:
+            print(f"  Stored {process_upload_jobs()} image(s)")
         print("Done.")
 
 
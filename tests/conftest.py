@@ -1,7 +1,7 @@
 import os
 import sys
 from datetime import datetime
-from typing import Generator
+from typing import Generator, List, Optional
 
 import pytest
 from flask import Flask, url_for
@@ -9,9 +9,11 @@ from flask.testing import FlaskClient
 from flask_login import logout_user
 from sqlalchemy.orm import scoped_session, sessionmaker
 
+from mywhiskies.common.storage import LocalStorage, StorageError
 from mywhiskies.database import init_db
 from mywhiskies.extensions import db
 from mywhiskies.models import Bottle, Bottler, Distillery, User
+from mywhiskies.services.bottle.scan import StubLabelScanClient
 
 # Ensure the parent directory is added to the system path before imports
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
@@ -230,6 +232,41 @@ def logged_out_user() -> Generator[None, None, None]:
     logout_user()
 
 
+class FlakyStorage(LocalStorage):
+    """LocalStorage in a temp dir that can be told to fail its next puts."""
+
+    def __init__(self, root: str) -> None:
+        super().__init__(root, url="/media")
+        self.fail_puts = 0  # how many of the next put calls fail
+
+    def put(self, key: str, data: bytes, content_type: str, cache_control: Optional[str] = None) -> None:
+        if self.fail_puts:
+            self.fail_puts -= 1
+            raise StorageError("SlowDown")
+        super().put(key, data, content_type, cache_control)
+
+    def keys(self) -> List[str]:
+        return sorted(self.list(""))
+
+
+@pytest.fixture
+def storage(app: Flask, tmp_path) -> Generator[FlakyStorage, None, None]:
+    """Give the app a fresh, empty image store for the test."""
+    previous = app.extensions["storage"]
+    app.extensions["storage"] = FlakyStorage(str(tmp_path / "images"))
+    yield app.extensions["storage"]
+    app.extensions["storage"] = previous
+
+
+@pytest.fixture
+def scan_client(app: Flask) -> Generator[StubLabelScanClient, None, None]:
+    """Give the app a fresh stub label-scan client for the test."""
+    previous = app.extensions.get("label_scan_client")
+    app.extensions["label_scan_client"] = StubLabelScanClient({"name": "Frey Ranch Bourbon", "abv": 45.0})
+    yield app.extensions["label_scan_client"]
+    app.extensions["label_scan_client"] = previous
+
+
 def expected_page_title(username: str) -> str:
     suffix = "'s" if not username.endswith("s") else "'"
     return html_encode(f"{username}{suffix} Whiskies")
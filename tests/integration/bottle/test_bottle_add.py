@@ -1,14 +1,18 @@
+import io
 import uuid
 from unittest.mock import MagicMock, patch
 
 from flask import Flask, url_for
 from flask.testing import FlaskClient
+from PIL import Image
 from werkzeug.datastructures import FileStorage, MultiDict
 
+from mywhiskies.extensions import db
 from mywhiskies.forms.bottle import BottleAddForm
-from mywhiskies.models import Bottle, User
+from mywhiskies.models import Bottle, CatalogDistillery, User
 from mywhiskies.services.bottle.form import prep_bottle_form
 from mywhiskies.services.bottle.image import add_bottle_images
+from mywhiskies.services.bottle.upload_queue import process_upload_jobs
 
 
 def create_bottle_formdata(test_user: User, file_storage: FileStorage = None) -> MultiDict:
@@ -63,28 +67,75 @@ def test_add_bottle_requires_login(app: Flask, client: FlaskClient, test_user_01
     assert test_user_bottle_count == len(test_user_01.bottles)
 
 
-def test_valid_bottle_form(app: Flask, test_user_01: User, mock_image: str) -> None:
+def test_valid_bottle_form(app: Flask, test_user_01: User, mock_image: str, storage) -> None:
     with open(mock_image, "rb") as f:
         file_storage = FileStorage(stream=f, filename="test_image.png", content_type="image/png")
         formdata = create_bottle_formdata(test_user_01, file_storage)
 
         form = BottleAddForm()
-        prep_bottle_form(test_user_01, form)
         form.process(formdata)
+        prep_bottle_form(test_user_01, form)
 
         assert form.validate(), f"Form validation failed: {form.errors}"
 
-        with patch("boto3.client") as mock_boto_client, patch("PIL.Image.open") as mock_image_open:
+        with patch("PIL.Image.open") as mock_image_open:
             mock_image_obj = MagicMock()
             mock_image_open.return_value = mock_image_obj
             mock_image_obj.width = 800
             mock_image_obj.height = 600
-
-            mock_s3_client = MagicMock()
-            mock_boto_client.return_value = mock_s3_client
+            # the pipeline transposes and converts the decoded image before saving renditions
+            mock_image_obj.copy.return_value = mock_image_obj
+            mock_image_obj.convert.return_value = mock_image_obj
 
             bottle = Bottle(id=str(uuid.uuid4()))
             result = add_bottle_images(form, bottle)
 
             assert result is True, "Image upload failed"
-            assert mock_s3_client.put_object.called, "S3 put_object was not called"
+            assert storage.keys() == [], "Uploads are queued, not stored inline"
+            assert process_upload_jobs() == 1
+            assert any(key.startswith(f"dev/{bottle.id}_") for key in storage.keys()), "The image was not stored"
+
+
+def test_add_bottle_from_catalog_distillery(logged_in_user_01: FlaskClient, test_user_01: User) -> None:
+    entry = CatalogDistillery(name="Buffalo Trace", region_1="Frankfort", region_2="KY")
+    db.session.add(entry)
+    db.session.commit()
+    results = logged_in_user_01.get(url_for("distillery.search", q="buff")).get_json()["results"]
+    assert {"id": f"catalog:{entry.id}", "text": "Buffalo Trace"} in results
+
+    formdata = create_bottle_formdata(test_user_01)
+    formdata.setlist("distilleries", [f"catalog:{entry.id}"])
+    response = logged_in_user_01.post(url_for("bottle.add"), data=formdata)
+    assert response.status_code == 302
+
+    bottle = db.session.scalar(db.select(Bottle).filter_by(user_id=test_user_01.id, name="Frey Ranch Farm Strength"))
+    (distillery,) = bottle.distilleries
+    assert (distillery.name, distillery.user_id, distillery.catalog_id) == ("Buffalo Trace", test_user_01.id, entry.id)
+
+
+def test_add_bottle_queues_image_upload(logged_in_user_01: FlaskClient, test_user_01: User, storage) -> None:
+    buf = io.BytesIO()
+    Image.new("RGB", (60, 80), "white").save(buf, format="PNG")
+    buf.seek(0)
+    formdata = create_bottle_formdata(test_user_01, FileStorage(stream=buf, filename="label.png"))
+    response = logged_in_user_01.post(url_for("bottle.add"), data=formdata, content_type="multipart/form-data")
+    assert response.status_code == 302
+    assert storage.keys() == []
+
+    bottle = db.session.scalar(db.select(Bottle).filter_by(user_id=test_user_01.id, name="Frey Ranch Farm Strength"))
+    detail_url = url_for("bottle.detail", username=test_user_01.username, user_num=bottle.user_num)
+    status_url = url_for("bottle.image_status", username=test_user_01.username, user_num=bottle.user_num)
+    assert "Processing image" in logged_in_user_01.get(detail_url).get_data(as_text=True)
+    assert logged_in_user_01.get(status_url).get_json() == {"pending": 1}
+
+    assert process_upload_jobs() == 1
+    image = bottle.images[0]
+    assert storage.keys() == sorted(f"dev/{key}" for key in (image.key, *image.thumbnail_keys))
+    assert logged_in_user_01.get(status_url).get_json() == {"pending": 0}
+    detail = logged_in_user_01.get(detail_url).get_data(as_text=True)
+    assert "Processing image" not in detail
+    assert bottle.images[0].key in detail
+
+    list_url = url_for("bottle.list", username=test_user_01.username)
+    listing = logged_in_user_01.get(list_url).get_data(as_text=True)
+    assert f"{image.thumbnail_key(160)} 160w" in listing
@@ -73,19 +73,19 @@ def test_valid_bottle_edit_form(test_user_01: User, mock_image: str) -> None:
         )
         # Create and process the form
         form = BottleEditForm()
-        prep_bottle_form(test_user_01, form)
         form.process(formdata)
+        prep_bottle_form(test_user_01, form)
 
         assert form.validate(), f"Form validation failed: {form.errors}"
 
-        with patch("boto3.client") as mock_boto_client, patch("PIL.Image.open") as mock_image_open:
+        with patch("PIL.Image.open") as mock_image_open:
             mock_image_obj = MagicMock()
             mock_image_open.return_value = mock_image_obj
             mock_image_obj.width = 800
             mock_image_obj.height = 600
-
-            mock_s3_client = MagicMock()
-            mock_boto_client.return_value = mock_s3_client
+            # the pipeline transposes and converts the decoded image before saving renditions
+            mock_image_obj.copy.return_value = mock_image_obj
+            mock_image_obj.convert.return_value = mock_image_obj
 
             # Ensure the distillery object is attached to the session
             bottle_to_edit.distilleries = [db.session.merge(d) for d in bottle_to_edit.distilleries]
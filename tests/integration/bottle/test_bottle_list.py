@@ -1,10 +1,12 @@
 from datetime import datetime
 
+import pytest
 from flask import Flask, url_for
 from flask.testing import FlaskClient
 
+from mywhiskies.common.query_budget import LIST_PAGE_QUERY_BUDGET, QueryBudgetExceeded, sql_statement_count
 from mywhiskies.extensions import db
-from mywhiskies.models import User
+from mywhiskies.models import BarrelPicker, Bottle, BottleImage, BottleTypes, Distillery, User
 from tests.conftest import expected_page_title
 
 
@@ -75,3 +77,117 @@ def test_bottle_list_shows_killed_toggle_when_bottle_is_killed(client: FlaskClie
 
     response = client.get(url_for("bottle.list", username=test_user_01.username))
     assert "Show Killed Bottles" in response.get_data(as_text=True)
+
+
+def _add_bottles_with_relations(user: User, count: int, label: str) -> None:
+    distillery = Distillery(name=f"{label} Distillery", region_1="Somewhere", region_2="KY", user_id=user.id)
+    picker = BarrelPicker(name=f"{label} Picker", user_id=user.id)
+    db.session.add_all([distillery, picker])
+    for i in range(count):
+        bottle = Bottle(name=f"{label} Bottle {i:03}", type=BottleTypes.BOURBON, user_id=user.id)
+        bottle.distilleries = [distillery]
+        bottle.barrel_pickers = [picker]
+        bottle.images = [BottleImage(sequence=1)]
+        db.session.add(bottle)
+    db.session.commit()
+
+
+def test_bottle_list_query_count_is_flat(client: FlaskClient, test_user_01: User) -> None:
+    # TestConfig sets STRICT_SQL_CHECKS, so a lazy load or a blown query budget fails the request outright.
+    url = url_for("bottle.list", username=test_user_01.username, per_page=100)
+
+    _add_bottles_with_relations(test_user_01, 5, "Few")
+    before = sql_statement_count()
+    assert client.get(url).status_code == 200
+    few = sql_statement_count() - before
+
+    _add_bottles_with_relations(test_user_01, 30, "Many")
+    before = sql_statement_count()
+    response = client.get(url)
+    many = sql_statement_count() - before
+
+    assert response.status_code == 200
+    assert "Many Bottle 029" in response.get_data(as_text=True)
+    assert many == few
+    assert many <= LIST_PAGE_QUERY_BUDGET
+
+
+def test_bottle_list_etag(client: FlaskClient, test_user_01: User) -> None:
+    url = url_for("bottle.list", username=test_user_01.username)
+    response = client.get(url)
+    etag = response.headers["ETag"]
+    assert response.status_code == 200
+    assert not etag.startswith("W/")
+
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.get_data() == b""
+
+    # the HTMX partial is a different representation of the same URL
+    response = client.get(url, headers={"If-None-Match": etag, "HX-Request": "true"})
+    assert response.status_code == 200
+
+    db.session.add(Bottle(name="Fresh Bottle", type=BottleTypes.RYE, user_id=test_user_01.id))
+    db.session.commit()
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert "Fresh Bottle" in response.get_data(as_text=True)
+
+
+def test_bottle_list_htmx_rows_are_cached(client: FlaskClient, test_user_01: User) -> None:
+    url = url_for("bottle.list", username=test_user_01.username, q="bourbon", sort="abv")
+    headers = {"HX-Request": "true"}
+
+    before = sql_statement_count()
+    first = client.get(url, headers=headers)
+    uncached = sql_statement_count() - before
+
+    before = sql_statement_count()
+    second = client.get(url, headers=headers)
+    cached = sql_statement_count() - before
+
+    assert first.status_code == second.status_code == 200
+    assert second.get_data() == first.get_data()
+    assert cached < uncached
+
+    db.session.add(Bottle(name="Another Bourbon", type=BottleTypes.BOURBON, user_id=test_user_01.id))
+    db.session.commit()
+    response = client.get(url, headers=headers)
+    assert "Another Bourbon" in response.get_data(as_text=True)
+
+
+def test_bottle_list_show_all_is_streamed(client: FlaskClient, test_user_01: User, monkeypatch) -> None:
+    monkeypatch.setattr("mywhiskies.services.bottle.listing._STREAM_BATCH_SIZE", 2)
+    _add_bottles_with_relations(test_user_01, 7, "Streamed")
+    url = url_for("bottle.list", username=test_user_01.username, per_page=10000)
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.is_streamed
+    page = response.get_data(as_text=True)
+    assert expected_page_title(test_user_01.username) in page
+    assert all(f"Streamed Bottle {i:03}" in page for i in range(7))
+    assert page.index("Streamed Bottle 000") < page.index("Streamed Bottle 006")
+
+    response = client.get(url, headers={"HX-Request": "true"})
+    assert response.is_streamed
+    assert "Streamed Bottle 006" in response.get_data(as_text=True)
+
+
+def test_bottle_list_streamed_body_is_in_query_budget(client: FlaskClient, test_user_01: User, monkeypatch) -> None:
+    # TestConfig sets STRICT_SQL_CHECKS; the budget is checked once the streamed body has been read
+    monkeypatch.setattr("mywhiskies.services.bottle.listing._STREAM_BATCH_SIZE", 2)
+    _add_bottles_with_relations(test_user_01, 9, "Batched")
+    url = url_for("bottle.list", username=test_user_01.username, per_page=10000)
+
+    response = client.get(url)
+    assert response.is_streamed
+    assert "Batched Bottle 008" in response.get_data(as_text=True)
+
+    # batches that aren't counted get no allowance, and their eager loads blow the fixed budget
+    monkeypatch.setattr("mywhiskies.services.bottle.listing.count_stream_batch", lambda: None)
+    response = client.get(url)
+    with pytest.raises(QueryBudgetExceeded):
+        response.get_data()
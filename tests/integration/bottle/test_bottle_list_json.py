@@ -0,0 +1,82 @@
+from flask import url_for
+from flask.testing import FlaskClient
+
+from mywhiskies.extensions import db
+from mywhiskies.models import Bottle, BottleTypes, User
+
+
+def _walk(client: FlaskClient, **params) -> list:
+    """Follow next links from the first page to the last, returning every bottle."""
+    bottles = []
+    url = url_for("bottle.list_json", **params)
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        data = response.get_json()
+        bottles += data["bottles"]
+        url = data["next"]
+    return bottles
+
+
+def test_bottle_list_json_hides_private_for_guests(client: FlaskClient, test_user_01: User) -> None:
+    response = client.get(url_for("bottle.list_json", username=test_user_01.username))
+    assert response.status_code == 200
+    data = response.get_json()
+    public = sorted(b.name for b in test_user_01.bottles if not b.is_private)
+    assert [b["name"] for b in data["bottles"]] == public
+    assert data["next_cursor"] is None
+    assert set(data["bottles"][0]) == {"user_num", "name", "type", "abv", "stars", "detail_url"}
+
+
+def test_bottle_list_json_owner_sees_private(logged_in_user_01: FlaskClient, test_user_01: User) -> None:
+    response = logged_in_user_01.get(
+        url_for("bottle.list_json", username=test_user_01.username, fields="name,is_private,personal_note")
+    )
+    assert response.status_code == 200
+    bottles = response.get_json()["bottles"]
+    assert len(bottles) == len(test_user_01.bottles)
+    assert any(b["is_private"] for b in bottles)
+    assert set(bottles[0]) == {"name", "is_private", "personal_note"}
+
+
+def test_bottle_list_json_rejects_owner_fields_for_guests(client: FlaskClient, test_user_01: User) -> None:
+    response = client.get(url_for("bottle.list_json", username=test_user_01.username, fields="name,personal_note"))
+    assert response.status_code == 400
+    assert "personal_note" in response.get_json()["error"]
+
+
+def test_bottle_list_json_keyset_pages(logged_in_user_01: FlaskClient, test_user_01: User) -> None:
+    for i, abv in enumerate([40, 50, 50, 60, None]):
+        db.session.add(Bottle(name=f"Keyset Bottle {i}", type=BottleTypes.RYE, abv=abv, user_id=test_user_01.id))
+    db.session.commit()
+    expected = len(test_user_01.bottles)
+
+    by_name = _walk(logged_in_user_01, username=test_user_01.username, limit=2)
+    assert len(by_name) == expected
+    assert [b["name"].lower() for b in by_name] == sorted(b["name"].lower() for b in by_name)
+
+    by_abv = _walk(logged_in_user_01, username=test_user_01.username, limit=2, sort="abv", dir="desc")
+    assert len({b["user_num"] for b in by_abv}) == expected
+    keys = [(b["abv"] or 0, b["user_num"]) for b in by_abv]
+    assert keys == sorted(keys, reverse=True)
+
+
+def test_bottle_list_json_rejects_bad_cursor(client: FlaskClient, test_user_01: User) -> None:
+    response = client.get(url_for("bottle.list_json", username=test_user_01.username, cursor="not-a-cursor"))
+    assert response.status_code == 400
+
+
+def test_bottle_list_json_rejects_cursor_from_other_sort(logged_in_user_01: FlaskClient, test_user_01: User) -> None:
+    response = logged_in_user_01.get(url_for("bottle.list_json", username=test_user_01.username, limit=1))
+    cursor = response.get_json()["next_cursor"]
+    response = logged_in_user_01.get(
+        url_for("bottle.list_json", username=test_user_01.username, limit=1, sort="abv", cursor=cursor)
+    )
+    assert response.status_code == 400
+
+
+def test_bottle_list_json_private_user(client: FlaskClient, test_user_01: User) -> None:
+    test_user_01.is_private = True
+    db.session.commit()
+    response = client.get(url_for("bottle.list_json", username=test_user_01.username))
+    assert response.status_code == 404
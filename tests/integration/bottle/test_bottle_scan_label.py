@@ -0,0 +1,76 @@
+import io
+
+from flask import url_for
+from flask.testing import FlaskClient
+from PIL import Image
+
+from mywhiskies.extensions import db
+from mywhiskies.models import User
+
+
+def _jpeg(color: tuple = (100, 150, 200)) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (60, 80), color=color).save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+def _scan(client: FlaskClient, data: bytes = None):
+    return client.post(
+        url_for("bottle.scan_label"),
+        data={"image": (io.BytesIO(data or _jpeg()), "label.jpg", "image/jpeg")},
+        content_type="multipart/form-data",
+    )
+
+
+def test_scan_is_submitted_then_polled(logged_in_user_01: FlaskClient, test_user_01: User, scan_client) -> None:
+    response = _scan(logged_in_user_01)
+    assert response.status_code == 202
+    status_url = response.json["status_url"]
+    assert response.headers["Location"] == status_url
+
+    response = logged_in_user_01.get(status_url)
+    assert response.status_code == 200
+    assert response.json == {"status": "done", "result": {"name": "Frey Ranch Bourbon", "abv": 45.0}}
+    assert test_user_01.glen_scan_count == 1
+
+
+def test_scan_status_is_private(
+    logged_in_user_01: FlaskClient, test_user_01: User, test_user_02: User, scan_client
+) -> None:
+    status_url = _scan(logged_in_user_01).json["status_url"]
+    logged_in_user_01.get(url_for("auth.logout"))
+    logged_in_user_01.post(url_for("auth.login"), data={"username": test_user_02.username, "password": "testpass"})
+    assert logged_in_user_01.get(status_url).status_code == 404
+
+
+def test_scan_limit_is_enforced(logged_in_user_01: FlaskClient, test_user_01: User, scan_client) -> None:
+    test_user_01.glen_scan_count = logged_in_user_01.application.config["FREE_TIER_SCAN_LIMIT"]
+    db.session.commit()
+    response = _scan(logged_in_user_01)
+    assert response.status_code == 403
+    assert response.json == {"error": "scan_limit_reached"}
+    assert scan_client.calls == []
+
+
+def test_scan_without_image_is_rejected(logged_in_user_01: FlaskClient, scan_client) -> None:
+    assert logged_in_user_01.post(url_for("bottle.scan_label")).status_code == 400
+
+
+def test_repeat_scan_is_answered_from_the_cache(
+    logged_in_user_01: FlaskClient, test_user_01: User, scan_client
+) -> None:
+    logged_in_user_01.get(_scan(logged_in_user_01).json["status_url"])
+
+    test_user_01.glen_scan_count = logged_in_user_01.application.config["FREE_TIER_SCAN_LIMIT"]
+    db.session.commit()
+    response = _scan(logged_in_user_01)
+    assert response.status_code == 200
+    assert response.json == {"status": "done", "result": {"name": "Frey Ranch Bourbon", "abv": 45.0}}
+    assert len(scan_client.calls) == 1
+    assert test_user_01.glen_scan_count == logged_in_user_01.application.config["FREE_TIER_SCAN_LIMIT"]
+
+
+def test_unreadable_image_is_rejected(logged_in_user_01: FlaskClient, scan_client) -> None:
+    response = _scan(logged_in_user_01, b"not an image")
+    assert response.status_code == 400
+    assert scan_client.calls == []
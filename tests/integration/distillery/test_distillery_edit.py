@@ -34,6 +34,7 @@ def test_edit_distillery_page_renders(logged_in_user_01: FlaskClient, test_user_
 
 def test_valid_distillery_edit_form(logged_in_user_01: FlaskClient, test_user_01: User) -> None:
     client = logged_in_user_01
+    distillery = test_user_01.distilleries[0]
 
     formdata = {
         "name": "Frey Ranch UPDATED",
@@ -47,7 +48,7 @@ def test_valid_distillery_edit_form(logged_in_user_01: FlaskClient, test_user_01
         url_for(
             "distillery.edit",
             username=test_user_01.username,
-            user_num=test_user_01.distilleries[0].user_num,
+            user_num=distillery.user_num,
         ),
         data=formdata,
         follow_redirects=True,
@@ -60,7 +61,7 @@ def test_valid_distillery_edit_form(logged_in_user_01: FlaskClient, test_user_01
     assert formdata["name"] in response_text
     assert "has been successfully updated" in response_text
 
-    updated_distillery = db.session.get(Distillery, test_user_01.distilleries[0].id)
+    updated_distillery = db.session.get(Distillery, distillery.id)
     assert updated_distillery.name == formdata["name"]
     assert updated_distillery.description == formdata["description"]
     assert updated_distillery.region_1 == formdata["region_1"]
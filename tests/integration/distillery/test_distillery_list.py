@@ -1,7 +1,9 @@
 from flask import url_for
 from flask.testing import FlaskClient
 
-from mywhiskies.models import User
+from mywhiskies.common.query_budget import sql_statement_count
+from mywhiskies.extensions import db
+from mywhiskies.models import Distillery, User
 from tests.conftest import expected_page_title
 
 
@@ -64,3 +66,20 @@ def test_distillery_list_logged_out_elements(client: FlaskClient):
     assert "Add Distillery" not in response_data
     assert "bi-pencil" not in response_data
     assert "bi-trash" not in response_data
+
+
+def test_distillery_list_query_count_is_flat(client: FlaskClient, test_user_01: User) -> None:
+    url = url_for("distillery.list", username=test_user_01.username, per_page=100)
+    before = sql_statement_count()
+    assert client.get(url).status_code == 200
+    few = sql_statement_count() - before
+
+    for i in range(30):
+        db.session.add(Distillery(name=f"Count Distillery {i:03}", region_1="A", region_2="B", user_id=test_user_01.id))
+    db.session.commit()
+    before = sql_statement_count()
+    response = client.get(url)
+
+    assert response.status_code == 200
+    assert "Count Distillery 029" in response.get_data(as_text=True)
+    assert sql_statement_count() - before == few
@@ -40,6 +40,7 @@ def test_quick_add_post_returns_hx_trigger(logged_in_user_01: FlaskClient) -> No
     trigger = json.loads(response.headers["HX-Trigger"])
     assert trigger["closeModal"]["id"] == "quickAddDistilleryModal"
     assert "newId" in trigger["closeModal"]
+    assert "newName" in trigger["closeModal"]
 
 
 def test_quick_add_post_rejects_duplicate(logged_in_user_01: FlaskClient, test_user_01: User) -> None:
@@ -69,3 +70,19 @@ def test_options_returns_json(logged_in_user_01: FlaskClient, test_user_01: User
     names = [item["name"] for item in data]
     for distillery in test_user_01.distilleries:
         assert distillery.name in names
+
+
+# --- search ---
+
+
+def test_search_requires_login(client: FlaskClient) -> None:
+    response = client.get(url_for("distillery.search"), follow_redirects=False)
+    assert response.status_code == 302
+
+
+def test_search_matches_word_starts(logged_in_user_01: FlaskClient, test_user_01: User) -> None:
+    response = logged_in_user_01.get(url_for("distillery.search", q="rep"))
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert [r["text"] for r in data["results"]] == ["Ironroot Republic"]
+    assert data["pagination"] == {"more": False}
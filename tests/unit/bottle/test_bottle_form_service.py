@@ -1,3 +1,5 @@
+from werkzeug.datastructures import MultiDict
+
 from mywhiskies.forms.bottle import BottleAddForm
 from mywhiskies.models import BottleTypes, User
 from mywhiskies.services.bottle.form import prep_bottle_form
@@ -26,13 +28,24 @@ def test_bottle_type_choices_includes_all_types(app, test_user_01: User) -> None
             assert bottle_type.name in choice_keys
 
 
-def test_distillery_choices_match_user(app, test_user_01: User) -> None:
+def test_distillery_choices_are_the_selected_ones(app, test_user_01: User) -> None:
+    picked = test_user_01.distilleries[:2]
     with app.test_request_context():
         form = BottleAddForm()
+        form.process(MultiDict([("distilleries", d.id) for d in reversed(picked)]))
         prep_bottle_form(test_user_01, form)
-        choice_names = [c[1] for c in form.distilleries.choices]
-        for distillery in test_user_01.distilleries:
-            assert distillery.name in choice_names
+        assert form.distilleries.choices == [(d.id, d.name) for d in reversed(picked)]
+
+
+def test_foreign_distillery_is_not_a_choice(app, test_user_01: User, test_user_02: User) -> None:
+    foreign = test_user_02.distilleries[0]
+    with app.test_request_context():
+        form = BottleAddForm()
+        form.process(MultiDict([("distilleries", foreign.id)]))
+        prep_bottle_form(test_user_01, form)
+        assert form.distilleries.choices == []
+        form.validate()
+        assert "distilleries" in form.errors
 
 
 def test_distillery_choices_are_sorted(app, test_user_01: User) -> None:
@@ -50,13 +63,13 @@ def test_bottler_choices_first_is_distillery_bottling(app, test_user_01: User) -
         assert form.bottler_id.choices[0] == (0, "Distillery Bottling")
 
 
-def test_bottler_choices_match_user(app, test_user_01: User) -> None:
+def test_bottler_choices_are_the_selected_one(app, test_user_01: User) -> None:
+    bottler = test_user_01.bottlers[0]
     with app.test_request_context():
         form = BottleAddForm()
+        form.process(MultiDict({"bottler_id": bottler.id}))
         prep_bottle_form(test_user_01, form)
-        choice_names = [c[1] for c in form.bottler_id.choices]
-        for bottler in test_user_01.bottlers:
-            assert bottler.name in choice_names
+        assert form.bottler_id.choices == [(0, "Distillery Bottling"), (bottler.id, bottler.name)]
 
 
 def test_star_rating_choices_first_is_placeholder(app, test_user_01: User) -> None:
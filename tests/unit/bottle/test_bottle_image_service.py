@@ -1,17 +1,24 @@
 import io
+import json
 from unittest.mock import MagicMock, patch
 
 import pytest
-from botocore.exceptions import ClientError
 from flask import Flask
 from PIL import Image
 
 from mywhiskies.extensions import db
 from mywhiskies.models import Bottle, BottleImage, BottleTypes, User
 from mywhiskies.services.bottle.image import (
-    _to_resized_jpg_bytes,
+    DISPLAY,
+    FULL,
+    THUMBNAILS,
+    ImageTooLarge,
     add_bottle_images,
+    backfill_thumbnails,
     delete_bottle_images,
+    encode_renditions,
+    get_s3_config,
+    process_bottle_images,
     resequence_bottle_images,
 )
 
@@ -29,6 +36,16 @@ def _make_image_file(width=200, height=200, mode="RGB") -> io.BytesIO:
     return buf
 
 
+def _make_jpeg_file(width: int, height: int, orientation: int = 1) -> io.BytesIO:
+    img = Image.new("RGB", (width, height), color=(100, 150, 200))
+    exif = Image.Exif()
+    exif[0x0112] = orientation
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", exif=exif)
+    buf.seek(0)
+    return buf
+
+
 def _make_rgba_image_file() -> io.BytesIO:
     img = Image.new("RGBA", (200, 200), color=(100, 150, 200, 128))
     buf = io.BytesIO()
@@ -60,54 +77,101 @@ def bottle_with_images(app: Flask, test_user_01: User) -> Bottle:
     db.session.commit()
 
 
-# --- _to_resized_jpg_bytes ---
+# --- encode_renditions ---
 
 
-def test_to_resized_jpg_bytes_returns_jpeg(app: Flask) -> None:
-    result = _to_resized_jpg_bytes(_make_image_file())
+def test_display_rendition_returns_jpeg(app: Flask) -> None:
+    (result,) = encode_renditions(_make_image_file(), [DISPLAY])
     # JPEG magic bytes
     assert result[:2] == b"\xff\xd8"
 
 
-def test_to_resized_jpg_bytes_large_image_is_resized(app: Flask) -> None:
+def test_display_rendition_large_image_is_resized(app: Flask) -> None:
     large_img = _make_image_file(width=3000, height=3000)
-    result = _to_resized_jpg_bytes(large_img)
+    (result,) = encode_renditions(large_img, [DISPLAY])
     output = Image.open(io.BytesIO(result))
     assert max(output.size) <= DISPLAY_MAX
 
 
-def test_to_resized_jpg_bytes_small_image_not_enlarged(app: Flask) -> None:
+def test_display_rendition_small_image_not_enlarged(app: Flask) -> None:
     small_img = _make_image_file(width=100, height=100)
-    result = _to_resized_jpg_bytes(small_img)
+    (result,) = encode_renditions(small_img, [DISPLAY])
     output = Image.open(io.BytesIO(result))
     assert output.size == (100, 100)
 
 
-def test_to_resized_jpg_bytes_handles_rgba(app: Flask) -> None:
-    result = _to_resized_jpg_bytes(_make_rgba_image_file())
+def test_display_rendition_handles_rgba(app: Flask) -> None:
+    (result,) = encode_renditions(_make_rgba_image_file(), [DISPLAY])
     output = Image.open(io.BytesIO(result))
     assert output.mode == "RGB"
 
 
-# --- resequence_bottle_images ---
+def test_renditions_share_one_decode(app: Flask) -> None:
+    with patch("mywhiskies.services.bottle.image.Image.open", wraps=Image.open) as mock_open:
+        full, display = encode_renditions(_make_image_file(width=3000, height=1500), [FULL, DISPLAY])
+    assert mock_open.call_count == 1
+    assert Image.open(io.BytesIO(full)).size == (3000, 1500)
+    assert Image.open(io.BytesIO(display)).size == (DISPLAY.max_size, DISPLAY.max_size // 2)
 
 
-@patch("mywhiskies.services.bottle.image.boto3.client")
-def test_resequence_no_changes_when_already_sequential(mock_boto: MagicMock, bottle_with_images: Bottle) -> None:
-    mock_s3 = MagicMock()
-    mock_boto.return_value = mock_s3
+def test_display_only_decodes_jpeg_in_draft_mode(app: Flask) -> None:
+    with patch("mywhiskies.services.bottle.image.fit_image", wraps=lambda img, *args: img) as mock_fit:
+        encode_renditions(_make_jpeg_file(4800, 3200), [DISPLAY])
+    decoded = mock_fit.call_args.args[0]
+    # decoded at a reduced DCT scale, but never below what the rendition needs
+    assert DISPLAY.max_size <= max(decoded.size) < 4800
 
-    resequence_bottle_images(bottle_with_images)
 
-    # Images are already 1, 2, 3 — no S3 operations needed
-    mock_s3.copy_object.assert_not_called()
+def test_renditions_apply_exif_orientation(app: Flask) -> None:
+    full, display = encode_renditions(_make_jpeg_file(3000, 2000, orientation=6), [FULL, DISPLAY])
+    assert Image.open(io.BytesIO(full)).size == (2000, 3000)
+    assert Image.open(io.BytesIO(display)).size == (DISPLAY.max_size * 2 // 3, DISPLAY.max_size)
+
+
+def test_oversized_image_rejected_before_decode(app: Flask) -> None:
+    with (
+        patch("mywhiskies.services.bottle.image.MAX_IMAGE_PIXELS", 100 * 100),
+        patch("mywhiskies.services.bottle.image.ImageOps.exif_transpose") as mock_transpose,
+        pytest.raises(ImageTooLarge),
+    ):
+        encode_renditions(_make_image_file(width=101, height=100), [DISPLAY])
+    mock_transpose.assert_not_called()
+
+
+def test_thumbnails_are_webp_at_their_widths(app: Flask) -> None:
+    thumbnails = encode_renditions(_make_image_file(width=900, height=1800), THUMBNAILS)
+    sizes = [Image.open(io.BytesIO(data)).size for data in thumbnails]
+    assert [Image.open(io.BytesIO(data)).format for data in thumbnails] == ["WEBP"] * len(THUMBNAILS)
+    assert sizes == [(width, width * 2) for width in BottleImage.THUMBNAIL_WIDTHS]
+
+
+# --- backfill_thumbnails ---
+
+
+def test_backfill_generates_missing_thumbnails(bottle_with_images: Bottle, storage) -> None:
+    first, second, third = bottle_with_images.images
+    third.has_thumbnails = True
+    db.session.commit()
+    _, prefix, _ = get_s3_config()
+    (display,) = encode_renditions(_make_image_file(width=600, height=900), [DISPLAY])
+    storage.put(f"{prefix}/{first.key}", display, "image/jpeg")
+
+    # the second image's display file is missing (e.g. a legacy PNG) and is skipped
+    assert backfill_thumbnails() == (1, 1)
+    assert [img.has_thumbnails for img in (first, second, third)] == [True, False, True]
+    assert storage.keys() == sorted(f"{prefix}/{key}" for key in (first.key, *first.thumbnail_keys))
+
 
+# --- resequence_bottle_images ---
+
+
+def test_resequence_no_changes_when_already_sequential(bottle_with_images: Bottle) -> None:
+    resequence_bottle_images(bottle_with_images)
+
+    assert [img.sequence for img in bottle_with_images.images] == [1, 2, 3]
 
-@patch("mywhiskies.services.bottle.image.boto3.client")
-def test_resequence_fixes_gap_in_sequences(mock_boto: MagicMock, app: Flask, test_user_01: User) -> None:
-    mock_s3 = MagicMock()
-    mock_boto.return_value = mock_s3
 
+def test_resequence_fixes_gap_in_sequences(app: Flask, test_user_01: User, storage) -> None:
     bottle = Bottle(
         name="Gap Test Bottle",
         type=BottleTypes.BOURBON,
@@ -126,29 +190,24 @@ def test_resequence_fixes_gap_in_sequences(mock_boto: MagicMock, app: Flask, tes
     sequences = sorted(img.sequence for img in bottle.images)
     assert sequences == [1, 2]
 
-    # S3 copy/delete should have been called to renumber sequence 3 → 2
-    assert mock_s3.copy_object.called
+    # files are stored under immutable keys, so renumbering never touches storage
+    with patch.object(storage, "put") as mock_put, patch.object(storage, "delete") as mock_delete:
+        resequence_bottle_images(bottle)
+    mock_put.assert_not_called()
+    mock_delete.assert_not_called()
 
 
 # --- delete_bottle_images ---
 
 
-@patch("mywhiskies.services.bottle.image.boto3.client")
-def test_delete_all_images(mock_boto: MagicMock, bottle_with_images: Bottle) -> None:
-    mock_s3 = MagicMock()
-    mock_boto.return_value = mock_s3
-
+def test_delete_all_images(bottle_with_images: Bottle, storage) -> None:
     delete_bottle_images(bottle_with_images)
 
     remaining = db.session.query(BottleImage).filter(BottleImage.bottle_id == bottle_with_images.id).all()
     assert len(remaining) == 0
 
 
-@patch("mywhiskies.services.bottle.image.boto3.client")
-def test_delete_specific_image(mock_boto: MagicMock, bottle_with_images: Bottle) -> None:
-    mock_s3 = MagicMock()
-    mock_boto.return_value = mock_s3
-
+def test_delete_specific_image(bottle_with_images: Bottle, storage) -> None:
     image_to_delete = bottle_with_images.images[0]
     delete_bottle_images(bottle_with_images, image_ids=[image_to_delete.id])
 
@@ -156,17 +215,26 @@ def test_delete_specific_image(mock_boto: MagicMock, bottle_with_images: Bottle)
     assert len(remaining) == 2
 
 
-# --- add_bottle_images: S3 error path ---
-
+def test_reorder_and_remove_only_delete_removed_files(bottle_with_images: Bottle, storage) -> None:
+    first, second, third = bottle_with_images.images
+    for img in (first, second, third):
+        for prefix in ("dev", "dev-pro-full"):
+            storage.put(f"{prefix}/{img.key}", b"jpg", "image/jpeg")
+    form = MagicMock()
+    form.image_order.data = json.dumps([{"type": "existing", "id": third.id}, {"type": "existing", "id": first.id}])
 
-@patch("mywhiskies.services.bottle.image.boto3.client")
-def test_add_bottle_images_returns_false_on_s3_error(mock_boto: MagicMock, app: Flask, test_user_01: User) -> None:
-    mock_s3 = MagicMock()
-    mock_s3.put_object.side_effect = ClientError(
-        {"Error": {"Code": "NoSuchBucket", "Message": "Bucket not found"}}, "PutObject"
+    assert process_bottle_images(form, bottle_with_images) == (True, None)
+    assert [(img.id, img.sequence) for img in bottle_with_images.images] == [(third.id, 1), (first.id, 2)]
+    assert storage.keys() == sorted(
+        f"{prefix}/{img.key}" for prefix in ("dev", "dev-pro-full") for img in (first, third)
     )
-    mock_boto.return_value = mock_s3
 
+
+# --- add_bottle_images: storage error path ---
+
+
+def test_add_bottle_images_queues_without_touching_storage(app: Flask, test_user_01: User, storage) -> None:
+    storage.fail_puts = 1
     bottle = Bottle(
         name="S3 Error Bottle",
         type=BottleTypes.BOURBON,
@@ -180,5 +248,24 @@ def test_add_bottle_images_returns_false_on_s3_error(mock_boto: MagicMock, app:
         side_effect=lambda key: MagicMock(data=_make_image_file()) if key == "bottle_image_1" else MagicMock(data=None)
     )
 
-    result = add_bottle_images(form, bottle)
-    assert result is False
+    # storage errors are the upload workers' to retry; the request only records the pending image
+    assert add_bottle_images(form, bottle) is True
+    assert storage.keys() == []
+    assert storage.fail_puts == 1
+    assert [img.is_ready for img in bottle.images] == [False]
+
+
+def test_process_bottle_images_reports_oversized_upload(app: Flask, test_user_01: User, storage) -> None:
+    bottle = Bottle(name="Oversized Image Bottle", type=BottleTypes.BOURBON, user_id=test_user_01.id)
+    db.session.add(bottle)
+    db.session.commit()
+
+    form = MagicMock()
+    form.image_order.data = '[{"type": "new", "slot": 1}]'
+    form.bottle_image_1.data = _make_image_file(width=101, height=100)
+
+    with patch("mywhiskies.services.bottle.image.MAX_IMAGE_PIXELS", 100 * 100):
+        ok, error = process_bottle_images(form, bottle)
+    assert not ok
+    assert "megapixels" in error
+    assert storage.keys() == []
@@ -1,9 +1,11 @@
 from decimal import Decimal
 
 import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 
 from mywhiskies.extensions import db
-from mywhiskies.models import Bottle, BottleTypes, User
+from mywhiskies.models import Bottle, BottleTypes, User, user_num_counter
 
 
 def test_bottle_creation(test_bottle: Bottle, test_user_01: User) -> None:
@@ -37,6 +39,49 @@ def test_user_num_increments_sequentially(test_user_01: User) -> None:
     assert bottle.user_num == before + 1
 
 
+def test_user_num_bulk_insert_reserves_one_range(test_user_01: User) -> None:
+    before = max(b.user_num for b in test_user_01.bottles)
+    bottles = [Bottle(name=f"Bulk Bottle {i}", type=BottleTypes.RYE, user_id=test_user_01.id) for i in range(50)]
+    db.session.add_all(bottles)
+
+    statements = []
+
+    def record(conn, cursor, statement, *args) -> None:
+        statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", record)
+    try:
+        db.session.commit()
+    finally:
+        event.remove(Engine, "before_cursor_execute", record)
+    assert [b.user_num for b in bottles] == list(range(before + 1, before + 51))
+    assert sum("user_num_counter" in s for s in statements) <= 3
+    assert not any("MAX(user_num)" in s for s in statements if "user_num_counter" not in s)
+
+
+def test_user_num_counter_seeds_from_existing_rows(test_user_01: User) -> None:
+    before = max(b.user_num for b in test_user_01.bottles)
+    db.session.execute(db.delete(user_num_counter))
+    bottle = Bottle(name="Seeded Bottle", type=BottleTypes.RYE, user_id=test_user_01.id)
+    db.session.add(bottle)
+    db.session.commit()
+    assert bottle.user_num == before + 1
+
+
+def test_user_num_is_not_reused_after_delete(test_user_01: User) -> None:
+    bottle = Bottle(name="Short-lived Bottle", type=BottleTypes.RYE, user_id=test_user_01.id)
+    db.session.add(bottle)
+    db.session.commit()
+    deleted_num = bottle.user_num
+    db.session.delete(bottle)
+    db.session.commit()
+
+    bottle = Bottle(name="Next Bottle", type=BottleTypes.RYE, user_id=test_user_01.id)
+    db.session.add(bottle)
+    db.session.commit()
+    assert bottle.user_num == deleted_num + 1
+
+
 # --- before_insert / before_update event: clean_bottle_data ---
 
 
@@ -60,3 +105,41 @@ def test_clean_bottle_data_on_update(test_bottle: Bottle) -> None:
     db.session.commit()
     assert test_bottle.name == "Updated With Spaces"
     assert test_bottle.url is None
+
+
+def test_clean_bottle_data_sets_group_key(test_user_01: User) -> None:
+    bottle = Bottle(name="  Mixed CASE Name ", type=BottleTypes.BOURBON, user_id=test_user_01.id)
+    db.session.add(bottle)
+    db.session.commit()
+    assert bottle.group_key == "mixed case name"
+
+    bottle.name = "Renamed Bottle"
+    db.session.commit()
+    assert bottle.group_key == "renamed bottle"
+
+
+# --- before_flush event: search_text ---
+
+
+def test_search_text_folds_name_and_related_names(test_user_01: User) -> None:
+    bottle = next(b for b in test_user_01.bottles if b.name == "Far-Flung Bourbon I")
+    assert bottle.search_text.startswith("far-flung bourbon i\n")
+    assert "lost lantern" in bottle.search_text
+    assert "frey ranch" in bottle.search_text
+    assert "still austin" in bottle.search_text
+
+
+def test_search_text_folds_smart_quotes(test_user_01: User) -> None:
+    bottle = Bottle(name="Blanton’s “Gold”", type=BottleTypes.BOURBON, user_id=test_user_01.id)
+    db.session.add(bottle)
+    db.session.commit()
+    assert bottle.search_text == 'blanton\'s "gold"'
+
+
+def test_search_text_follows_distillery_rename(test_user_01: User) -> None:
+    distillery = next(d for d in test_user_01.distilleries if d.name == "Still Austin")
+    distillery.name = "Austin Still House"
+    db.session.commit()
+    bottle = next(b for b in test_user_01.bottles if b.name == "Far-Flung Bourbon I")
+    assert "austin still house" in bottle.search_text
+    assert "still austin" not in bottle.search_text
@@ -1,8 +1,9 @@
 from datetime import datetime
 from unittest.mock import MagicMock, patch
 
+from mywhiskies.extensions import db
 from mywhiskies.forms.bottle import BottleAddForm, BottleEditForm
-from mywhiskies.models import Bottle, BottleTypes, User
+from mywhiskies.models import BarrelPicker, Bottle, BottleTypes, User
 from mywhiskies.services.bottle.bottle import (
     add_bottle,
     delete_bottle,
@@ -10,6 +11,7 @@ from mywhiskies.services.bottle.bottle import (
     get_random_bottle,
     list_bottles_by_user,
     list_bottles_for_entity,
+    set_bottle_details,
 )
 
 
@@ -77,11 +79,100 @@ def test_list_bottles_pagination(test_user_01: User) -> None:
     assert data["total_pages"] == data["total"]
 
 
+def test_list_bottles_groups_duplicates(test_user_01: User) -> None:
+    for abv in (50.0, 55.5):
+        db.session.add(Bottle(name="far-flung bourbon i", type=BottleTypes.BOURBON, abv=abv, user_id=test_user_01.id))
+    db.session.commit()
+    data = list_bottles_by_user(user=test_user_01, is_my_list=True, q="far-flung")
+    assert data["total"] == 1
+    assert data["total_bottles"] == 3
+    group = data["grouped"][0]
+    assert group["is_group"] is True
+    assert group["count"] == 3
+    assert group["abv_min"] == 50.0
+    assert group["abv_max"] == 68.4
+
+
+def test_list_bottles_group_abv_ignores_zero(test_user_01: User) -> None:
+    for abv in (0, 50.0):
+        db.session.add(Bottle(name="far-flung bourbon ii", type=BottleTypes.BOURBON, abv=abv, user_id=test_user_01.id))
+    db.session.commit()
+    group = list_bottles_by_user(user=test_user_01, is_my_list=True, q="far-flung bourbon ii")["grouped"][0]
+    assert group["abv_min"] == 50.0
+    assert group["abv_max"] == 50.0
+
+
+def test_list_bottles_paginates_groups(test_user_01: User) -> None:
+    page_1 = list_bottles_by_user(user=test_user_01, is_my_list=True, per_page=2, page=1)
+    page_2 = list_bottles_by_user(user=test_user_01, is_my_list=True, per_page=2, page=2)
+    names = [g["name"] for g in page_1["grouped"] + page_2["grouped"]]
+    assert names == sorted((b.name for b in test_user_01.bottles), key=str.lower)
+
+
+def test_list_bottles_sort_desc(test_user_01: User) -> None:
+    data = list_bottles_by_user(user=test_user_01, is_my_list=True, sort="abv", direction="desc")
+    abvs = [g["abv_max"] or 0.0 for g in data["grouped"]]
+    assert abvs == sorted(abvs, reverse=True)
+
+
+def test_list_bottles_search_folds_smart_quotes_in_data(test_user_01: User) -> None:
+    db.session.add(Bottle(name="Blanton’s Original", type=BottleTypes.BOURBON, user_id=test_user_01.id))
+    db.session.commit()
+    data = list_bottles_by_user(user=test_user_01, is_my_list=True, q="blanton's")
+    assert data["total"] == 1
+
+
+def test_list_bottles_relevance_sort_prefers_name_matches(test_user_01: User) -> None:
+    db.session.add(Bottle(name="Still Austin Bourbon", type=BottleTypes.BOURBON, user_id=test_user_01.id))
+    db.session.commit()
+    data = list_bottles_by_user(user=test_user_01, is_my_list=True, q="still austin", sort="relevance")
+    assert [g["name"] for g in data["grouped"]] == ["Still Austin Bourbon", "Far-Flung Bourbon I"]
+
+
+def test_list_bottles_killed_matches(test_user_01: User) -> None:
+    bottle = next(b for b in test_user_01.bottles if b.name.startswith("Frey Ranch"))
+    bottle.date_killed = datetime(2024, 6, 1)
+    db.session.commit()
+    data = list_bottles_by_user(user=test_user_01, is_my_list=True, q="frey ranch straight")
+    assert data["total"] == 0
+    assert data["killed_matches"] == 1
+    assert data["has_killed"] is True
+
+
+def test_list_bottles_facets(test_user_01: User) -> None:
+    rye = next(b for b in test_user_01.bottles if b.name.startswith("Frey Ranch"))
+    rye.date_killed = datetime(2024, 6, 1)
+    rye.is_single_barrel = True
+    db.session.commit()
+    far_flung = next(b for b in test_user_01.bottles if b.name.startswith("Far-Flung"))
+    frey_ranch = next(d for d in far_flung.distilleries if d.name == "Frey Ranch")
+    still_austin = next(d for d in far_flung.distilleries if d.name == "Still Austin")
+
+    facets = list_bottles_by_user(user=test_user_01, is_my_list=True, q="frey")["facets"]
+    assert facets["active_types"] == {"BOURBON", "RYE", "AMERICAN_WHISKEY"}
+    assert facets["types"].get("BOURBON") == 1
+    assert facets["types"].get("RYE", 0) == 0
+    assert (facets["active"], facets["killed"], facets["single_barrel"]) == (1, 1, 0)
+    assert facets["distilleries"] == {frey_ranch.id: 1, still_austin.id: 1}
+    assert facets["bottlers"] == {far_flung.bottler_id: 1}
+
+    facets = list_bottles_by_user(user=test_user_01, is_my_list=True, q="frey", show_killed=True)["facets"]
+    assert facets["types"]["RYE"] == 1
+    assert facets["single_barrel"] == 1
+    assert facets["distilleries"][frey_ranch.id] == 2
+
+
 def test_get_random_bottle(test_user_01: User) -> None:
     bottle = get_random_bottle(test_user_01)
     assert bottle is None or bottle in test_user_01.bottles
 
 
+def test_get_random_bottle_respects_search(test_user_01: User) -> None:
+    bottle = get_random_bottle(test_user_01, q="lost lantern")
+    assert bottle.name == "Far-Flung Bourbon I"
+    assert get_random_bottle(test_user_01, q="no such bottle") is None
+
+
 def test_list_bottles_for_entity_returns_dict(test_user_01: User) -> None:
     bottler = test_user_01.bottlers[0]
     data = list_bottles_for_entity(entity=bottler, is_my_list=True)
@@ -98,6 +189,25 @@ def test_list_bottles_for_entity_hides_private_for_guests(test_user_01: User) ->
     assert all(not b.is_private for b in all_bottles)
 
 
+def test_list_bottles_for_entity_filters_in_sql(test_user_01: User) -> None:
+    frey_ranch = next(d for d in test_user_01.distilleries if d.name == "Frey Ranch")
+    rye = next(b for b in frey_ranch.bottles if b.type == BottleTypes.RYE)
+    rye.date_killed = datetime(2024, 1, 1)
+    db.session.commit()
+
+    data = list_bottles_for_entity(entity=frey_ranch, is_my_list=True)
+    assert [g["name"] for g in data["grouped"]] == ["Far-Flung Bourbon I"]
+    assert data["has_killed"]
+
+    # matches the bottle's other distillery, not just the one being viewed
+    data = list_bottles_for_entity(entity=frey_ranch, is_my_list=True, q="still austin")
+    assert data["total_bottles"] == 1
+
+    data = list_bottles_for_entity(entity=frey_ranch, is_my_list=True, types=["RYE"])
+    assert data["total"] == 0
+    assert data["killed_matches"] == 1
+
+
 @patch("mywhiskies.services.bottle.bottle.process_bottle_images")
 @patch("mywhiskies.services.bottle.bottle.flash")
 def test_add_bottle(mock_flash: MagicMock, mock_process_bottle_images: MagicMock, test_user_01: User) -> None:
@@ -167,13 +277,26 @@ def test_edit_bottle(
     assert args[1] == "success"
 
 
-@patch("mywhiskies.services.bottle.image.boto3.client")
 @patch("mywhiskies.services.bottle.bottle.flash")
 def test_delete_bottle(
     mock_flash: MagicMock,
-    mock_boto_client: MagicMock,
     test_user_01: User,
     test_bottle: Bottle,
+    storage,
 ) -> None:
     delete_bottle(test_user_01, test_bottle)
     mock_flash.assert_called_once_with("Bottle deleted successfully", "success")
+
+
+def test_set_bottle_details_ignores_foreign_barrel_pickers(test_user_01: User, test_user_02: User) -> None:
+    mine = BarrelPicker(name="My Picker", user_id=test_user_01.id)
+    foreign = BarrelPicker(name="Their Picker", user_id=test_user_02.id)
+    db.session.add_all([mine, foreign])
+    db.session.commit()
+
+    form = MagicMock(spec=BottleAddForm)
+    form.distilleries.data = []
+    form.barrel_pickers.data = [foreign.id, mine.id]
+    form.bottler_id.data = "0"
+    bottle = set_bottle_details(form, user=test_user_01)
+    assert bottle.barrel_pickers == [mine]
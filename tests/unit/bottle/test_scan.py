@@ -0,0 +1,57 @@
+import io
+
+from flask import Flask
+from PIL import Image
+
+from mywhiskies.services.bottle.scan import _MODEL_MAX_EDGE, _MODEL_MAX_PIXELS, prepare_scan_images
+
+
+def _image(width: int, height: int, format: str = "JPEG", orientation: int = None) -> bytes:
+    options = {}
+    if orientation:
+        exif = Image.Exif()
+        exif[0x0112] = orientation
+        options["exif"] = exif.tobytes()
+    buf = io.BytesIO()
+    Image.new("RGB", (width, height), color=(100, 150, 200)).save(buf, format=format, **options)
+    return buf.getvalue()
+
+
+def _size(data: bytes) -> tuple:
+    return Image.open(io.BytesIO(data)).size
+
+
+def test_large_photo_is_resized_to_the_model_resolution(app: Flask) -> None:
+    original = _image(4000, 3000)
+    ((data, mime_type),) = prepare_scan_images([(original, "image/jpeg")])
+    width, height = _size(data)
+    assert mime_type == "image/jpeg"
+    assert max(width, height) <= _MODEL_MAX_EDGE
+    assert width * height <= _MODEL_MAX_PIXELS
+    assert width * height > 0.95 * _MODEL_MAX_PIXELS
+    assert len(data) < len(original)
+
+
+def test_rotated_photo_comes_out_upright(app: Flask) -> None:
+    ((data, _),) = prepare_scan_images([(_image(4000, 3000, orientation=6), "image/jpeg")])
+    width, height = _size(data)
+    assert height > width
+
+
+def test_small_image_is_passed_through(app: Flask) -> None:
+    original = _image(800, 600, format="PNG")
+    assert prepare_scan_images([(original, "image/png")]) == [(original, "image/png")]
+
+
+def test_unsupported_format_is_converted(app: Flask) -> None:
+    ((data, mime_type),) = prepare_scan_images([(_image(800, 600, format="BMP"), "image/bmp")])
+    assert mime_type == "image/jpeg"
+    assert _size(data) == (800, 600)
+
+
+def test_images_are_prepared_in_order_and_preparing_twice_changes_nothing(app: Flask) -> None:
+    images = [(_image(3000, 2000), "image/jpeg"), (_image(640, 480), "image/jpeg"), (_image(2000, 3000), "image/jpeg")]
+    prepared = prepare_scan_images(images)
+    assert [_size(data)[0] > _size(data)[1] for data, _ in prepared] == [True, True, False]
+    assert prepared[1] == images[1]
+    assert prepare_scan_images(prepared) == prepared
@@ -0,0 +1,57 @@
+import io
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+from flask import Flask
+from PIL import Image
+
+from mywhiskies.extensions import db
+from mywhiskies.models import LabelScanCache
+from mywhiskies.services.bottle.scan import scan_bottle_label, scan_cache_key
+from mywhiskies.services.bottle.scan_cache import cache_scan, get_cached_scan, prune_scan_cache
+
+
+def _jpeg(color: tuple = (100, 150, 200)) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (60, 80), color=color).save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+IMAGES = [(_jpeg(), "image/jpeg")]
+RESULT = {"name": "Frey Ranch Bourbon", "abv": 45.0}
+
+
+def test_repeat_scan_is_served_from_the_cache(app: Flask, scan_client) -> None:
+    assert scan_bottle_label(IMAGES) == RESULT
+    assert scan_bottle_label(list(IMAGES)) == RESULT
+    assert len(scan_client.calls) == 1
+
+    scan_bottle_label([(_jpeg((1, 2, 3)), "image/jpeg")])
+    assert len(scan_client.calls) == 2
+
+
+def test_new_prompt_version_misses_the_cache(app: Flask, scan_client) -> None:
+    scan_bottle_label(IMAGES)
+    with patch("mywhiskies.services.bottle.scan.PROMPT_VERSION", "next"):
+        scan_bottle_label(IMAGES)
+    assert len(scan_client.calls) == 2
+
+
+def test_expired_entry_is_not_served(app: Flask) -> None:
+    key = scan_cache_key(IMAGES)
+    cache_scan(key, RESULT)
+    db.session.get(LabelScanCache, key).created_at = datetime.now(timezone.utc) - timedelta(days=365)
+    db.session.commit()
+    assert get_cached_scan(key) is None
+
+
+def test_prune_keeps_the_most_recently_used(app: Flask) -> None:
+    now = datetime.now(timezone.utc)
+    for n in range(4):
+        db.session.add(LabelScanCache(key=f"k{n}", result="{}", created_at=now, used_at=now - timedelta(hours=n)))
+    db.session.add(LabelScanCache(key="old", result="{}", created_at=now - timedelta(days=365), used_at=now))
+    db.session.commit()
+
+    with patch.dict(app.config, {"LABEL_SCAN_CACHE_MAX_ENTRIES": 2}):
+        assert prune_scan_cache() == 3
+    assert sorted(db.session.scalars(db.select(LabelScanCache.key))) == ["k0", "k1"]
@@ -0,0 +1,128 @@
+import json
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+from flask import Flask
+from PIL import Image
+
+from mywhiskies.extensions import db
+from mywhiskies.models import Bottle, BottleTypes, ImageUploadJob, User
+from mywhiskies.services.bottle.scan_import import RateLimiter, find_import_items, import_label_scans
+
+
+def _photo(path, color: tuple) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    Image.new("RGB", (60, 80), color=color).save(path, format="JPEG")
+
+
+@pytest.fixture
+def shelf(tmp_path):
+    """Three bottles: two single photos and a subdirectory with front and back."""
+    _photo(tmp_path / "shelf" / "a.jpg", (10, 0, 0))
+    _photo(tmp_path / "shelf" / "b.jpg", (20, 0, 0))
+    _photo(tmp_path / "shelf" / "c" / "front.jpg", (30, 0, 0))
+    _photo(tmp_path / "shelf" / "c" / "back.jpg", (40, 0, 0))
+    (tmp_path / "shelf" / "notes.txt").write_text("not a photo")
+    return str(tmp_path / "shelf")
+
+
+def _import(user: User, shelf: str, **kwargs):
+    return import_label_scans(user, shelf, os.path.join(shelf, ".checkpoint.json"), batch_size=2, **kwargs)
+
+
+def _drafts(user: User) -> list:
+    return db.session.scalars(
+        db.select(Bottle).filter_by(user_id=user.id, is_private=True).where(Bottle.personal_note.like("Imported%"))
+    ).all()
+
+
+def test_items_are_photos_or_subdirectories(shelf: str) -> None:
+    items = find_import_items(shelf)
+    assert [item.name for item in items] == ["a.jpg", "b.jpg", "c"]
+    assert [os.path.basename(p) for p in items[2].paths] == ["back.jpg", "front.jpg"]
+
+
+def test_import_adds_private_drafts_with_queued_photos(app: Flask, test_user_01: User, shelf: str, scan_client) -> None:
+    distillery = test_user_01.distilleries[0]
+    scan_client.result = {"name": "Shelf Bottle", "type": "Rye", "abv": "50.5", "distillery": distillery.name.upper()}
+
+    result = _import(test_user_01, shelf, per_minute=0)
+    assert (result.imported, result.failed, result.skipped) == (3, [], 0)
+    assert len(scan_client.calls) == 3
+
+    drafts = sorted(_drafts(test_user_01), key=lambda b: b.user_num)
+    assert [b.type for b in drafts] == [BottleTypes.RYE] * 3
+    assert [float(b.abv) for b in drafts] == [50.5] * 3
+    assert all(b.distilleries == [distillery] for b in drafts)
+    assert [len(b.images) for b in drafts] == [1, 1, 2]
+    assert not any(img.is_ready for b in drafts for img in b.images)
+    assert len(db.session.scalars(db.select(ImageUploadJob)).all()) == 4
+    assert [b.user_num for b in drafts] == list(range(drafts[0].user_num, drafts[0].user_num + 3))
+
+    with open(os.path.join(shelf, ".checkpoint.json")) as f:
+        checkpoint = json.load(f)
+    assert checkpoint["user_id"] == test_user_01.id
+    assert checkpoint["imported"] == {"a.jpg": drafts[0].user_num, "b.jpg": drafts[1].user_num, "c": drafts[2].user_num}
+
+
+def test_rerun_resumes_from_the_checkpoint(app: Flask, test_user_01: User, shelf: str, scan_client) -> None:
+    os.rename(os.path.join(shelf, "b.jpg"), os.path.join(shelf, "b.txt"))
+    with open(os.path.join(shelf, "b.jpg"), "wb") as f:
+        f.write(b"not an image")
+
+    result = _import(test_user_01, shelf, per_minute=0)
+    assert (result.imported, result.failed, result.skipped) == (2, ["b.jpg"], 0)
+
+    os.replace(os.path.join(shelf, "b.txt"), os.path.join(shelf, "b.jpg"))
+    result = _import(test_user_01, shelf, per_minute=0)
+    assert (result.imported, result.failed, result.skipped) == (1, [], 2)
+    assert len(_drafts(test_user_01)) == 3
+    assert len(scan_client.calls) == 3
+
+
+def test_checkpoint_of_another_user_is_refused(
+    app: Flask, test_user_01: User, test_user_02: User, shelf: str, scan_client
+) -> None:
+    _import(test_user_01, shelf, per_minute=0)
+    with pytest.raises(ValueError):
+        _import(test_user_02, shelf, per_minute=0)
+
+
+def test_free_tier_stops_at_the_bottle_limit(app: Flask, test_user_01: User, shelf: str, scan_client) -> None:
+    with patch.dict(app.config, {"FREE_TIER_BOTTLE_LIMIT": len(test_user_01.bottles) + 1}):
+        result = _import(test_user_01, shelf, per_minute=0)
+    assert result.imported == 1
+    assert len(scan_client.calls) == 1
+
+
+def test_free_tier_stops_at_the_scan_limit(app: Flask, test_user_01: User, shelf: str, scan_client) -> None:
+    limit = app.config["FREE_TIER_SCAN_LIMIT"]
+    test_user_01.glen_scan_count = limit - 2
+    db.session.commit()
+
+    result = _import(test_user_01, shelf, per_minute=0)
+    assert (result.imported, result.failed, result.held) == (2, [], 1)
+    assert len(scan_client.calls) == 2
+    assert db.session.get(User, test_user_01.id).glen_scan_count == limit
+
+
+def test_cached_scans_are_not_counted(app: Flask, test_user_01: User, shelf: str, scan_client) -> None:
+    before = test_user_01.glen_scan_count
+    _import(test_user_01, shelf, per_minute=0)
+    assert db.session.get(User, test_user_01.id).glen_scan_count == before + 3
+
+    os.remove(os.path.join(shelf, ".checkpoint.json"))
+    result = _import(test_user_01, shelf, per_minute=0)
+    assert result.imported == 3
+    assert len(scan_client.calls) == 3
+    assert db.session.get(User, test_user_01.id).glen_scan_count == before + 3
+
+
+def test_rate_limiter_spaces_calls() -> None:
+    limiter = RateLimiter(per_minute=600)
+    started = time.monotonic()
+    for _ in range(3):
+        limiter.wait()
+    assert time.monotonic() - started >= 0.2
@@ -0,0 +1,87 @@
+import io
+import json
+import threading
+from unittest.mock import patch
+
+from flask import Flask
+from PIL import Image
+
+from mywhiskies.extensions import db
+from mywhiskies.models import LabelScanJob, User
+from mywhiskies.services.bottle.scan_jobs import (
+    LabelScanRunner,
+    get_label_scan,
+    scan_limit_reached,
+    start_label_scan,
+)
+
+
+def _jpeg(color: tuple = (100, 150, 200)) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (60, 80), color=color).save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+IMAGES = [(_jpeg(), "image/jpeg")]
+
+
+def test_scan_job_records_result_and_uses_a_free_scan(app: Flask, test_user_01: User, scan_client) -> None:
+    job = start_label_scan(test_user_01, IMAGES)
+
+    assert job.status == LabelScanJob.DONE
+    assert json.loads(job.result) == {"name": "Frey Ranch Bourbon", "abv": 45.0}
+    assert job.finished_at is not None
+    assert test_user_01.glen_scan_count == 1
+    (call,) = scan_client.calls
+    assert call["messages"][0]["content"][0]["source"]["media_type"] == "image/jpeg"
+
+
+def test_failed_scan_does_not_use_a_free_scan(app: Flask, test_user_01: User, scan_client) -> None:
+    with patch.object(scan_client, "create", side_effect=RuntimeError("boom")):
+        job = start_label_scan(test_user_01, IMAGES)
+    assert job.status == LabelScanJob.FAILED
+    assert test_user_01.glen_scan_count == 0
+
+
+def test_pro_scans_are_not_counted(app: Flask, test_user_01: User, scan_client) -> None:
+    test_user_01.is_pro = True
+    db.session.commit()
+    start_label_scan(test_user_01, IMAGES)
+    assert test_user_01.glen_scan_count == 0
+
+
+def test_running_scans_count_toward_the_limit(app: Flask, test_user_01: User) -> None:
+    test_user_01.glen_scan_count = app.config["FREE_TIER_SCAN_LIMIT"] - 1
+    db.session.commit()
+    assert not scan_limit_reached(test_user_01)
+
+    db.session.add(LabelScanJob(user_id=test_user_01.id))
+    db.session.commit()
+    assert scan_limit_reached(test_user_01)
+
+
+def test_scan_job_is_only_visible_to_its_owner(app: Flask, test_user_01: User, test_user_02: User, scan_client) -> None:
+    job = start_label_scan(test_user_01, IMAGES)
+    assert get_label_scan(test_user_01, job.id) is job
+    assert get_label_scan(test_user_02, job.id) is None
+
+
+def test_runner_refuses_scans_past_its_limit(app: Flask) -> None:
+    release = threading.Event()
+    finished = threading.Semaphore(0)
+
+    def slow_scan(job_id: str, images: list) -> bool:
+        release.wait(5)
+        finished.release()
+        return True
+
+    runner = LabelScanRunner(app, workers=1, max_pending=2)
+    with patch("mywhiskies.services.bottle.scan_jobs.run_label_scan", side_effect=slow_scan):
+        assert runner.submit("a", IMAGES)
+        assert runner.submit("b", IMAGES)
+        assert not runner.submit("c", IMAGES)
+
+        release.set()
+        assert finished.acquire(timeout=5) and finished.acquire(timeout=5)
+        assert runner.submit("d", IMAGES)
+        assert finished.acquire(timeout=5)
@@ -0,0 +1,169 @@
+import io
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+import pytest
+from flask import Flask
+from PIL import Image
+
+from mywhiskies.common.storage import StorageError
+from mywhiskies.extensions import db
+from mywhiskies.models import Bottle, BottleImage, BottleTypes, ImageUploadJob, User
+from mywhiskies.services.bottle import upload_queue
+from mywhiskies.services.bottle.image import add_bottle_images
+from mywhiskies.services.bottle.upload_queue import (
+    BACKOFF_MAX,
+    MAX_ATTEMPTS,
+    backoff,
+    claim_upload_job,
+    process_upload_jobs,
+)
+
+
+def _png(width: int = 60, height: int = 80) -> io.BytesIO:
+    buf = io.BytesIO()
+    Image.new("RGB", (width, height), color=(100, 150, 200)).save(buf, format="PNG")
+    buf.seek(0)
+    return buf
+
+
+def _form(*files) -> MagicMock:
+    form = MagicMock()
+    uploads = {f"bottle_image_{n}": MagicMock(data=f) for n, f in enumerate(files, start=1)}
+    form.__getitem__ = MagicMock(side_effect=lambda key: uploads.get(key, MagicMock(data=None)))
+    return form
+
+
+@pytest.fixture
+def bottle(app: Flask, test_user_01: User) -> Bottle:
+    bottle = Bottle(name="Queue Test Bottle", type=BottleTypes.BOURBON, user_id=test_user_01.id)
+    db.session.add(bottle)
+    db.session.commit()
+    return bottle
+
+
+def _jobs() -> list:
+    return db.session.scalars(db.select(ImageUploadJob)).all()
+
+
+def _stored(images) -> list:
+    """Display-bucket keys for images: the display JPEG and its thumbnails."""
+    return sorted(key for img in images for key in (img.key, *img.thumbnail_keys))
+
+
+def _make_due(job: ImageUploadJob) -> None:
+    job.run_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+    db.session.commit()
+
+
+def test_upload_is_queued_then_stored(bottle: Bottle, storage) -> None:
+    assert add_bottle_images(_form(_png(), _png()), bottle, is_pro=True)
+    assert [img.is_ready for img in bottle.images] == [False, False]
+    assert storage.keys() == []
+
+    assert process_upload_jobs() == 2
+    assert [img.is_ready for img in bottle.images] == [True, True]
+    assert _jobs() == []
+    assert all(img.has_thumbnails for img in bottle.images)
+    assert storage.keys() == sorted(
+        [f"dev-pro-full/{img.key}" for img in bottle.images] + [f"dev/{key}" for key in _stored(bottle.images)]
+    )
+
+
+def test_unreadable_upload_is_rejected_up_front(bottle: Bottle, storage) -> None:
+    assert not add_bottle_images(_form(io.BytesIO(b"not an image")), bottle)
+    assert _jobs() == []
+    assert storage.keys() == []
+
+
+def test_claimed_job_is_leased(bottle: Bottle, storage) -> None:
+    add_bottle_images(_form(_png()), bottle)
+    assert claim_upload_job() is not None
+    assert claim_upload_job() is None
+
+
+def test_failed_store_is_retried_with_backoff(bottle: Bottle, storage) -> None:
+    add_bottle_images(_form(_png()), bottle)
+    storage.fail_puts = 1
+
+    assert process_upload_jobs() == 1
+    (job,) = _jobs()
+    assert job.attempts == 1
+    assert "SlowDown" in job.last_error
+    assert not bottle.images[0].is_ready
+    # not due again until the backoff has passed
+    assert process_upload_jobs() == 0
+
+    _make_due(job)
+    assert process_upload_jobs() == 1
+    assert bottle.images[0].is_ready
+    assert storage.keys() == [f"dev/{key}" for key in _stored(bottle.images)]
+
+
+def test_upload_is_dropped_after_max_attempts(bottle: Bottle, storage) -> None:
+    add_bottle_images(_form(_png(), _png()), bottle)
+    first, second = bottle.images
+    first.upload_job.attempts = MAX_ATTEMPTS - 1
+    second.upload_job.run_at += timedelta(minutes=1)
+    db.session.commit()
+    storage.fail_puts = 1
+
+    assert process_upload_jobs() == 1
+    # the failed image is gone and the one behind it moved up
+    assert [(img.id, img.sequence) for img in bottle.images] == [(second.id, 1)]
+    assert db.session.get(BottleImage, first.id) is None
+
+    _make_due(second.upload_job)
+    assert process_upload_jobs() == 1
+    assert storage.keys() == [f"dev/{key}" for key in _stored([second])]
+
+
+def test_corrupt_upload_is_not_retried(bottle: Bottle, storage) -> None:
+    add_bottle_images(_form(_png()), bottle)
+    bottle.images[0].upload_job.data = b"\x89PNG\r\n\x1a\n" + b"\x00" * 64
+    db.session.commit()
+
+    assert process_upload_jobs() == 1
+    assert bottle.images == []
+    assert _jobs() == []
+
+
+def test_backoff_doubles_up_to_a_cap() -> None:
+    assert backoff(2) == 2 * backoff(1)
+    assert backoff(100) == BACKOFF_MAX
+
+
+def test_full_res_failure_does_not_fail_the_upload(bottle: Bottle, storage) -> None:
+    add_bottle_images(_form(_png()), bottle, is_pro=True)
+    put = storage.put
+
+    def put_unless_full(key: str, *args) -> None:
+        if key.startswith("dev-pro-full/"):
+            raise StorageError("SlowDown")
+        put(key, *args)
+
+    with patch.object(storage, "put", side_effect=put_unless_full):
+        assert process_upload_jobs() == 1
+    assert bottle.images[0].is_ready
+    assert storage.keys() == [f"dev/{key}" for key in _stored(bottle.images)]
+
+
+def test_image_removed_mid_upload_has_its_files_deleted(bottle: Bottle, storage) -> None:
+    assert add_bottle_images(_form(_png()), bottle)
+    image = bottle.images[0]
+    image_id = image.id
+    store = upload_queue.store_renditions
+
+    def store_then_remove(image, encoded):
+        store(image, encoded)
+        # the owner deletes the image while the worker is still holding its job
+        db.session.execute(
+            db.delete(BottleImage).where(BottleImage.id == image_id).execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+
+    with patch.object(upload_queue, "store_renditions", store_then_remove):
+        assert process_upload_jobs() == 1
+    assert db.session.get(BottleImage, image_id) is None
+    assert _jobs() == []
+    assert storage.keys() == []
@@ -11,6 +11,7 @@ from mywhiskies.services.bottler.bottler import (
     delete_bottler,
     edit_bottler,
     list_bottlers,
+    search_bottlers,
 )
 
 
@@ -86,3 +87,9 @@ def test_edit_bottler(mock_flash: MagicMock, test_bottler: Bottler) -> None:
 def test_delete_bottler(mock_flash: MagicMock, test_user_01: User, test_bottler: Bottler) -> None:
     delete_bottler(test_user_01, test_bottler)
     mock_flash.assert_called_once_with('"Single Cask Nation" has been successfully deleted.', "success")
+
+
+def test_search_bottlers_is_scoped_to_user(test_user_01: User, test_user_02: User) -> None:
+    data = search_bottlers(test_user_01, "")
+    assert sorted(r["id"] for r in data["results"]) == sorted(b.id for b in test_user_01.bottlers)
+    assert data["pagination"] == {"more": False}
@@ -0,0 +1,47 @@
+import os
+import time
+
+from mywhiskies.common.fragment_cache import FragmentCache
+
+
+def test_fragment_cache_roundtrip() -> None:
+    cache = FragmentCache(max_bytes=1024)
+    key = cache.make_key("rows", "user", 1)
+    assert cache.get(key) is None
+    cache.set(key, "<tr>one</tr>")
+    assert cache.get(key) == "<tr>one</tr>"
+    assert cache.make_key("rows", "user", 2) != key
+
+
+def test_fragment_cache_evicts_least_recently_used() -> None:
+    cache = FragmentCache(max_bytes=10)
+    cache.set("a", "aaaa")
+    cache.set("b", "bbbb")
+    cache.get("a")
+    cache.set("c", "cccc")
+    assert cache.get("a") == "aaaa"
+    assert cache.get("b") is None
+    assert cache.get("c") == "cccc"
+
+
+def test_fragment_cache_skips_oversized_fragments() -> None:
+    cache = FragmentCache(max_bytes=4)
+    cache.set("a", "aaaa")
+    cache.set("big", "x" * 5)
+    assert cache.get("big") is None
+    assert cache.get("a") == "aaaa"
+
+
+def test_fragment_cache_shares_directory_between_workers(tmp_path) -> None:
+    worker_1 = FragmentCache(max_bytes=1024, directory=str(tmp_path))
+    worker_2 = FragmentCache(max_bytes=1024, directory=str(tmp_path))
+    worker_1.set("k", "<tr>shared</tr>")
+    assert worker_2.get("k") == "<tr>shared</tr>"
+
+
+def test_fragment_cache_ignores_expired_files(tmp_path) -> None:
+    worker_1 = FragmentCache(max_bytes=1024, directory=str(tmp_path), ttl=60)
+    worker_1.set("k", "<tr>old</tr>")
+    stale = time.time() - 120
+    os.utime(tmp_path / "k.html", (stale, stale))
+    assert FragmentCache(max_bytes=1024, directory=str(tmp_path), ttl=60).get("k") is None
@@ -0,0 +1,39 @@
+import pytest
+from flask import Flask
+
+from mywhiskies.common.query_budget import QueryBudgetExceeded, query_budget, sql_statement_count
+from mywhiskies.extensions import db
+from mywhiskies.models import User
+
+
+def _run_selects(n: int) -> str:
+    for _ in range(n):
+        db.session.execute(db.select(User.id)).all()
+    return "ok"
+
+
+def test_sql_statement_count_counts_statements(app: Flask) -> None:
+    before = sql_statement_count()
+    _run_selects(3)
+    assert sql_statement_count() - before == 3
+
+
+def test_query_budget_within_budget(app: Flask) -> None:
+    with app.test_request_context():
+        assert query_budget(2)(_run_selects)(2) == "ok"
+
+
+def test_query_budget_exceeded_raises_when_strict(app: Flask) -> None:
+    with app.test_request_context():
+        with pytest.raises(QueryBudgetExceeded):
+            query_budget(2)(_run_selects)(3)
+
+
+def test_query_budget_exceeded_logs_when_not_strict(app: Flask, monkeypatch) -> None:
+    monkeypatch.setitem(app.config, "STRICT_SQL_CHECKS", False)
+    warnings = []
+    monkeypatch.setattr(app.logger, "warning", warnings.append)
+    with app.test_request_context():
+        assert query_budget(2)(_run_selects)(3) == "ok"
+    assert len(warnings) == 1
+    assert "budget 2" in warnings[0]
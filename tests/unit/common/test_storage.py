@@ -0,0 +1,99 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+from botocore.exceptions import ClientError
+from flask.testing import FlaskClient
+
+from mywhiskies.common.storage import LocalStorage, S3Storage, Storage, StorageError
+
+
+def test_local_storage_roundtrip(tmp_path) -> None:
+    storage = LocalStorage(str(tmp_path), url="/media")
+    storage.put("dev/b1_abc.jpg", b"jpg", "image/jpeg")
+    storage.put("dev-pro-full/b1_abc.jpg", b"full", "image/jpeg")
+    assert storage.get("dev/b1_abc.jpg") == b"jpg"
+    assert sorted(storage.list("dev/")) == ["dev/b1_abc.jpg"]
+
+    storage.delete("dev/b1_abc.jpg")
+    storage.delete("dev/b1_abc.jpg")  # already gone: not an error
+    assert list(storage.list("dev/")) == []
+    with pytest.raises(StorageError):
+        storage.get("dev/b1_abc.jpg")
+
+
+def test_storage_backends_must_implement_every_operation() -> None:
+    class PutOnly(Storage):
+        def put(self, key: str, data: bytes, content_type: str, cache_control=None) -> None:
+            pass
+
+    with pytest.raises(TypeError):
+        PutOnly()
+
+
+def test_local_storage_rejects_keys_outside_root(tmp_path) -> None:
+    storage = LocalStorage(str(tmp_path / "images"), url="/media")
+    with pytest.raises(StorageError):
+        storage.put("../escape.jpg", b"x", "image/jpeg")
+
+
+def test_local_storage_is_served_by_the_app(test_client: FlaskClient, storage) -> None:
+    storage.put("dev/b1_abc.jpg", b"jpg", "image/jpeg")
+    response = test_client.get("/media/dev/b1_abc.jpg")
+    assert response.status_code == 200
+    assert response.data == b"jpg"
+    assert test_client.get("/media/dev/missing.jpg").status_code == 404
+
+
+@patch("mywhiskies.common.storage.boto3.client")
+def test_s3_storage_shares_one_client(mock_client: MagicMock) -> None:
+    storage = S3Storage(bucket="bucket", url="https://bucket.example", max_pool_connections=8)
+    storage.put("dev/a.jpg", b"a", "image/jpeg", "public, max-age=60")
+    storage.delete("dev/a.jpg")
+    assert mock_client.call_count == 1
+    assert mock_client.call_args.kwargs["config"].max_pool_connections == 8
+    mock_client.return_value.put_object.assert_called_once_with(
+        Bucket="bucket", Key="dev/a.jpg", Body=b"a", ContentType="image/jpeg", CacheControl="public, max-age=60"
+    )
+
+
+@patch("mywhiskies.common.storage.boto3.client")
+def test_s3_storage_wraps_client_errors(mock_client: MagicMock) -> None:
+    mock_client.return_value.get_object.side_effect = ClientError(
+        {"Error": {"Code": "NoSuchKey", "Message": "missing"}}, "GetObject"
+    )
+    with pytest.raises(StorageError):
+        S3Storage(bucket="bucket", url="https://bucket.example").get("dev/a.jpg")
+
+
+@patch("mywhiskies.common.storage.boto3.client")
+def test_s3_storage_deletes_in_batches(mock_client: MagicMock) -> None:
+    def delete_objects(Delete: dict, **kwargs) -> dict:
+        keys = [obj["Key"] for obj in Delete["Objects"]]
+        if "dev/e.jpg" in keys:
+            raise ClientError({"Error": {"Code": "SlowDown", "Message": "slow down"}}, "DeleteObjects")
+        if "dev/d.jpg" in keys:
+            return {"Errors": [{"Key": "dev/d.jpg", "Code": "AccessDenied", "Message": "Access Denied"}]}
+        return {}
+
+    mock_client.return_value.delete_objects.side_effect = delete_objects
+    storage = S3Storage(bucket="bucket", url="https://bucket.example")
+    storage.DELETE_BATCH = 2
+
+    failures = storage.delete_many([f"dev/{c}.jpg" for c in "abcde"])
+    assert mock_client.return_value.delete_objects.call_count == 3
+    assert failures == {"dev/d.jpg": "Access Denied", "dev/e.jpg": failures["dev/e.jpg"]}
+    assert "SlowDown" in failures["dev/e.jpg"]
+
+
+@patch("mywhiskies.common.storage.boto3.client")
+def test_s3_storage_puts_concurrently_and_reports_failures(mock_client: MagicMock) -> None:
+    def put_object(Key: str, **kwargs) -> dict:
+        if Key == "dev/b.jpg":
+            raise ClientError({"Error": {"Code": "SlowDown", "Message": "slow down"}}, "PutObject")
+        return {}
+
+    mock_client.return_value.put_object.side_effect = put_object
+    storage = S3Storage(bucket="bucket", url="https://bucket.example")
+    failures = storage.put_many([(f"dev/{c}.jpg", b"x", "image/jpeg") for c in "abc"], "public, max-age=60")
+    assert mock_client.return_value.put_object.call_count == 3
+    assert list(failures) == ["dev/b.jpg"]
@@ -2,7 +2,7 @@ import pytest
 from flask import Flask
 
 from mywhiskies.extensions import db
-from mywhiskies.models import Distillery, User
+from mywhiskies.models import CatalogDistillery, Distillery, User
 
 
 @pytest.fixture
@@ -34,3 +34,14 @@ def test_distillery(app: Flask, test_user_01: User) -> Distillery:
         db.session.delete(distillery)
 
     db.session.commit()
+
+
+@pytest.fixture
+def catalog(app: Flask) -> list:
+    entries = [
+        CatalogDistillery(name="Buffalo Trace", region_1="Frankfort", region_2="KY", url="https://buffalotrace.com"),
+        CatalogDistillery(name="Frey Ranch", region_1="Fallon", region_2="NV"),
+    ]
+    db.session.add_all(entries)
+    db.session.commit()
+    return entries
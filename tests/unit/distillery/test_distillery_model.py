@@ -1,4 +1,6 @@
-from mywhiskies.models import Distillery, User
+from mywhiskies.extensions import db
+from mywhiskies.models import CatalogDistillery, Distillery, User
+from mywhiskies.services.distillery.distillery import CATALOG_PREFIX, resolve_distilleries
 
 
 def test_distillery_creation(test_distillery: Distillery) -> None:
@@ -15,3 +17,18 @@ def test_distillery_creation(test_distillery: Distillery) -> None:
 def test_distillery_user_relationship(test_distillery: Distillery, test_user_01: User) -> None:
     assert test_distillery.user == test_user_01
     assert test_distillery in test_user_01.distilleries
+
+
+def test_edited_catalog_link_becomes_users_own(test_user_01: User, catalog: list) -> None:
+    (distillery,) = resolve_distilleries(test_user_01, [f"{CATALOG_PREFIX}{catalog[0].id}"])
+    db.session.commit()
+
+    # saving unchanged values (as the edit form does) keeps the link
+    distillery.name = f" {distillery.name} "
+    db.session.commit()
+    assert distillery.catalog_id == catalog[0].id
+
+    distillery.region_2 = "Kentucky"
+    db.session.commit()
+    assert distillery.catalog_id is None
+    assert db.session.get(CatalogDistillery, catalog[0].id).region_2 == "KY"
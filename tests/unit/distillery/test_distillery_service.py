@@ -1,17 +1,25 @@
 import copy
+import json
 from unittest.mock import MagicMock, patch
 
 from werkzeug.datastructures import MultiDict
 
 from mywhiskies.extensions import db
 from mywhiskies.forms.distillery import DistilleryAddForm, DistilleryEditForm
-from mywhiskies.models import Distillery, User
+from mywhiskies.models import CatalogDistillery, Distillery, User
 from mywhiskies.services.distillery.distillery import (
+    CATALOG_PREFIX,
     add_distillery,
     delete_distillery,
+    distillery_choices,
     edit_distillery,
     list_distilleries,
+    resolve_distilleries,
+    search_distilleries,
+    selected_distillery_choices,
+    sync_distillery_catalog,
 )
+from mywhiskies.services.utils import CHOICE_PAGE_SIZE
 
 
 def test_list_distilleries(test_user_01: User) -> None:
@@ -37,6 +45,70 @@ def test_list_distilleries_sort(test_user_01: User) -> None:
     assert asc["distilleries"] == list(reversed(desc["distilleries"]))
 
 
+def test_list_distilleries_sort_by_bottles(test_user_01: User) -> None:
+    result = list_distilleries(user=test_user_01, is_my_list=True, sort="bottles", direction="desc")
+    counts = [result["bottle_counts"][d.id] for d in result["distilleries"]]
+    assert counts == [len(d.bottles) for d in result["distilleries"]]
+    assert counts == sorted(counts, reverse=True)
+    assert result["distilleries"][0].name == "Frey Ranch"
+
+
+def test_list_distilleries_paginates_in_sql(test_user_01: User) -> None:
+    everything = list_distilleries(user=test_user_01, is_my_list=True, sort="location")["distilleries"]
+    first = list_distilleries(user=test_user_01, is_my_list=True, sort="location", per_page=3)
+    last = list_distilleries(user=test_user_01, is_my_list=True, sort="location", per_page=3, page=99)
+    assert first["total_pages"] == last["page"] == 2
+    assert first["distilleries"] + last["distilleries"] == everything
+
+
+def test_distillery_choices_offer_unlinked_catalog_entries(test_user_01: User, catalog: list) -> None:
+    choices = dict(distillery_choices(test_user_01))
+    for distillery in test_user_01.distilleries:
+        assert choices[distillery.id] == distillery.name
+    # the user already has their own Frey Ranch, so the catalog's isn't offered
+    assert [v for v in choices if v.startswith(CATALOG_PREFIX)] == [f"{CATALOG_PREFIX}{catalog[0].id}"]
+
+
+def test_resolve_distilleries_links_catalog_entry_once(test_user_01: User, catalog: list) -> None:
+    own = test_user_01.distilleries[0]
+    before = len(test_user_01.distilleries)
+
+    linked = resolve_distilleries(test_user_01, [own.id, f"{CATALOG_PREFIX}{catalog[0].id}"])
+    db.session.commit()
+    assert linked[0] is own
+    assert linked[1].catalog_id == catalog[0].id
+    assert (linked[1].name, linked[1].region_1, linked[1].url) == ("Buffalo Trace", "Frankfort", catalog[0].url)
+
+    again = resolve_distilleries(test_user_01, [f"{CATALOG_PREFIX}{catalog[0].id}"])
+    db.session.commit()
+    assert again == [linked[1]]
+    assert len(test_user_01.distilleries) == before + 1
+    assert f"{CATALOG_PREFIX}{catalog[0].id}" not in dict(distillery_choices(test_user_01))
+
+
+def test_sync_distillery_catalog(test_user_01: User, catalog: list, tmp_path) -> None:
+    (linked,) = resolve_distilleries(test_user_01, [f"{CATALOG_PREFIX}{catalog[0].id}"])
+    db.session.commit()
+    path = tmp_path / "distilleries.json"
+    rows = [
+        {
+            "name": "Buffalo Trace",
+            "region_1": "Frankfort",
+            "region_2": "KY",
+            "url": "https://www.buffalotracedistillery.com",
+        },
+        {"name": "Frey Ranch", "region_1": "Fallon", "region_2": "NV", "url": None},
+        {"name": "Wild Turkey", "region_1": "Lawrenceburg", "region_2": "KY", "url": None},
+    ]
+    path.write_text(json.dumps({"distilleries": rows}))
+
+    assert sync_distillery_catalog(str(path)) == (1, 1)
+    assert linked.url == "https://www.buffalotracedistillery.com"
+    assert linked.catalog_id == catalog[0].id
+    assert db.session.scalar(db.select(CatalogDistillery.id).filter_by(name="Wild Turkey"))
+    assert sync_distillery_catalog(str(path)) == (0, 0)
+
+
 @patch("mywhiskies.services.distillery.distillery.flash")
 def test_add_distillery(mock_flash: MagicMock, test_user_01: User) -> None:
     form_data = MultiDict(
@@ -90,3 +162,36 @@ def test_edit_distillery(mock_flash: MagicMock, test_distillery: Distillery) ->
 def test_delete_distillery(mock_flash: MagicMock, test_user_01: User, test_distillery: Distillery) -> None:
     delete_distillery(test_user_01, test_distillery)
     mock_flash.assert_called_once_with('Distillery "Whiskey Del Bac" has been successfully deleted.', "success")
+
+
+def test_search_distilleries_includes_unowned_catalog_entries(test_user_01: User, catalog: list) -> None:
+    buffalo_trace, _ = catalog
+    data = search_distilleries(test_user_01, "")
+    texts = [r["text"] for r in data["results"]]
+    assert texts == sorted(texts, key=str.lower)
+    # the user's own Frey Ranch hides the catalog's
+    assert texts.count("Frey Ranch") == 1
+    assert {"id": f"{CATALOG_PREFIX}{buffalo_trace.id}", "text": "Buffalo Trace"} in data["results"]
+
+
+def test_search_distilleries_pages(test_user_01: User) -> None:
+    db.session.add_all(
+        CatalogDistillery(name=f"Paging Distillery {i:02}", region_1="Austin", region_2="TX")
+        for i in range(CHOICE_PAGE_SIZE + 1)
+    )
+    db.session.commit()
+    first = search_distilleries(test_user_01, "paging")
+    second = search_distilleries(test_user_01, "paging", page=2)
+    assert len(first["results"]) == CHOICE_PAGE_SIZE
+    assert first["pagination"] == {"more": True}
+    assert [r["text"] for r in second["results"]] == [f"Paging Distillery {CHOICE_PAGE_SIZE:02}"]
+    assert second["pagination"] == {"more": False}
+
+
+def test_selected_distillery_choices_drops_other_users(test_user_01: User, test_user_02: User, catalog: list) -> None:
+    own = test_user_01.distilleries[0]
+    values = [f"{CATALOG_PREFIX}{catalog[0].id}", test_user_02.distilleries[0].id, own.id]
+    assert selected_distillery_choices(test_user_01, values) == [
+        (f"{CATALOG_PREFIX}{catalog[0].id}", "Buffalo Trace"),
+        (own.id, own.name),
+    ]
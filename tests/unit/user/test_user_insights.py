@@ -1,5 +1,8 @@
 from datetime import datetime
 
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
 from mywhiskies.extensions import db
 from mywhiskies.models import Bottle, Bottler, Distillery, User
 from mywhiskies.services.user.insights import get_collection_insights
@@ -131,3 +134,38 @@ def test_top_bottlers_counts():
     data = get_collection_insights(user)
     assert data["top_bottlers"][0]["name"] == "Top Bottler"
     assert data["top_bottlers"][0]["count"] == 2
+
+
+def test_abv_bucket_boundaries_and_most_common_type():
+    user = _make_user()
+    db.session.add_all(
+        [
+            Bottle(name="Edge Low", type="RYE", abv=46.0, user_id=user.id),
+            Bottle(name="Edge High", type="RYE", abv=55.0, user_id=user.id),
+            Bottle(name="Just Over", type="BOURBON", abv=55.1, user_id=user.id, is_single_barrel=True),
+        ]
+    )
+    db.session.commit()
+
+    data = get_collection_insights(user)
+    assert data["abv_distribution"] == {"under_46": 0, "range_46_55": 2, "over_55": 1, "unknown": 0}
+    assert data["summary"]["avg_abv"] == 52.0
+    assert data["summary"]["most_common_type"] == "Rye"
+    assert data["summary"]["single_barrel_count"] == 1
+
+
+def test_insights_cost_a_fixed_number_of_queries(test_user_01: User):
+    statements = []
+
+    def record(conn, cursor, statement, *args) -> None:
+        statements.append(statement)
+
+    db.session.expire_all()
+    event.listen(Engine, "before_cursor_execute", record)
+    try:
+        data = get_collection_insights(test_user_01)
+    finally:
+        event.remove(Engine, "before_cursor_execute", record)
+    assert data["summary"]["total"] > 0
+    # the user row (expired above) plus four aggregates; no bottle, distillery or bottler rows
+    assert len(statements) <= 5
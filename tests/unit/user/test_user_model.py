@@ -1,4 +1,5 @@
-from mywhiskies.models import User
+from mywhiskies.extensions import db
+from mywhiskies.models import Bottle, BottleImage, BottleTypes, User
 from tests.conftest import TEST_USER_PASSWORD
 
 
@@ -35,3 +36,30 @@ def test_email_change_token_invalid() -> None:
     user, email = User.verify_email_change_token("not-a-valid-token")
     assert user is None
     assert email is None
+
+
+# --- collection_version ---
+
+
+def test_collection_version_bumps_on_collection_writes(test_user_01: User, test_user_02: User) -> None:
+    start, other = test_user_01.collection_version, test_user_02.collection_version
+
+    bottle = Bottle(name="Versioned Bottle", type=BottleTypes.RYE, user_id=test_user_01.id)
+    db.session.add(bottle)
+    db.session.commit()
+    assert test_user_01.collection_version == start + 1
+
+    bottle.images.append(BottleImage(sequence=1))
+    db.session.commit()
+    assert test_user_01.collection_version == start + 2
+
+    test_user_01.distilleries[0].name = "Renamed Distillery"
+    db.session.commit()
+    assert test_user_01.collection_version == start + 3
+
+    db.session.delete(bottle.images[0])
+    db.session.delete(bottle)
+    db.session.commit()
+    assert test_user_01.collection_version == start + 4
+
+    assert test_user_02.collection_version == other